@@ -0,0 +1,96 @@
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.dirname(__file__))
+
+from agent import Message
+from memory_episodic import EpisodicMemory
+from memory_semantic import SemanticMemory
+from bulk_ingest import ingest_transcripts
+from bench_suite import HashEmbedding
+
+# Usage: python bench_bulk_ingest.py --arch B --conversations 200 --messages 500 --workers 1,4
+# Compares replaying transcripts through add_message (the only path before bulk ingest)
+# with ingest_transcripts at each worker count.
+
+def write_transcripts(directory, conversations, messages):
+    paths = []
+    start = datetime(2025, 1, 1)
+    for c in range(conversations):
+        path = os.path.join(directory, f"conversation_{c:05d}.jsonl")
+        with open(path, "w") as f:
+            for i in range(messages):
+                role = "user" if i % 2 == 0 else "assistant"
+                content = f"Conversation {c} message {i} mentions project{(c * 7 + i) % 997} and deadline{i % 31}"
+                ts = start + timedelta(minutes=c * messages + i)
+                f.write(json.dumps(Message(role=role, content=content, timestamp=ts).to_dict()) + "\n")
+        paths.append(path)
+    return paths
+
+def build_memory(arch, work_dir, stm_size):
+    file_path = os.path.join(work_dir, "episodes.json")
+    if arch == "B":
+        return EpisodicMemory(None, stm_size=stm_size, file_path=file_path)
+    return SemanticMemory(None, stm_size=stm_size, file_path=file_path, db_path=os.path.join(work_dir, "chroma"),
+                          embedding_function=HashEmbedding())
+
+def replay(memory, paths):
+    """Baseline: one add_message per historical message."""
+    start = time.perf_counter()
+    count = 0
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                memory.add_message(Message.from_dict(json.loads(line)))
+                count += 1
+    memory.flush()
+    return count, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk transcript ingest benchmark")
+    parser.add_argument("--arch", default="B", choices=["B", "C"])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=500, help="Messages per conversation")
+    parser.add_argument("--stm", type=int, default=5)
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--replay-conversations", type=int, default=20,
+                        help="Conversations replayed through add_message for the baseline")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="transcripts_")
+    paths = write_transcripts(data_dir, args.conversations, args.messages)
+    print(f"Arch {args.arch}: {args.conversations} conversations x {args.messages} messages")
+    print(f"{'Mode':<22} | {'Messages':>9} | {'Seconds':>8} | {'Msg/s':>10} | {'Episodes':>8}")
+    print("-" * 70)
+
+    work_dir = tempfile.mkdtemp(prefix="ingest_")
+    with contextlib.redirect_stdout(io.StringIO()):
+        memory = build_memory(args.arch, work_dir, args.stm)
+        count, elapsed = replay(memory, paths[:args.replay_conversations])
+    print(f"{'add_message replay':<22} | {count:>9} | {elapsed:>8.2f} | {count / elapsed:>10.0f} | {len(memory.episodes):>8}")
+    memory.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        work_dir = tempfile.mkdtemp(prefix="ingest_")
+        with contextlib.redirect_stdout(io.StringIO()):
+            memory = build_memory(args.arch, work_dir, args.stm)
+            stats = ingest_transcripts(memory, paths, workers=workers)
+        print(f"{'ingest workers=' + str(workers):<22} | {stats['messages']:>9} | {stats['seconds']:>8.2f} | "
+              f"{stats['messages_per_s']:>10.0f} | {stats['episodes']:>8}")
+        memory.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import io
+import time
+import tempfile
+import contextlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import BaseAgent
+from memory_episodic import EpisodicMemory
+from llm import LLMClient
+
+# Usage: python bench_consolidation_latency.py [turns] [summary_ms]
+#   summary_ms emulates the LLM round-trip consolidation will pay once
+#   summaries come from llm_client.generate_response.
+
+class EchoLLM(LLMClient):
+    def __init__(self):
+        pass
+
+    def generate_response(self, messages, temperature=0.7):
+        return "I processed your input."
+
+class SlowSummaryMemory(EpisodicMemory):
+    def __init__(self, *args, summary_ms: float = 20.0, **kwargs):
+        self.summary_ms = summary_ms
+        super().__init__(*args, **kwargs)
+
+    def _summarize(self, messages):
+        time.sleep(self.summary_ms / 1000)
+        return super()._summarize(messages)
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def run_agent(async_consolidation, turns, summary_ms):
+    path = os.path.join(tempfile.mkdtemp(), "episodes.json")
+    memory = SlowSummaryMemory(EchoLLM(), stm_size=2, file_path=path,
+                               async_consolidation=async_consolidation, summary_ms=summary_ms)
+    agent = BaseAgent("Bench", memory, EchoLLM())
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(turns):
+            start = time.perf_counter()
+            agent.run(f"Distractor query number {i} about topic{i % 50}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            # Think time between user turns, during which the worker catches up
+            time.sleep(summary_ms / 1000)
+    memory.flush()
+    episodes = len(memory.episodes)
+    memory.clear()
+    return latencies, episodes
+
+def run_benchmark(turns=300, summary_ms=20.0):
+    print(f"{'Mode':<6} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'max (ms)':>9} | {'Episodes':>8}")
+    print("-" * 52)
+    for mode, async_consolidation in [("sync", False), ("async", True)]:
+        latencies, episodes = run_agent(async_consolidation, turns, summary_ms)
+        print(f"{mode:<6} | {percentile(latencies, 50):>9.2f} | {percentile(latencies, 99):>9.2f} | "
+              f"{max(latencies):>9.2f} | {episodes:>8}")
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    summary_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    run_benchmark(turns, summary_ms)
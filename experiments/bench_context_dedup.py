@@ -0,0 +1,98 @@
+import sys
+import os
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.dirname(__file__))
+
+from agent import BaseAgent, Message
+from memory_episodic import EpisodicMemory
+from memory_semantic import SemanticMemory
+from memory_reflection import ReflectionMemory
+from context_budget import TokenCounter, ContextAssembler, ContextDeduplicator
+from benchmark import BenchmarkLLM
+from bench_suite import HashEmbedding
+
+# Usage: python bench_context_dedup.py --distractors 20 --stm 2
+# Replays benchmark.py's conversation (two facts, distractor turns, recall probes) on the
+# episodic, semantic and reflection architectures with cross-tier dedup off and on, and
+# reports the prompt tokens sent to the LLM and whether the probes are still answered.
+# It first checks that a semantic hit repeating a kept STM turn is dropped, and one repeating
+# a turn the budget drops is kept (AssertionError otherwise).
+
+class CountingLLM(BenchmarkLLM):
+    def __init__(self):
+        self.counter = TokenCounter()
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def generate_response(self, messages, temperature=0.7):
+        self.calls += 1
+        self.prompt_tokens += sum(self.counter.count(m["content"]) + TokenCounter.MESSAGE_OVERHEAD for m in messages)
+        return super().generate_response(messages, temperature)
+
+def build_memory(arch, llm, work_dir, stm, dedup):
+    file_path = os.path.join(work_dir, "episodes.json")
+    semantic = {"db_path": os.path.join(work_dir, "vectors"), "vector_store": "local",
+                "embedding_function": HashEmbedding()}
+    if arch == "B":
+        return EpisodicMemory(llm, stm_size=stm, file_path=file_path, context_dedup=dedup)
+    if arch == "C":
+        return SemanticMemory(llm, stm_size=stm, file_path=file_path, context_dedup=dedup, **semantic)
+    return ReflectionMemory(llm, stm_size=stm, file_path=file_path, context_dedup=dedup,
+                            reflection_file=os.path.join(work_dir, "reflections.txt"), **semantic)
+
+def run(arch, distractors, stm, dedup):
+    work_dir = tempfile.mkdtemp(prefix="dedup_")
+    llm = CountingLLM()
+    memory = build_memory(arch, llm, work_dir, stm, dedup)
+    agent = BaseAgent(arch, memory, llm)
+    turns = ["The secret code is Blue_Falcon_99.", "I am putting the keys under the flower pot."]
+    turns += [f"Distractor query number {i} to fill context." for i in range(distractors)]
+    turns += ["What is the secret code?", "Where are the keys?"] * 3
+    probes = {"What is the secret code?": "blue_falcon_99", "Where are the keys?": "flower pot"}
+    recalled = asked = 0
+    for text in turns:
+        response = agent.run(text)
+        if text in probes:
+            asked += 1
+            recalled += probes[text] in response.lower()
+    saved = memory.context_deduplicator.total_tokens_saved if memory.context_deduplicator else 0
+    memory.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {"prompt_tokens": llm.prompt_tokens, "per_turn": llm.prompt_tokens / llm.calls,
+            "saved": saved, "recall": recalled / asked}
+
+def check_stm_copies():
+    fact = "The secret code is Blue_Falcon_99."
+    context = [Message("system", f"[Semantic Memory]: {fact}", metadata={"type": "semantic"}),
+               Message("user", fact), Message("assistant", "Noted. " * 40), Message("user", "What is the secret code?")]
+    kept = ContextDeduplicator().dedupe(context)
+    assert kept == context[1:], "semantic copy of a kept STM turn was not dropped"
+    budget = ContextAssembler(max_tokens=80)
+    assert context[1] not in budget.assemble(context), "budget was expected to drop the STM turn"
+    kept = ContextDeduplicator(budget).dedupe(context)
+    assert kept == context, "semantic copy of an STM turn the budget drops was removed"
+    print("STM copy checks passed: kept turn's semantic copy dropped, dropped turn's copy kept")
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-tier context dedup benchmark")
+    parser.add_argument("--distractors", type=int, default=20)
+    parser.add_argument("--stm", type=int, default=2)
+    args = parser.parse_args()
+
+    check_stm_copies()
+    rows = []
+    for arch in ["B", "C", "D"]:
+        for dedup in (False, True):
+            rows.append((arch, dedup, run(arch, args.distractors, args.stm, dedup)))
+    print(f"\n{'Arch':<4} | {'Dedup':<5} | {'Prompt tokens':>13} | {'Per turn':>8} | {'Saved':>6} | {'Recall':>6}")
+    print("-" * 58)
+    for arch, dedup, r in rows:
+        print(f"{arch:<4} | {'on' if dedup else 'off':<5} | {r['prompt_tokens']:>13} | {r['per_turn']:>8.1f} | "
+              f"{r['saved']:>6} | {r['recall']:>6.0%}")
+
+if __name__ == "__main__":
+    main()
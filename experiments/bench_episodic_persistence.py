@@ -0,0 +1,64 @@
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from memory_episodic import Episode
+from episode_store import EpisodeJournal
+
+# Usage: python bench_episodic_persistence.py [sizes] [consolidations]
+#   e.g. python bench_episodic_persistence.py 1000,10000,100000 20
+
+def make_episode(i, rng, vocab):
+    return Episode(
+        id=f"ep-{i}",
+        content=f"Interaction loop where user said: ['synthetic message {i}']",
+        keywords=rng.sample(vocab, 12),
+        timestamp=time.time(),
+        metadata={}
+    )
+
+def full_rewrite(path, episodes):
+    """The original save_memory: re-serialize every episode on each consolidation."""
+    with open(path, 'w') as f:
+        json.dump([ep.to_dict() for ep in episodes], f)
+
+def run_benchmark(sizes, n_consolidations=20):
+    rng = random.Random(7)
+    vocab = [f"term{i}" for i in range(50000)]
+    tmp_dir = tempfile.mkdtemp()
+
+    print(f"{'History':>10} | {'Rewrite (ms)':>12} | {'Append (ms)':>11} | {'Speedup':>8}")
+    print("-" * 52)
+    for n in sizes:
+        episodes = [make_episode(i, rng, vocab) for i in range(n)]
+        new_episodes = [make_episode(n + i, rng, vocab) for i in range(n_consolidations)]
+
+        # 1. Full JSON rewrite per consolidation
+        legacy_path = os.path.join(tmp_dir, f"legacy_{n}.json")
+        history = list(episodes)
+        start = time.perf_counter()
+        for ep in new_episodes:
+            history.append(ep)
+            full_rewrite(legacy_path, history)
+        rewrite_ms = (time.perf_counter() - start) * 1000 / n_consolidations
+
+        # 2. Journal append per consolidation (history already on disk)
+        journal = EpisodeJournal(os.path.join(tmp_dir, f"journal_{n}.json"))
+        journal.compact([ep.to_dict() for ep in episodes])
+        start = time.perf_counter()
+        for ep in new_episodes:
+            journal.append(ep.to_dict())
+        append_ms = (time.perf_counter() - start) * 1000 / n_consolidations
+
+        assert len(journal.load()) == n + n_consolidations
+        print(f"{n:>10} | {rewrite_ms:>12.3f} | {append_ms:>11.3f} | {rewrite_ms / append_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    n_consolidations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run_benchmark(sizes, n_consolidations)
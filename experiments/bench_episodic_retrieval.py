@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import math
+import random
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from memory_episodic import EpisodicMemory, Episode
+from llm import LLMClient
+
+# Usage: python bench_episodic_retrieval.py [sizes] [queries] [vocab_size]
+#   e.g. python bench_episodic_retrieval.py 1000,100000,1000000 50
+# A small vocab_size (e.g. 500) makes every query term match many episodes,
+# which stresses the vectorized scoring rather than candidate generation.
+
+class NoopLLM(LLMClient):
+    def __init__(self):
+        pass
+
+    def generate_response(self, messages, temperature=0.7):
+        return "noop"
+
+def linear_scan(episodes, query, top_k=3):
+    """The original full-scan retrieval, kept as the baseline."""
+    query_words = set(query.lower().split())
+    scored_episodes = []
+    current_time = time.time()
+    for ep in episodes:
+        ep_keywords = set([k.lower() for k in ep.keywords])
+        match_count = len(query_words.intersection(ep_keywords))
+        keyword_score = match_count / (len(query_words) + 1)
+        hours_passed = (current_time - ep.timestamp) / 3600
+        decay_score = math.exp(-hours_passed / 24)
+        final_score = (keyword_score * 0.7) + (decay_score * 0.3)
+        scored_episodes.append((final_score, ep))
+    scored_episodes.sort(key=lambda x: x[0], reverse=True)
+    return [ep for _, ep in scored_episodes[:top_k]]
+
+def build_memory(n_episodes, vocab, rng, path):
+    memory = EpisodicMemory(NoopLLM(), stm_size=2, file_path=path)
+    # One episode every 10 minutes, ending now
+    start = time.time() - n_episodes * 600
+    for i in range(n_episodes):
+        memory._add_episode(Episode(
+            id=f"ep-{i}",
+            content=f"Synthetic episode {i}",
+            keywords=rng.sample(vocab, 12),
+            timestamp=start + i * 600,
+            metadata={}
+        ))
+    return memory
+
+def run_benchmark(sizes, n_queries=50, vocab_size=50000):
+    rng = random.Random(42)
+    vocab = [f"term{i}" for i in range(vocab_size)]
+    queries = [" ".join(rng.sample(vocab, 5)) for _ in range(n_queries)]
+    path = os.path.join(tempfile.mkdtemp(), "bench_episodic.json")
+
+    print(f"{'Episodes':>10} | {'Scan (ms)':>10} | {'Index (ms)':>10} | {'Speedup':>8}")
+    print("-" * 48)
+    for n in sizes:
+        memory = build_memory(n, vocab, rng, path)
+
+        start = time.perf_counter()
+        baseline = [linear_scan(memory.episodes, q) for q in queries]
+        scan_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        start = time.perf_counter()
+        indexed = [memory._retrieve_episodes(q) for q in queries]
+        index_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        for a, b in zip(baseline, indexed):
+            assert [ep.id for ep in a] == [ep.id for ep in b], "Rankings diverged from the linear scan"
+
+        print(f"{n:>10} | {scan_ms:>10.3f} | {index_ms:>10.3f} | {scan_ms / index_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 100000, 1000000]
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    vocab_size = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    run_benchmark(sizes, n_queries, vocab_size)
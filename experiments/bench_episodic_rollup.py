@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import Message
+from memory_episodic import EpisodicMemory
+from episode_rollup import RollupPolicy
+
+# Usage: python bench_episodic_rollup.py [days] [messages_per_day]
+# Simulates a year-long conversation (episodes carry simulated timestamps) with and
+# without a RollupPolicy and reports store size and retrieval latency every 30 days.
+
+class MockSummaryLLM:
+    """Stands in for the summarizer: keeps the first clause of each memory."""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_response(self, messages):
+        self.calls += 1
+        lines = [line[2:].split(" and ")[0] for line in messages[-1]["content"].splitlines()]
+        return "Summary: " + "; ".join(dict.fromkeys(lines))[:1500]
+
+def store_bytes(memory):
+    paths = [memory.store.journal.file_path, memory.store.snapshot_path]
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+def time_retrieval(memory, queries):
+    start = time.perf_counter()
+    for q in queries:
+        memory._retrieve_episodes(q)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+def simulate(label, days, per_day, policy, work_dir):
+    rng = random.Random(11)
+    topics = [f"project{i}" for i in range(300)]
+    llm = MockSummaryLLM()
+    memory = EpisodicMemory(llm, stm_size=5, file_path=os.path.join(work_dir, f"{label}.json"), rollup_policy=policy)
+    start = datetime(2025, 1, 1, 8)
+    queries = [f"what about {rng.choice(topics)} deadline" for _ in range(50)]
+    chunk = []
+
+    print(f"\n{label}")
+    print(f"{'Day':>5} | {'Episodes':>8} | {'Store KB':>9} | {'Archive KB':>10} | {'Retrieve ms':>11}")
+    print("-" * 56)
+    for day in range(days):
+        for i in range(per_day):
+            ts = start + timedelta(days=day, seconds=i * 36000 / per_day)
+            text = f"Day {day} update on {rng.choice(topics)} and {rng.choice(topics)} before the deadline"
+            if day == 10 and i == 0:
+                text = "Remember that my passport number is P-4711 for the visa application"
+            chunk.append(Message(role="user" if i % 2 == 0 else "assistant", content=text, timestamp=ts))
+            if len(chunk) == memory.stm_limit + 1:
+                memory._commit_episodes([memory._build_episode(chunk, ts.timestamp())])
+                chunk = []
+        if (day + 1) % 30 == 0 or day == days - 1:
+            archive_kb = os.path.getsize(memory.store.archive_path) / 1024 if os.path.exists(memory.store.archive_path) else 0
+            print(f"{day + 1:>5} | {len(memory.episodes):>8} | {store_bytes(memory) / 1024:>9.0f} | "
+                  f"{archive_kb:>10.0f} | {time_retrieval(memory, queries):>11.3f}")
+
+    recalled = any("P-4711" in ep.content or "passport" in ep.keywords for ep in memory._retrieve_episodes("passport number"))
+    print(f"Passport fact (day 10) retrievable at day {days}: {recalled}; summarizer calls: {llm.calls}")
+
+def main(days=365, per_day=200):
+    work_dir = tempfile.mkdtemp(prefix="rollup_")
+    print(f"{days} days x {per_day} messages/day")
+    simulate("Flat episodes (no policy)", days, per_day, None, work_dir)
+    simulate("RollupPolicy(every=500, raw 48h, day 14d, max 5000)", days, per_day, RollupPolicy(), work_dir)
+    simulate("RollupPolicy(every=200, max_episodes=60)", days, per_day, RollupPolicy(every=200, max_episodes=60), work_dir)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from memory_episodic import EpisodicMemory, Episode
+from episode_store import EpisodeSnapshot
+from llm import LLMClient
+
+# Usage: python bench_episodic_startup.py [sizes]
+#   e.g. python bench_episodic_startup.py 10000,100000,1000000
+
+class NoopLLM(LLMClient):
+    def __init__(self):
+        pass
+
+    def generate_response(self, messages, temperature=0.7):
+        return "noop"
+
+def make_records(n, rng, vocab):
+    start = time.time() - n * 600
+    return [{
+        "id": f"ep-{i}",
+        "content": f"Interaction loop where user said: ['synthetic message {i}']",
+        "keywords": rng.sample(vocab, 12),
+        "timestamp": start + i * 600,
+        "metadata": {}
+    } for i in range(n)]
+
+def json_loader(path):
+    """The original load_memory: parse the whole file and build every Episode."""
+    with open(path, 'r') as f:
+        return [Episode(**item) for item in json.load(f)]
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def peak_mb(fn):
+    # Separate pass: tracemalloc slows allocation-heavy code down too much to time it
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1e6
+
+def run_benchmark(sizes):
+    rng = random.Random(3)
+    vocab = [f"term{i}" for i in range(50000)]
+    tmp_dir = tempfile.mkdtemp()
+
+    print(f"{'Episodes':>10} | {'JSON load (ms)':>14} | {'JSON MB':>8} | {'mmap open (ms)':>14} | {'mmap MB':>8} | {'1st query (ms)':>14}")
+    print("-" * 86)
+    for n in sizes:
+        records = make_records(n, rng, vocab)
+
+        legacy_path = os.path.join(tmp_dir, f"legacy_{n}.json")
+        with open(legacy_path, 'w') as f:
+            json.dump(records, f)
+
+        # Snapshot + empty journal, as left behind by a compaction
+        path = os.path.join(tmp_dir, f"episodes_{n}.json")
+        generation = f"{n:032x}"
+        EpisodeSnapshot.write(path + ".snap", records, generation)
+        with open(path, 'w') as f:
+            f.write(json.dumps({"snapshot": generation}) + "\n")
+        del records
+
+        _, json_ms = timed(lambda: json_loader(legacy_path))
+        json_mb = peak_mb(lambda: json_loader(legacy_path))
+        memory, mmap_ms = timed(lambda: EpisodicMemory(NoopLLM(), file_path=path))
+        mmap_mb = peak_mb(lambda: EpisodicMemory(NoopLLM(), file_path=path))
+        assert len(memory.episodes) == n
+
+        # The first retrieval pays for decoding the snapshot's term table
+        _, query_ms = timed(lambda: memory._retrieve_episodes("term1 term2 term3"))
+
+        print(f"{n:>10} | {json_ms:>14.1f} | {json_mb:>8.1f} | {mmap_ms:>14.2f} | {mmap_mb:>8.2f} | {query_ms:>14.1f}")
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+    run_benchmark(sizes)
@@ -0,0 +1,119 @@
+import sys
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import Message
+from memory_episodic import EpisodicMemory, Episode
+from keywords import KeywordExtractor
+from llm import LLMClient
+
+# Usage: python bench_keywords.py --episodes 20000 --queries 200
+# Keyword extraction before (whitespace split, words longer than 4 characters, role
+# prefixes included; queries split on whitespace) and after (KeywordExtractor) on
+# synthetic conversations. Each 5-message chunk states one fact, e.g. "The VPN for
+# atlas is vault-7", among chat filler. Reported: keywords per episode, distinct index
+# terms, store size on disk, extraction cost, retrieval latency, and hit@3 for
+# "What is the VPN for atlas?" queries against the episode holding the fact.
+
+THINGS = ["API key", "VPN", "IP", "DB password", "deploy window", "on-call", "SSO", "CI runner", "budget", "owner"]
+PROJECTS = ["atlas", "borealis", "cobalt", "delta", "ember", "falcon", "granite", "harbor", "ion", "juniper"]
+FILLER = [
+    "Thanks, that is really helpful for the team.",
+    "Could you please remind me about this tomorrow morning?",
+    "Sure, I have noted that down for you.",
+    "Let me know if there is anything else you need.",
+    "I think we should double-check everything before Friday.",
+    "Absolutely, I will keep that in mind going forward.",
+]
+
+class NoopLLM(LLMClient):
+    def __init__(self):
+        pass
+
+    def generate_response(self, messages, temperature=0.7):
+        return "noop"
+
+class LegacyExtractor(KeywordExtractor):
+    """The original query parsing."""
+    def query_terms(self, text):
+        return set(text.lower().split())
+
+class LegacyEpisodicMemory(EpisodicMemory):
+    keyword_extractor = LegacyExtractor()
+
+    def _build_episode(self, messages, timestamp):
+        # The original crude extraction
+        text_block = "\n".join([f"{m.role}: {m.content}" for m in messages])
+        keywords = [w for w in text_block.split() if len(w) > 4]
+        return Episode(id=f"ep-{timestamp}", content=self._summarize(messages), keywords=keywords,
+                       timestamp=timestamp, metadata={})
+
+def make_chunks(n, rng):
+    chunks, facts = [], []
+    for i in range(n):
+        thing, project = rng.choice(THINGS), rng.choice(PROJECTS)
+        value = f"{rng.choice(['vault', 'node', 'room', 'slot'])}-{rng.randint(1, 999)}"
+        messages = [Message(role="user", content=f"The {thing} for {project} is {value}, please remember it."),
+                    Message(role="assistant", content=f"Got it: the {thing} for {project} is {value}.")]
+        messages += [Message(role=("user", "assistant")[j % 2], content=rng.choice(FILLER)) for j in range(3)]
+        chunks.append(messages)
+        facts.append((thing, project))
+    return chunks, facts
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+def run(memory_class, chunks, facts, queries, rng):
+    work_dir = tempfile.mkdtemp(prefix="keywords_")
+    memory = memory_class(NoopLLM(), stm_size=5, file_path=os.path.join(work_dir, "episodes.json"))
+    start_ts = time.time() - len(chunks) * 600
+    start = time.perf_counter()
+    episodes = [memory._build_episode(m, start_ts + i * 600) for i, m in enumerate(chunks)]
+    build_us = (time.perf_counter() - start) * 1e6 / len(chunks)
+    memory._commit_episodes(episodes)
+    memory.save_memory()
+    size_mb = dir_bytes(work_dir) / 2**20
+
+    latencies, hits = [], 0
+    for i in queries:
+        thing, project = facts[i]
+        # The answer is the newest episode stating this fact (the same pair may repeat)
+        expected = max(j for j, f in enumerate(facts) if f == (thing, project))
+        t = time.perf_counter()
+        found = memory._retrieve_episodes(f"What is the {thing} for {project}?")
+        latencies.append((time.perf_counter() - t) * 1000)
+        hits += any(ep.timestamp == start_ts + expected * 600 for ep in found)
+    result = {"keywords": np.mean([len(e.keywords) for e in episodes]),
+              "terms": len({k.lower() for e in episodes for k in e.keywords}), "size_mb": size_mb,
+              "build_us": build_us, "p50": np.percentile(latencies, 50), "p95": np.percentile(latencies, 95),
+              "hit": hits / len(queries)}
+    memory.store.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword extraction benchmark")
+    parser.add_argument("--episodes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    chunks, facts = make_chunks(args.episodes, rng)
+    queries = [rng.randrange(len(chunks)) for _ in range(args.queries)]
+    print(f"{'Extractor':<9} | {'Kw/episode':>10} | {'Terms':>6} | {'Store MB':>8} | {'Build us':>8} | "
+          f"{'p50 ms':>7} | {'p95 ms':>7} | {'Hit@3':>6}")
+    print("-" * 82)
+    for label, memory_class in (("before", LegacyEpisodicMemory), ("after", EpisodicMemory)):
+        r = run(memory_class, chunks, facts, queries, rng)
+        print(f"{label:<9} | {r['keywords']:>10.1f} | {r['terms']:>6} | {r['size_mb']:>8.2f} | {r['build_us']:>8.1f} | "
+              f"{r['p50']:>7.2f} | {r['p95']:>7.2f} | {r['hit']:>6.0%}")
+
+if __name__ == "__main__":
+    main()
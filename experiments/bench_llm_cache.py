@@ -0,0 +1,117 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.dirname(__file__))
+
+from llm import LLMClient
+from llm_cache import ResponseCache
+from load_test_async import MockChatHandler
+
+# Usage: python bench_llm_cache.py [latency_ms] [turns] [burst]
+# Drives an OpenAI-compatible mock server (fixed latency, counted requests) with the
+# reflection critique prompt, as ReflectionMemory.reflect sends it, with and without
+# a ResponseCache:
+#   - maintenance passes: the same transcript reflected on twice in one process, then
+#     again after a restart (served by the disk tier)
+#   - burst: `burst` threads sending the identical prompt at once (single-flight)
+
+class CountingHandler(MockChatHandler):
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with CountingHandler.lock:
+            CountingHandler.requests += 1
+        super().do_POST()
+
+def start_server(latency_ms):
+    MockChatHandler.latency_s = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def critique_prompt(history):
+    history_text = "\n".join(f"{role}: {content}" for role, content in history)
+    return [
+        {"role": "system", "content": "You are a critical observer of an AI agent. Analyze the following interaction. If the agent made a mistake or the user was unhappy, formulate a 'Lesson Learned' or 'Rule' to prevent this in the future. If no mistake, return 'None'."},
+        {"role": "user", "content": f"Interaction:\n{history_text}"}
+    ]
+
+def transcript_windows(turns, window=6):
+    messages = []
+    for i in range(turns):
+        messages.append(("user", f"Question {i % 40} about the deployment"))
+        messages.append(("assistant", f"Answer {i % 40}"))
+    # One reflection per turn over the trailing window; the topic cycle repeats windows
+    return [messages[max(0, i - window):i] for i in range(2, len(messages) + 1, 2)]
+
+def run_pass(llm, prompts):
+    start = time.perf_counter()
+    for prompt in prompts:
+        llm.generate_response(prompt)
+    return time.perf_counter() - start
+
+def run_burst(llm, prompt, burst):
+    barrier = threading.Barrier(burst)
+    def call():
+        barrier.wait()
+        llm.generate_response(prompt)
+    threads = [threading.Thread(target=call) for _ in range(burst)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+def report(label, calls, seconds, upstream, cache):
+    stats = cache.stats() if cache else {}
+    print(f"{label:<31} | {calls:>5} | {upstream:>8} | {stats.get('hits', '-'):>5} | {stats.get('disk_hits', '-'):>5} | "
+          f"{stats.get('coalesced', '-'):>9} | {seconds:>6.2f} | {seconds * 1000 / calls:>7.1f}")
+
+def main(latency_ms=100, turns=120, burst=16):
+    server, base_url = start_server(latency_ms)
+    prompts = [critique_prompt(w) for w in transcript_windows(turns)]
+    work_dir = tempfile.mkdtemp(prefix="llm_cache_")
+    db_path = os.path.join(work_dir, "responses.sqlite")
+
+    print(f"{'Scenario':<31} | {'Calls':>5} | {'Upstream':>8} | {'Hits':>5} | {'Disk':>5} | {'Coalesced':>9} | "
+          f"{'Wall s':>6} | {'ms/call':>7}")
+    print("-" * 98)
+    for cached in (False, True):
+        tag = "cached" if cached else "uncached"
+        cache = ResponseCache(persist_path=db_path) if cached else None
+        llm = LLMClient(provider="ollama", model="mock", base_url=base_url, cache=cache)
+
+        before = CountingHandler.requests
+        seconds = run_pass(llm, prompts) + run_pass(llm, prompts)
+        report(f"2 maintenance passes ({tag})", 2 * len(prompts), seconds, CountingHandler.requests - before, cache)
+
+        if cached:
+            cache.close()
+            cache = ResponseCache(persist_path=db_path)  # Restart: cold memory tier
+            llm = LLMClient(provider="ollama", model="mock", base_url=base_url, cache=cache)
+            before = CountingHandler.requests
+            seconds = run_pass(llm, prompts)
+            report("pass after restart (cached)", len(prompts), seconds, CountingHandler.requests - before, cache)
+
+        before = CountingHandler.requests
+        probe = critique_prompt([("user", f"Burst probe {tag}"), ("assistant", "ok")])
+        seconds = run_burst(llm, probe, burst)
+        report(f"burst x{burst} ({tag})", burst, seconds, CountingHandler.requests - before, cache)
+        if cache:
+            cache.close()
+
+    server.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
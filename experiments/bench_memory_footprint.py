@@ -0,0 +1,80 @@
+import sys
+import os
+import gc
+import time
+import random
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import Message
+from memory_episodic import Episode
+
+# Usage: python bench_memory_footprint.py [count] [vocab_size]
+# Bytes per Episode / Message: the original dataclasses (copied below) vs the slotted,
+# term-interned representations. Keywords come from split() as in _build_episode, so
+# every episode starts with fresh string objects, as it does in production.
+
+@dataclass
+class LegacyEpisode:
+    id: str
+    content: str
+    keywords: List[str]
+    timestamp: float
+    metadata: Dict[str, Any]
+
+@dataclass
+class LegacyMessage:
+    role: str
+    content: str
+    timestamp: datetime = field(default_factory=datetime.now)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+def make_text(rng, vocab):
+    return " ".join(rng.choice(vocab) for _ in range(60))
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build(count)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / count
+
+def build_episodes(cls, vocab_size):
+    def build(count):
+        rng = random.Random(3)
+        vocab = [f"keyword{i}" for i in range(vocab_size)]
+        return [cls(id=f"{i:08d}-0000-0000-0000-000000000000", content=f"Interaction loop where user said: ['message {i}']",
+                    keywords=[w for w in make_text(rng, vocab).split() if len(w) > 4],
+                    timestamp=time.time(), metadata={})
+                for i in range(count)]
+    return build
+
+def build_messages(cls):
+    def build(count):
+        return [cls(role="user", content=f"message {i}") for i in range(count)]
+    return build
+
+def main(count=50000, vocab_size=5000):
+    # Warm the term table so the interned vocabulary is not billed to the first run
+    build_episodes(Episode, vocab_size)(1000)
+
+    print(f"{'Type':<10} | {'Before (B)':>11} | {'After (B)':>10} | {'Saving':>7}")
+    print("-" * 48)
+    rows = [("Episode", measure(build_episodes(LegacyEpisode, vocab_size), count),
+             measure(build_episodes(Episode, vocab_size), count)),
+            ("Message", measure(build_messages(LegacyMessage), count),
+             measure(build_messages(Message), count))]
+    for name, before, after in rows:
+        print(f"{name:<10} | {before:>11.0f} | {after:>10.0f} | {before / after:>6.1f}x")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
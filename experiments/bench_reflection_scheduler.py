@@ -0,0 +1,130 @@
+import sys
+import os
+import re
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.dirname(__file__))
+
+from agent import Message
+from memory_manager import MemoryManager, TenantMemory
+from memory_reflection import ReflectionMemory
+from reflection_scheduler import ReflectionPolicy
+from context_budget import TokenCounter
+from bench_suite import HashEmbedding
+
+# Usage: python bench_reflection_scheduler.py --tenants 20 --turns 50 --latency-ms 50 --agent-ms 10
+# Reflection cost and user-turn latency for a MemoryManager of ReflectionMemory tenants,
+# conversations interleaved round-robin (each reply takes --agent-ms), every 5th turn
+# carrying negative feedback:
+#   inline     reflect() called in the turn every 5 turns (the documented profile, blocking)
+#   background ReflectionScheduler, one critique request per window (max_batch=1)
+#   batched    ReflectionScheduler, up to 8 windows (across tenants) per request
+#   budget     batched, with a tokens_per_hour cap of half the batched spend
+
+FEEDBACK_EVERY = 5
+
+class MockReflectionLLM:
+    """Fixed-latency LLM; answers critiques (single and numbered batches) and summaries."""
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+        self.counter = TokenCounter()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.lock = threading.Lock()
+
+    def generate_response(self, messages, temperature=0.7):
+        system = messages[0]["content"]
+        if "critical observer" not in system:
+            return "Summary of the conversation."
+        time.sleep(self.latency_s)
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += sum(self.counter.count(m["content"]) for m in messages)
+        user = messages[-1]["content"]
+        if "numbered interactions" not in system:
+            return self._lesson(user)
+        blocks = re.split(r"^Interaction (\d+):$", user, flags=re.MULTILINE)[1:]
+        return "\n".join(f"{n}: {self._lesson(text)}" for n, text in zip(blocks[0::2], blocks[1::2]))
+
+    @staticmethod
+    def _lesson(history):
+        topics = re.findall(r"user: That's wrong about (\w+)", history)
+        return f"Double-check facts about {topics[-1]} before answering." if topics else "None"
+
+def build_manager(mode, work_dir, llm, tenants, turns):
+    kwargs = {"stm_size": 5, "vector_store": "local", "embedding_function": HashEmbedding()}
+    if mode != "inline":
+        batched = mode in ("batched", "budget")
+        policy = ReflectionPolicy(every_turns=5, max_batch=8 if batched else 1, batch_delay=0.05 if batched else 0.0)
+        if mode == "budget":
+            policy.tokens_per_hour = BUDGET[0]
+        kwargs["reflection_policy"] = policy
+    return MemoryManager(llm, memory_class=ReflectionMemory, root_dir=os.path.join(work_dir, "tenants"),
+                         db_path=os.path.join(work_dir, "vectors"), max_resident=tenants, **kwargs)
+
+BUDGET = [None]
+
+def run(mode, tenants, turns, latency_s, agent_s):
+    work_dir = tempfile.mkdtemp(prefix="reflection_")
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    llm = MockReflectionLLM(latency_s)
+    manager = build_manager(mode, work_dir, llm, tenants, turns)
+    memories = [TenantMemory(manager, f"tenant-{t}") for t in range(tenants)]
+    latencies = []
+    start = time.perf_counter()
+    for turn in range(1, turns + 1):
+        for t, memory in enumerate(memories):
+            topic = f"topic{t}x{turn // FEEDBACK_EVERY}"
+            text = f"That's wrong about {topic}" if turn % FEEDBACK_EVERY == 0 else f"Tell me about {topic}"
+            began = time.perf_counter()
+            memory.add_message(Message(role="user", content=text))
+            time.sleep(agent_s)  # The agent's own LLM call
+            memory.add_message(Message(role="assistant", content=f"Here is what I know about {topic}."))
+            if mode == "inline" and turn % 5 == 0:
+                with manager.checkout(memory.tenant_id) as m:
+                    m.reflect(m.stm_window[-10:])
+            latencies.append((time.perf_counter() - began) * 1000)
+    turns_s = time.perf_counter() - start
+    with manager._lock:
+        resident = [tenant.memory for tenant in manager._tenants.values()]
+    for m in resident:
+        m.flush()
+    total_s = time.perf_counter() - start
+    lessons = sum(len(m.reflections) for m in resident)
+    scheduler = manager.memory_kwargs.get("reflection_scheduler")
+    result = {"calls": llm.calls, "prompt_tokens": llm.prompt_tokens, "lessons": lessons,
+              "p50": np.percentile(latencies, 50), "p99": np.percentile(latencies, 99),
+              "turns_s": turns_s, "total_s": total_s,
+              "skipped": scheduler.stats()["skipped"] if scheduler else 0}
+    manager.close()
+    os.chdir(cwd)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Reflection scheduling benchmark")
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Critique request latency")
+    parser.add_argument("--agent-ms", type=float, default=10, help="Agent reply latency per turn")
+    args = parser.parse_args()
+
+    print(f"{'Mode':<10} | {'LLM calls':>9} | {'Prompt tok':>10} | {'Lessons':>7} | {'Skipped':>7} | "
+          f"{'Turn p50 ms':>11} | {'Turn p99 ms':>11} | {'Turns s':>7} | {'Total s':>7}")
+    print("-" * 102)
+    for mode in ["inline", "background", "batched", "budget"]:
+        r = run(mode, args.tenants, args.turns, args.latency_ms / 1000, args.agent_ms / 1000)
+        if mode == "batched":
+            BUDGET[0] = r["prompt_tokens"] // 2
+        print(f"{mode:<10} | {r['calls']:>9} | {r['prompt_tokens']:>10} | {r['lessons']:>7} | {r['skipped']:>7} | "
+              f"{r['p50']:>11.2f} | {r['p99']:>11.2f} | {r['turns_s']:>7.2f} | {r['total_s']:>7.2f}")
+
+if __name__ == "__main__":
+    main()
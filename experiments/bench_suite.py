@@ -0,0 +1,292 @@
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import resource
+import tempfile
+import functools
+import itertools
+import subprocess
+import multiprocessing
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+sys.path.append(os.path.dirname(__file__))
+
+# Parameterized benchmark suite for the memory architectures.
+# Every case (architecture x turns x STM size x store size) runs in a fresh
+# process so peak RSS and bytes written are attributable to that case alone.
+#
+#   python bench_suite.py --archs A,B,C,D --turns 10,100,1000 --stm 2,5 --store 0,10000 --out results.json
+#
+# Semantic tiers embed with a deterministic hashing function by default, which
+# keeps the suite offline and measures the memory system rather than the model;
+# pass --embedding default to use Chroma's default embedding model instead.
+#
+# Startup (import, construction, first get_context) is measured per architecture in a
+# fresh interpreter under `python -X importtime`; the heaviest top-level imports are
+# reported alongside. Skip it with --skip-startup.
+
+PHASES = ["add_message", "get_context", "consolidation", "persistence", "compaction", "semantic_flush"]
+
+class HashEmbedding:
+    """Deterministic bag-of-words hashing embedding (offline stand-in for MiniLM)."""
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            v = np.zeros(self.dim, dtype=np.float32)
+            for word in text.lower().split():
+                v[int(hashlib.md5(word.strip(".,?!").encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+            norm = np.linalg.norm(v)
+            vectors.append(v / norm if norm else v)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "bench-hash"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding(config.get("dim", 384))
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return None
+    a = np.asarray(samples_ms)
+    return {"count": len(a), "mean": round(float(a.mean()), 4), "p50": round(float(np.percentile(a, 50)), 4),
+            "p95": round(float(np.percentile(a, 95)), 4), "p99": round(float(np.percentile(a, 99)), 4)}
+
+def timed_phase(timings, phase, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[phase].append((time.perf_counter() - start) * 1000)
+    return wrapper
+
+def bytes_written():
+    # Linux only: bytes passed to write() syscalls by this process
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def build_memory(arch, stm_size, work_dir, embedding, llm, vector_store="chroma"):
+    from memory import ContextWindowMemory
+    from memory_episodic import EpisodicMemory
+    from memory_semantic import SemanticMemory
+    from memory_reflection import ReflectionMemory
+
+    file_path = os.path.join(work_dir, "episodes.json")
+    db_path = os.path.join(work_dir, "chroma")
+    semantic_kwargs = {} if embedding == "default" else {"embedding_function": HashEmbedding()}
+    semantic_kwargs["vector_store"] = vector_store
+    if arch == "A":
+        return ContextWindowMemory(window_size=stm_size)
+    if arch == "B":
+        return EpisodicMemory(llm, stm_size=stm_size, file_path=file_path)
+    if arch == "C":
+        return SemanticMemory(llm, stm_size=stm_size, file_path=file_path, db_path=db_path, **semantic_kwargs)
+    if arch == "D":
+        os.chdir(work_dir)  # reflections.txt is written to the working directory
+        return ReflectionMemory(llm, stm_size=stm_size, file_path=file_path, db_path=db_path, **semantic_kwargs)
+    raise ValueError(f"Unknown architecture: {arch}")
+
+def preload(memory, store_size):
+    """Seeds the long-term stores with `store_size` synthetic episodes / documents."""
+    from memory_episodic import Episode
+    if store_size <= 0 or not hasattr(memory, "episodes"):
+        return
+    start = time.time() - store_size * 600
+    for i in range(store_size):
+        memory._add_episode(Episode(id=f"seed-{i}", content=f"Seeded interaction {i} about topic{i % 500}",
+                                    keywords=[f"topic{i % 500}", f"seed{i}", "seeded"],
+                                    timestamp=start + i * 600, metadata={}))
+    memory.save_memory()
+    if hasattr(memory, "collection"):
+        for lo in range(0, store_size, 1000):
+            docs = [f"Seeded fact {i} about topic{i % 500}" for i in range(lo, min(store_size, lo + 1000))]
+            memory.collection.add(ids=[f"seed-{lo + j}" for j in range(len(docs))], documents=docs,
+                                  embeddings=memory.embedding_cache.embed(docs))
+
+def run_case(case):
+    """Runs one benchmark case (in its own process) and returns its metrics."""
+    import io
+    import contextlib
+    from benchmark import BenchmarkLLM
+    from agent import Message
+    from context_budget import TokenCounter
+
+    arch, turns, stm_size, store_size, embedding = (case[k] for k in ("arch", "turns", "stm_size", "store_size", "embedding"))
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{arch}_")
+    llm = BenchmarkLLM()
+    counter = TokenCounter()
+    timings = {phase: [] for phase in PHASES}
+    prompt_tokens = []
+    quiet = io.StringIO()
+
+    with contextlib.redirect_stdout(quiet):
+        memory = build_memory(arch, stm_size, work_dir, embedding, llm, case.get("vector_store", "chroma"))
+        preload(memory, store_size)
+
+        # Instrument the internal phases on this instance only
+        for phase, owner, attr in [("consolidation", memory, "_consolidate_memory"),
+                                   ("compaction", memory, "save_memory"),
+                                   ("semantic_flush", memory, "_flush_semantic"),
+                                   ("persistence", getattr(memory, "store", None), "append_many")]:
+            if owner is not None and hasattr(owner, attr):
+                setattr(owner, attr, timed_phase(timings, phase, getattr(owner, attr)))
+
+        script = ["The secret code is Blue_Falcon_99.", "I am putting the keys under the flower pot."]
+        script += [f"Distractor query number {i} to fill context." for i in range(max(0, turns - 4))]
+        script += ["What is the secret code?", "Where are the keys?"]
+        script = script[-turns:] if turns < len(script) else script
+
+        wchar_start = bytes_written()
+        start = time.perf_counter()
+        responses = []
+        for text in script:
+            t0 = time.perf_counter()
+            memory.add_message(Message(role="user", content=text))
+            timings["add_message"].append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            context = memory.get_context(current_query=text)
+            timings["get_context"].append((time.perf_counter() - t0) * 1000)
+
+            messages = [{"role": m.role, "content": m.content} for m in context]
+            prompt_tokens.append(sum(counter.count(m["content"]) + counter.MESSAGE_OVERHEAD for m in messages))
+            response = llm.generate_response(messages)
+            responses.append(response)
+
+            t0 = time.perf_counter()
+            memory.add_message(Message(role="assistant", content=response))
+            timings["add_message"].append((time.perf_counter() - t0) * 1000)
+        if hasattr(memory, "flush"):
+            memory.flush()
+        wall_s = time.perf_counter() - start
+        wchar_end = bytes_written()
+
+    recall = sum(1 for r in responses[-2:] if "blue_falcon_99" in r.lower() or "flower pot" in r.lower())
+    result = {
+        **case,
+        "wall_s": round(wall_s, 4),
+        "turns_per_s": round(len(script) / wall_s, 2) if wall_s else None,
+        "phases_ms": {phase: summarize(samples) for phase, samples in timings.items() if samples},
+        "prompt_tokens": summarize(prompt_tokens),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "bytes_written": (wchar_end - wchar_start) if wchar_start is not None else None,
+        "store_bytes": dir_size(work_dir),
+        "recall": f"{recall}/2",
+    }
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+ARCH_MODULES = {"A": "memory", "B": "memory_episodic", "C": "memory_semantic", "D": "memory_reflection"}
+
+STARTUP_SCRIPT = """
+import sys, time, json, tempfile
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from bench_suite import build_memory
+from benchmark import BenchmarkLLM
+from agent import Message
+memory = build_memory({arch!r}, 5, tempfile.mkdtemp(prefix="startup_"), {embedding!r}, BenchmarkLLM(), {vector_store!r})
+built = time.perf_counter()
+memory.add_message(Message(role="user", content="hello there"))
+memory.get_context(current_query="hello there")
+done = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "init_ms": (built - imported) * 1000,
+                  "first_context_ms": (done - built) * 1000}}))
+"""
+
+def measure_startup(arch, embedding, vector_store, top=3):
+    """Runs one architecture's cold start in a fresh interpreter and parses -X importtime."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(here, "../src"), here]))
+    script = STARTUP_SCRIPT.format(module=ARCH_MODULES[arch], arch=arch, embedding=embedding, vector_store=vector_store)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], capture_output=True, text=True,
+                          env=env, cwd=tempfile.mkdtemp(prefix="startup_"))
+    wall_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # "import time: self [us] | cumulative | imported package"; unindented names are top-level imports
+    imports = []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                imports.append((int(cumulative) / 1000, name.strip()))
+    imports.sort(reverse=True)
+    return {"arch": arch, "process_ms": round(wall_ms, 1), **{k: round(v, 1) for k, v in result.items()},
+            "heaviest_imports_ms": {name: round(ms, 1) for ms, name in imports[:top]}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory architecture benchmark suite")
+    parser.add_argument("--archs", default="A,B,C,D")
+    parser.add_argument("--turns", default="10,100,1000", help="Conversation lengths (user turns)")
+    parser.add_argument("--stm", default="2,5", help="STM / window sizes")
+    parser.add_argument("--store", default="0", help="Pre-seeded long-term store sizes")
+    parser.add_argument("--embedding", default="hash", choices=["hash", "default"])
+    parser.add_argument("--vector-store", default="chroma", choices=["chroma", "local"])
+    parser.add_argument("--skip-startup", action="store_true", help="Skip the cold start measurements")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    cases = [{"arch": a, "turns": int(t), "stm_size": int(s), "store_size": int(n), "embedding": args.embedding,
+              "vector_store": args.vector_store}
+             for a, t, s, n in itertools.product(args.archs.split(","), args.turns.split(","),
+                                                 args.stm.split(","), args.store.split(","))]
+
+    startup = []
+    if not args.skip_startup:
+        print(f"{'Arch':<4} | {'process ms':>10} | {'import ms':>9} | {'init ms':>8} | {'1st ctx ms':>10} | heaviest imports (ms)")
+        print("-" * 96)
+        for arch in args.archs.split(","):
+            r = measure_startup(arch, args.embedding, args.vector_store)
+            startup.append(r)
+            heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in r["heaviest_imports_ms"].items())
+            print(f"{arch:<4} | {r['process_ms']:>10.0f} | {r['import_ms']:>9.0f} | {r['init_ms']:>8.0f} | "
+                  f"{r['first_context_ms']:>10.0f} | {heaviest}")
+        print()
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'Arch':<4} | {'Turns':>7} | {'STM':>3} | {'Store':>7} | {'add p99':>8} | {'ctx p99':>8} | "
+          f"{'tokens p95':>10} | {'RSS MB':>7} | {'written':>10} | {'recall':>6}")
+    print("-" * 96)
+    for case in cases:
+        with ctx.Pool(1) as pool:
+            r = pool.apply(run_case, (case,))
+        results.append(r)
+        phases = r["phases_ms"]
+        print(f"{r['arch']:<4} | {r['turns']:>7} | {r['stm_size']:>3} | {r['store_size']:>7} | "
+              f"{phases['add_message']['p99']:>8.3f} | {phases['get_context']['p99']:>8.3f} | "
+              f"{r['prompt_tokens']['p95']:>10.0f} | {r['peak_rss_mb']:>7.1f} | {r['bytes_written'] or 0:>10} | {r['recall']:>6}")
+
+    with open(args.out, "w") as f:
+        json.dump({"created": time.time(), "python": sys.version.split()[0], "startup": startup,
+                   "results": results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.out}")
+
+if __name__ == "__main__":
+    main()
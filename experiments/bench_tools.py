@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import time
+import argparse
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import BaseAgent
+from memory import ContextWindowMemory
+from tools import ToolExecutor, ToolCall, calculator, compile_expression
+
+# Usage: python bench_tools.py --calls 4 --tool-ms 100 --turns 10
+# 1. Calculator: per-call cost of eval() vs the cached, compiled AST evaluator.
+# 2. Agent turns where the LLM requests --calls I/O tool calls (--tool-ms each) plus a
+#    calculator call, optionally with one more call that overruns the timeout: sequential
+#    execution vs ToolExecutor (concurrent, per-tool timeout, memoized). The first turn is
+#    cold; repeated turns are served from the memo (a timed-out call is retried).
+
+EXPRESSIONS = ["2 + 3 * 4", "(1 + 2) ** 8 / 7", "sqrt(144) + 3.5 * 2", "max(3, 9, 4) - min(1, 2) % 5", "17 // 3 + 2 ** 10"]
+
+def bench_calculator(repeat):
+    def with_eval():
+        for e in EXPRESSIONS:
+            str(eval(e, {"__builtins__": {}, "sqrt": __import__("math").sqrt, "max": max, "min": min}))
+    def compiled():
+        for e in EXPRESSIONS:
+            calculator(e)
+    for label, fn in (("eval()", with_eval), ("compiled + cached", compiled)):
+        seconds = min(timeit.repeat(fn, number=repeat, repeat=3))
+        print(f"{label:<20} | {seconds * 1e6 / (repeat * len(EXPRESSIONS)):>8.2f} us/call")
+    info = compile_expression.cache_info()
+    print(f"parse cache: {info.hits} hits, {info.misses} misses")
+
+class ToolCallingLLM:
+    """Requests the same tool calls on every turn, then answers from the results."""
+    def __init__(self, calls):
+        self.request = json.dumps({"tool_calls": [{"name": c.name, "arguments": c.arguments} for c in calls]})
+
+    def generate_response(self, messages, temperature=0.7):
+        if messages[-1]["content"].startswith("Tool results:"):
+            return "Answer based on: " + messages[-1]["content"].splitlines()[1]
+        return self.request
+
+def make_tools(tool_ms, slow_ms):
+    def lookup(argument: str) -> str:
+        """Simulated I/O-bound lookup."""
+        time.sleep((slow_ms if argument == "slow" else tool_ms) / 1000)
+        return f"data for {argument}"
+    return {"lookup": lookup, "calculator": calculator}
+
+class SequentialExecutor(ToolExecutor):
+    """Baseline: one call after another, no timeout and no memo."""
+    def run(self, calls):
+        return [self.tools[c.name](c.arguments) for c in calls]
+
+def bench_agent(n_calls, tool_ms, turns, timeout_ms, slow):
+    tools = make_tools(tool_ms, slow_ms=timeout_ms * 3)
+    calls = [ToolCall("lookup", f"item-{i}") for i in range(n_calls)] + [ToolCall("calculator", "6 * 7")]
+    if slow:
+        calls.append(ToolCall("lookup", "slow"))
+    for label in ("sequential", "concurrent"):
+        agent = BaseAgent("ToolBot", ContextWindowMemory(window_size=4), ToolCallingLLM(calls), tools,
+                          tool_timeout=timeout_ms / 1000)
+        if label == "sequential":
+            agent.tool_executor = SequentialExecutor(tools)
+        timings = []
+        for turn in range(turns):
+            start = time.perf_counter()
+            agent.run(f"Question {turn}")
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<12} | {'yes' if slow else 'no':>9} | {len(calls):>5} | {timings[0]:>13.1f} | "
+              f"{sum(timings[1:]) / max(1, turns - 1):>15.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool execution benchmark")
+    parser.add_argument("--calls", type=int, default=4, help="I/O tool calls per step")
+    parser.add_argument("--tool-ms", type=float, default=100)
+    parser.add_argument("--timeout-ms", type=float, default=300)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_calculator(args.repeat)
+    print(f"\n{'Executor':<12} | {'Overrun':>9} | {'Calls':>5} | {'First turn ms':>13} | {'Repeat turn ms':>15}")
+    print("-" * 67)
+    for slow in (False, True):
+        bench_agent(args.calls, args.tool_ms, args.turns, args.timeout_ms, slow)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from vector_store import LocalVectorClient, open_vector_client
+
+# Usage: python bench_vector_store.py --sizes 10000,100000,1000000 --dim 384 --backends flat,ivf,chroma
+# recall@k (against an exact NumPy scan) and per-query latency for the vector store backends.
+# Vectors are drawn around random cluster centres (embeddings of real text are clustered too);
+# uniformly random vectors have no neighbourhood structure and understate any ANN index.
+
+def make_data(n, dim, queries, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    def draw(count):
+        x = centres[rng.integers(0, clusters, count)] + 1.0 * rng.standard_normal((count, dim)).astype(np.float32)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+    data = np.concatenate([draw(min(100000, n - lo)) for lo in range(0, n, 100000)])
+    return data, draw(queries)
+
+def exact_top_k(data, queries, k):
+    # Cosine on normalized vectors: highest dot product first
+    best = np.zeros((len(queries), 0), dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for lo in range(0, len(data), 100000):
+        scores = queries @ data[lo:lo + 100000].T
+        cand = np.concatenate([best, np.argpartition(-scores, k - 1, axis=1)[:, :k] + lo], axis=1)
+        cand_scores = np.concatenate([best_scores, np.take_along_axis(scores, cand[:, best.shape[1]:] - lo, axis=1)], axis=1)
+        order = np.argsort(-cand_scores, axis=1)[:, :k]
+        best, best_scores = np.take_along_axis(cand, order, axis=1), np.take_along_axis(cand_scores, order, axis=1)
+    return best
+
+def dir_mb(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 2**20
+
+def run(backend, data, queries, truth, k, work_dir, nprobes):
+    """Builds the store once, then yields (label, stats) per nprobe setting (IVF) or once."""
+    path = os.path.join(work_dir, backend)
+    if backend == "chroma":
+        client = open_vector_client("chroma", path)
+        batch = client.get_max_batch_size()
+    else:
+        client = LocalVectorClient(path, index=backend, ivf_threshold=0)
+        batch = 100000
+    start = time.perf_counter()
+    collection = client.get_or_create_collection("bench", embedding_function=None,
+                                                 configuration={"hnsw": {"space": "cosine"}})
+    for lo in range(0, len(data), batch):
+        collection.add(ids=[str(i) for i in range(lo, min(lo + batch, len(data)))], embeddings=data[lo:lo + batch])
+    build_s = time.perf_counter() - start
+
+    for nprobe in (nprobes if backend == "ivf" else [None]):
+        if nprobe:
+            collection.nprobe = nprobe
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            t = time.perf_counter()
+            result = collection.query(query_embeddings=[q], n_results=k)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits += len(set(int(i) for i in result["ids"][0]) & set(expected.tolist()))
+        yield (f"ivf/{nprobe}" if nprobe else backend,
+               {"build_s": build_s, "p50": np.percentile(latencies, 50), "p95": np.percentile(latencies, 95),
+                "recall": hits / (len(queries) * k), "disk_mb": dir_mb(path)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store recall/latency benchmark")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default="flat,ivf,chroma")
+    parser.add_argument("--nprobe", default="8,32,128", help="IVF lists probed per query")
+    args = parser.parse_args()
+
+    print(f"{'Vectors':>9} | {'Backend':<12} | {'Build s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | "
+          f"{'Recall@' + str(args.k):>9} | {'Disk MB':>8}")
+    print("-" * 80)
+    for n in [int(s) for s in args.sizes.split(",")]:
+        data, queries = make_data(n, args.dim, args.queries, clusters=max(16, n // 50))
+        truth = exact_top_k(data, queries, args.k)
+        for backend in args.backends.split(","):
+            work_dir = tempfile.mkdtemp(prefix="vectors_")
+            for label, r in run(backend, data, queries, truth, args.k, work_dir,
+                                [int(p) for p in args.nprobe.split(",")]):
+                print(f"{n:>9} | {label:<12} | {r['build_s']:>8.1f} | {r['p50']:>7.2f} | {r['p95']:>7.2f} | "
+                      f"{r['recall']:>9.3f} | {r['disk_mb']:>8.0f}")
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import sys
+import os
+import io
+import json
+import time
+import asyncio
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from agent import BaseAgent
+from memory import ContextWindowMemory
+from llm import LLMClient, AsyncLLMClient
+
+# Usage: python load_test_async.py [sessions] [turns] [latency_ms] [max_concurrency]
+# Starts a local OpenAI-compatible mock server (what an Ollama stand-in looks like to
+# the client) and drives many concurrent BaseAgent.arun sessions against it.
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse is observable
+    latency_s = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency_s)
+        reply = f"Echo: {body['messages'][-1]['content']}"
+        if body.get("stream"):
+            chunks = [{"id": "mock", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                       "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                      for word in reply.split()]
+            payload = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            payload = json.dumps({
+                "id": "mock", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+            content_type = "application/json"
+        data = payload.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(latency_ms):
+    MockChatHandler.latency_s = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockChatHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def run_sync_baseline(base_url, turns):
+    llm = LLMClient(provider="ollama", model="mock", base_url=base_url)
+    agent = BaseAgent("Sync", ContextWindowMemory(window_size=4), llm)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(turns):
+        t0 = time.perf_counter()
+        agent.run(f"Turn {i}")
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, time.perf_counter() - start
+
+async def run_async_load(base_url, sessions, turns, max_concurrency, stream):
+    llm = AsyncLLMClient(provider="ollama", model="mock", base_url=base_url, max_concurrency=max_concurrency)
+    latencies = []
+
+    async def session(i):
+        agent = BaseAgent(f"S{i}", ContextWindowMemory(window_size=4), llm)
+        for t in range(turns):
+            t0 = time.perf_counter()
+            response = await agent.arun(f"Session {i} turn {t}", on_token=(lambda tok: None) if stream else None)
+            assert response.startswith("Echo:"), response
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    await llm.aclose()
+    return latencies, elapsed
+
+def report(label, latencies, elapsed):
+    print(f"{label:<22} | {len(latencies):>6} | {len(latencies) / elapsed:>9.1f} | "
+          f"{percentile(latencies, 50):>8.1f} | {percentile(latencies, 99):>8.1f}")
+
+def main(sessions=200, turns=3, latency_ms=50, max_concurrency=64):
+    server, base_url = start_server(latency_ms)
+    print(f"Mock server at {base_url} ({latency_ms}ms per completion)")
+    print(f"{'Mode':<22} | {'Turns':>6} | {'Turns/s':>9} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 66)
+    with contextlib.redirect_stdout(io.StringIO()) as quiet:
+        sync = run_sync_baseline(base_url, min(50, sessions * turns))
+        plain = asyncio.run(run_async_load(base_url, sessions, turns, max_concurrency, stream=False))
+        streamed = asyncio.run(run_async_load(base_url, sessions, turns, max_concurrency, stream=True))
+    report("sync run()", *sync)
+    report(f"arun() x{sessions}", *plain)
+    report(f"arun() x{sessions} stream", *streamed)
+    server.shutdown()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -23,12 +23,14 @@ def main():
             return "Mock Response"
 
     # Initialize Memory
-    # Using a test path for Chroma
+    # Using a test path for Chroma. Context dedup is off: it would drop a semantic hit
+    # that an STM turn or an episodic summary already carries, hiding it from this check
     memory = SemanticMemory(
         llm_client=MockLLM(), 
         stm_size=2, 
         file_path="episodic_test.json",
-        db_path="./chroma_db_test"
+        db_path="./chroma_db_test",
+        context_dedup=False
     )
     
     agent = BaseAgent(name="ArchC_Bot", memory_system=memory, llm_client=MockLLM())
@@ -0,0 +1,177 @@
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from memory_episodic import EpisodicMemory, Episode
+from episode_store import EpisodeSnapshot
+
+# Crash-recovery checks for the episodic store (snapshot + journal, src/episode_store.py):
+# torn journal tails, a crash mid-compaction (journal generation != snapshot generation)
+# and migration of the legacy single-array JSON file. Any failure raises AssertionError.
+
+def check(label, ok):
+    print(f"  [{'ok' if ok else 'FAIL'}] {label}")
+    assert ok, label
+
+def make_episodes(prefix, n, start):
+    return [Episode(id=f"{prefix}-{i}", content=f"{prefix} note {i}", keywords=[prefix, f"topic{i}"],
+                    timestamp=start + i, metadata={}) for i in range(n)]
+
+def open_memory(path):
+    return EpisodicMemory(None, file_path=path)
+
+def ids(memory):
+    return [ep.id for ep in memory.episodes]
+
+def reopen(memory, path):
+    memory.store.close()
+    return open_memory(path)
+
+def in_work_dir(check_fn):
+    work_dir = tempfile.mkdtemp(prefix="episode_store_")
+    try:
+        check_fn(work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _torn_tail(work_dir):
+    print("\n--- Torn journal tail ---")
+    path = os.path.join(work_dir, "torn.json")
+    memory = open_memory(path)
+    memory._commit_episodes(make_episodes("torn", 3, time.time()))
+    good_size = os.path.getsize(path)
+    with open(path, "a") as f:
+        f.write('{"id": "torn-3", "content": "half writ')  # Crash mid-append
+    memory = reopen(memory, path)
+    check("complete records survive a partial tail", ids(memory) == ["torn-0", "torn-1", "torn-2"])
+    check("partial tail truncated away", os.path.getsize(path) == good_size)
+    memory._commit_episodes(make_episodes("after", 1, time.time()))
+    memory = reopen(memory, path)
+    check("appends after recovery load cleanly", ids(memory) == ["torn-0", "torn-1", "torn-2", "after-0"])
+
+    # A complete last record that lost its newline is kept, and the next append starts a new line
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        f.truncate()
+    memory = reopen(memory, path)
+    check("record without trailing newline kept", ids(memory)[-1] == "after-0")
+    memory._commit_episodes(make_episodes("next", 1, time.time()))
+    memory = reopen(memory, path)
+    check("append after a missing newline is not merged into it", ids(memory)[-2:] == ["after-0", "next-0"])
+
+    # A corrupt record in the middle is skipped, the records around it are kept
+    with open(path, "r") as f:
+        lines = f.readlines()
+    lines.insert(1, "{not json}\n")
+    with open(path, "w") as f:
+        f.writelines(lines)
+    memory = reopen(memory, path)
+    check("corrupt middle record skipped", len(memory.episodes) == 5)
+    memory.store.close()
+
+def _crash_mid_compaction(work_dir):
+    print("\n--- Crash mid-compaction ---")
+    path = os.path.join(work_dir, "compact.json")
+    memory = open_memory(path)
+    now = time.time()
+    memory._commit_episodes(make_episodes("snap", 4, now))
+    memory.save_memory()
+    memory._commit_episodes(make_episodes("tail", 2, now + 10))
+    expected = ids(memory)
+    old_generation = memory.store.snapshot.generation
+    records = list(memory.episodes.records())
+    memory.store.close()
+
+    # Crash before the new snapshot was renamed into place: only its temp file exists
+    with open(path + ".snap.tmp", "wb") as f:
+        f.write(b"partial snapshot")
+    memory = open_memory(path)
+    check("journal matching the snapshot is replayed", ids(memory) == expected)
+    check("journal still continues the old snapshot", memory.store.journal.generation == old_generation)
+    memory.store.close()
+    os.remove(path + ".snap.tmp")
+
+    # Crash after the new snapshot was swapped in but before the journal was reset
+    EpisodeSnapshot.write(path + ".snap", records, "f" * 32)
+    memory = open_memory(path)
+    check("stale journal not replayed on top of the snapshot (no duplicates)", ids(memory) == expected)
+    check("journal reset to the new snapshot's generation", memory.store.journal.generation == "f" * 32)
+    results = memory._retrieve_episodes("tail topic1")
+    check("keyword index rebuilt from the snapshot", results and results[0].id == "tail-1")
+    memory._commit_episodes(make_episodes("later", 1, now + 20))
+    memory = reopen(memory, path)
+    check("appends after recovery survive a reload", ids(memory) == expected + ["later-0"])
+    memory.store.close()
+
+def _legacy_migration(work_dir):
+    print("\n--- Legacy JSON migration ---")
+    path = os.path.join(work_dir, "legacy.json")
+    episodes = make_episodes("legacy", 5, time.time())
+    with open(path, "w") as f:
+        json.dump([ep.to_dict() for ep in episodes], f, indent=4)
+    memory = open_memory(path)
+    check("legacy episodes loaded", ids(memory) == [ep.id for ep in episodes])
+    check("contents and keywords intact", [ep.to_dict() for ep in memory.episodes] == [ep.to_dict() for ep in episodes])
+    check("snapshot written", os.path.exists(path + ".snap"))
+    with open(path) as f:
+        first = f.read().lstrip()[:1]
+    check("journal rewritten in the new format", first == "{" and not memory.store.is_legacy)
+    memory = reopen(memory, path)
+    check("migrated store reloads the same episodes", ids(memory) == [ep.id for ep in episodes])
+    results = memory._retrieve_episodes("legacy topic3")
+    check("migrated episodes are indexed", results and results[0].id == "legacy-3")
+    memory.store.close()
+
+    # Keywords as the original extraction wrote them: whitespace tokens longer than 4
+    # characters, role prefixes and punctuation included
+    path = os.path.join(work_dir, "legacy_raw.json")
+    start = time.time() - 3600
+    turns = [["user: I need a refund for my ticket?", "assistant: Sure, which booking?"],
+             ["user: My passport number is X1234567.", "assistant: Noted, thanks."],
+             ["user: Remind me about Café Müller tomorrow!", "assistant: Will do."]]
+    records = []
+    for i, lines in enumerate(turns):
+        text_block = "\n".join(lines)
+        records.append({"id": f"raw-{i}", "content": f"Interaction loop where user said: {lines[0][6:]}",
+                        "keywords": [w for w in text_block.split() if len(w) > 4],
+                        "timestamp": start + i, "metadata": {}})
+    check("legacy keywords carry punctuation", "ticket?" in records[0]["keywords"] and "user:" in records[0]["keywords"])
+    with open(path, "w") as f:
+        json.dump(records, f)
+    memory = open_memory(path)
+    keywords = memory.episodes[0].keywords
+    check(f"keywords re-extracted on migration: {keywords}",
+          "ticket" in keywords and "refund" in keywords and "ticket?" not in keywords
+          and not {"user", "user:", "assistant", "assistant:"} & set(keywords))
+    for query, expected in [("Can I get a refund on the ticket?", "raw-0"), ("What is my passport number?", "raw-1"),
+                            ("Where is Café Müller?", "raw-2")]:
+        results = memory._retrieve_episodes(query, top_k=1)
+        check(f"'{query}' finds {expected}", results and results[0].id == expected)
+    memory = reopen(memory, path)
+    check("re-extracted keywords persist", memory.episodes[0].keywords == keywords)
+    memory.store.close()
+
+def test_torn_tail():
+    in_work_dir(_torn_tail)
+
+def test_crash_mid_compaction():
+    in_work_dir(_crash_mid_compaction)
+
+def test_legacy_migration():
+    in_work_dir(_legacy_migration)
+
+def main():
+    print("Testing episodic store crash recovery...")
+    test_torn_tail()
+    test_crash_mid_compaction()
+    test_legacy_migration()
+    print("\nAll episode store checks passed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import sys
+import os
+import time
+import threading
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
+
+from tools import ToolExecutor, ToolCall, calculator
+
+# Checks the calculator's AST whitelist and power guards, and ToolExecutor's
+# concurrency, per-tool timeouts and memoization. Any failure raises AssertionError.
+
+def check(label, ok):
+    print(f"  [{'ok' if ok else 'FAIL'}] {label}")
+    assert ok, label
+
+def test_calculator():
+    print("\n--- Calculator: arithmetic and functions ---")
+    cases = {
+        "2 + 3 * 4": "14",
+        "(1 + 2) ** 8 / 7": str((1 + 2) ** 8 / 7),
+        "sqrt(144) + 3.5 * 2": "19.0",
+        "max(3, 9, 4) - min(1, 2) % 5": "8",
+        "17 // 3 + 2 ** 10": "1029",
+        "-2 ** 2": "-4",
+        "1 < 2 <= 2": "True",
+        "round(pi, 2)": "3.14",
+        "abs(-7) + floor(2.5) + ceil(2.5)": "12",
+    }
+    for expression, expected in cases.items():
+        result = calculator(expression)
+        check(f"{expression} = {result}", result == expected)
+
+    print("\n--- Calculator: rejected input ---")
+    for expression in ['__import__("os")', '__import__("os").system("echo hi")', "(1).real",
+                       "().__class__", "True", "'a' * 3", "x + 1", "[1, 2]", "lambda: 1",
+                       "max(*[1, 2])", "round(1.5, ndigits=0)"]:
+        result = calculator(expression)
+        check(f"{expression} -> {result}", result.startswith("Error: Unsupported expression"))
+    result = calculator("1 +")
+    check(f"syntax error -> {result}", result.startswith("Error"))
+
+    print("\n--- Calculator: power guards ---")
+    for expression in ["9**9**9", "(10**1000)**1000", "2 ** 100000", "2 ** -100000"]:
+        start = time.perf_counter()
+        result = calculator(expression)
+        elapsed = time.perf_counter() - start
+        check(f"{expression} -> {result} ({elapsed * 1000:.1f} ms)",
+              result.startswith("Error: Exponent too large") and elapsed < 0.5)
+    check("2 ** 64 still works", calculator("2 ** 64") == str(2 ** 64))
+
+def test_executor():
+    calls = {"lookup": 0, "flaky": 0}
+    lock = threading.Lock()
+
+    def lookup(argument: str) -> str:
+        """Slow lookup."""
+        with lock:
+            calls["lookup"] += 1
+        time.sleep(0.2)
+        return f"data for {argument}"
+
+    def slow(argument: str) -> str:
+        """Overruns its timeout."""
+        time.sleep(1.0)
+        return "too late"
+
+    def flaky(argument: str) -> str:
+        """Fails every time."""
+        with lock:
+            calls["flaky"] += 1
+        return "Error: upstream unavailable"
+
+    executor = ToolExecutor({"lookup": lookup, "slow": slow, "flaky": flaky, "calculator": calculator},
+                            timeout=2.0, tool_timeouts={"slow": 0.1}, cache_ttl=0.5)
+
+    print("\n--- ToolExecutor: concurrency and order ---")
+    step = [ToolCall("lookup", f"item-{i}") for i in range(3)] + [ToolCall("calculator", "6 * 7")]
+    start = time.perf_counter()
+    results = executor.run(step)
+    elapsed = time.perf_counter() - start
+    check(f"3 x 200 ms lookups ran concurrently ({elapsed * 1000:.0f} ms)", elapsed < 0.5)
+    check("results in call order", results == ["data for item-0", "data for item-1", "data for item-2", "42"])
+
+    print("\n--- ToolExecutor: timeout ---")
+    start = time.perf_counter()
+    results = executor.run([ToolCall("slow", "x"), ToolCall("calculator", "1 + 1")])
+    elapsed = time.perf_counter() - start
+    check(f"slow tool -> {results[0]}", results[0] == "Error: slow timed out after 0.1s")
+    check(f"step not held up by the slow tool ({elapsed * 1000:.0f} ms)", elapsed < 0.5)
+    check("other results still returned", results[1] == "2")
+
+    print("\n--- ToolExecutor: memoization ---")
+    before = calls["lookup"]
+    start = time.perf_counter()
+    results = executor.run([ToolCall("lookup", "item-0"), ToolCall("lookup", "item-0")])
+    check(f"repeated call served from the memo ({(time.perf_counter() - start) * 1000:.1f} ms)",
+          calls["lookup"] == before and results == ["data for item-0"] * 2)
+    results = executor.run([ToolCall("lookup", "fresh"), ToolCall("lookup", "fresh")])
+    check("identical calls within one step run once", calls["lookup"] == before + 1)
+    executor.run([ToolCall("flaky", "x")])
+    executor.run([ToolCall("flaky", "x")])
+    check("errors are not memoized", calls["flaky"] == 2)
+    time.sleep(0.6)
+    executor.run([ToolCall("lookup", "item-0")])
+    check("entries expire after cache_ttl", calls["lookup"] == before + 2)
+    check("unknown tool reported", executor.run([ToolCall("nope", "")]) == ["Error: unknown tool 'nope'"])
+
+def main():
+    print("Testing tools (calculator + ToolExecutor)...")
+    test_calculator()
+    test_executor()
+    print("\nAll tool checks passed.")
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,74 @@
 import json
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, field
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, Callable, Union
 from datetime import datetime
 import uuid
+from tracing import get_tracer
+from tools import ToolExecutor, parse_tool_calls
 
-@dataclass
 class Message:
-    role: str
-    content: str
-    timestamp: datetime = field(default_factory=datetime.now)
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    """
+    A chat message. Slotted, with the timestamp held as a float plus its tzinfo (read
+    back as a datetime in the same zone) and the metadata dict only allocated once it
+    is used, since long histories hold many of these.
+    """
+    __slots__ = ("role", "content", "_timestamp", "_tz", "_metadata")
+
+    def __init__(self, role: str, content: str, timestamp: Union[datetime, float] = None,
+                 metadata: Dict[str, Any] = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.metadata = metadata
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self._timestamp, self._tz)
+
+    @timestamp.setter
+    def timestamp(self, value: Union[datetime, float]):
+        if isinstance(value, datetime):
+            self._timestamp, self._tz = value.timestamp(), value.tzinfo
+        else:
+            self._timestamp, self._tz = float(value), None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {}  # Created on first access, so callers can mutate it
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]):
+        self._metadata = value  # Kept as passed (even when empty), so the caller's dict stays live
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.role, self.content, self._timestamp, self._metadata or {}) == \
+            (other.role, other.content, other._timestamp, other._metadata or {})
+
+    def __repr__(self):
+        return f"Message(role={self.role!r}, content={self.content!r}, timestamp={self.timestamp!r}, metadata={self._metadata or {}!r})"
 
     def to_dict(self):
         return {
             "role": self.role,
             "content": self.content,
             "timestamp": self.timestamp.isoformat(),
-            "metadata": self.metadata
+            "metadata": self._metadata or {}
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        return cls(
+            role=data["role"],
+            content=data["content"],
+            timestamp=datetime.fromisoformat(data["timestamp"]) if data.get("timestamp") else datetime.now(),
+            metadata=data.get("metadata") or None
+        )
+
 class MemoryInterface:
     def add_message(self, message: Message):
         raise NotImplementedError
@@ -30,11 +80,21 @@ class MemoryInterface:
         raise NotImplementedError
 
 class BaseAgent:
-    def __init__(self, name: str, memory_system: MemoryInterface, llm_client, tools: List[Any] = None):
+    """
+    With `tools` (TOOLS names, callables or a name -> callable dict), the LLM may answer
+    with a tool-call request instead (see tools.parse_tool_calls). The requested calls run
+    concurrently on a ToolExecutor (per-tool timeouts, memoized results), their results are
+    sent back, and this repeats for up to `max_tool_rounds` before the answer is taken as is.
+    Only the user input and the final answer are stored in memory.
+    """
+    def __init__(self, name: str, memory_system: MemoryInterface, llm_client, tools: List[Any] = None,
+                 tool_timeout: float = 10.0, tool_timeouts: Dict[str, float] = None, max_tool_rounds: int = 3):
         self.name = name
         self.memory = memory_system
         self.llm_client = llm_client
         self.tools = tools or []
+        self.tool_executor = ToolExecutor(self.tools, tool_timeout, tool_timeouts) if self.tools else None
+        self.max_tool_rounds = max_tool_rounds
         self.conversation_id = str(uuid.uuid4())
 
     def run(self, user_input: str) -> str:
@@ -42,30 +102,110 @@ class BaseAgent:
         Main execution loop:
         1.  Format input
         2.  Retrieve context from memory
-        3.  Call LLM
+        3.  Call LLM (running any tool calls it requests)
         4.  Store interaction
         5.  Return response
         """
+        tracer = get_tracer()
+        tracer.count("agent.turns")
+
         # 1. Input message
         user_msg = Message(role="user", content=user_input)
-        self.memory.add_message(user_msg)
+        with tracer.span("agent.memory_write"):
+            self.memory.add_message(user_msg)
 
         # 2. Retrieve Context
-        context = self.memory.get_context(current_query=user_input)
+        with tracer.span("agent.get_context"):
+            context = self.memory.get_context(current_query=user_input)
+        tracer.count("agent.context_messages", len(context))
         
         # 3. LLM Call
-        # Convert Message objects to dicts for the LLM client
-        messages = [{"role": m.role, "content": m.content} for m in context]
+        messages = self._build_messages(context)
+        print(f"[{self.name}] Thinking with {len(context)} messages context...")
+        with tracer.span("agent.llm"):
+            response_content = self.llm_client.generate_response(messages)
+        for _ in range(self.max_tool_rounds if self.tool_executor else 0):
+            calls = parse_tool_calls(response_content)
+            if not calls:
+                break
+            with tracer.span("agent.tools"):
+                results = self.tool_executor.run(calls)
+            messages += self._tool_messages(response_content, calls, results)
+            with tracer.span("agent.llm"):
+                response_content = self.llm_client.generate_response(messages)
         
-        # Insert System Prompt if needed (optional, logic can be added here)
-        system_prompt = {"role": "system", "content": f"You are {self.name}, a helpful AI assistant."}
-        messages.insert(0, system_prompt)
+        # 4. Store Response
+        agent_msg = Message(role="assistant", content=response_content)
+        with tracer.span("agent.memory_write"):
+            self.memory.add_message(agent_msg)
+
+        return response_content
 
+    async def arun(self, user_input: str, on_token: Callable[[str], None] = None) -> str:
+        """
+        Async version of run() for an AsyncLLMClient, so one event loop can serve
+        many sessions. Memory calls run in worker threads to keep the loop free.
+        With `on_token`, the response is streamed and each delta is passed to it.
+        """
+        tracer = get_tracer()
+        tracer.count("agent.turns")
+
+        # 1. Input message
+        user_msg = Message(role="user", content=user_input)
+        with tracer.span("agent.memory_write"):
+            await asyncio.to_thread(self.memory.add_message, user_msg)
+
+        # 2. Retrieve Context
+        with tracer.span("agent.get_context"):
+            context = await asyncio.to_thread(self.memory.get_context, user_input)
+        tracer.count("agent.context_messages", len(context))
+
+        # 3. LLM Call
+        messages = self._build_messages(context)
         print(f"[{self.name}] Thinking with {len(context)} messages context...")
-        response_content = self.llm_client.generate_response(messages)
-        
+        with tracer.span("agent.llm"):
+            if on_token:
+                parts = []
+                async for token in self.llm_client.astream_response(messages):
+                    on_token(token)
+                    parts.append(token)
+                response_content = "".join(parts)
+            else:
+                response_content = await self.llm_client.agenerate_response(messages)
+        for _ in range(self.max_tool_rounds if self.tool_executor else 0):
+            calls = parse_tool_calls(response_content)
+            if not calls:
+                break
+            with tracer.span("agent.tools"):
+                results = await asyncio.to_thread(self.tool_executor.run, calls)
+            messages += self._tool_messages(response_content, calls, results)
+            with tracer.span("agent.llm"):
+                response_content = await self.llm_client.agenerate_response(messages)
+
         # 4. Store Response
         agent_msg = Message(role="assistant", content=response_content)
-        self.memory.add_message(agent_msg)
+        with tracer.span("agent.memory_write"):
+            await asyncio.to_thread(self.memory.add_message, agent_msg)
 
         return response_content
+
+    def _build_messages(self, context: List[Message]) -> List[dict]:
+        # Convert Message objects to dicts for the LLM client
+        messages = [{"role": m.role, "content": m.content} for m in context]
+        
+        # Insert System Prompt if needed (optional, logic can be added here)
+        system_prompt = {"role": "system", "content": f"You are {self.name}, a helpful AI assistant."}
+        if self.tool_executor:
+            system_prompt["content"] += (
+                "\nYou can use these tools, each taking one string argument:\n" + self.tool_executor.describe() +
+                '\nTo use them, reply with only {"tool_calls": [{"name": "<tool>", "arguments": "<argument>"}, ...]}; '
+                "list every call you need at once, they run in parallel."
+            )
+        messages.insert(0, system_prompt)
+        return messages
+
+    def _tool_messages(self, request: str, calls: List[Any], results: List[str]) -> List[dict]:
+        # The model's tool request and the results, in call order
+        lines = [f"[{i}] {c.name}({c.arguments}) -> {r}" for i, (c, r) in enumerate(zip(calls, results), 1)]
+        return [{"role": "assistant", "content": request},
+                {"role": "system", "content": "Tool results:\n" + "\n".join(lines)}]
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import uuid
+import multiprocessing
+import numpy as np
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+from agent import Message
+from memory_episodic import EpisodicMemory
+from memory_semantic import SemanticMemory
+
+# Worker-process state, set once per worker by _init_worker
+_builder: Optional[EpisodicMemory] = None
+_embedding_function = None
+
+
+def plan_chunks(lines: Iterable[str], stm_size: int) -> Iterator[List[str]]:
+    """
+    Splits one transcript into the chunks add_message would have consolidated:
+    whenever more than 2 * stm_size messages are pending, the oldest stm_size + 1
+    become an episode. The leftover tail (the conversation is over) is one last chunk.
+    """
+    pending: List[str] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        pending.append(line)
+        if len(pending) > stm_size * 2:
+            yield pending[:stm_size + 1]
+            pending = pending[stm_size + 1:]
+    if pending:
+        yield pending
+
+
+def _init_worker(memory_class, llm_factory, embedding_function, keyword_extractor=None):
+    global _builder, _embedding_function
+    _builder = memory_class.episode_builder(llm_factory() if llm_factory else None)
+    if keyword_extractor is not None:
+        _builder.keyword_extractor = keyword_extractor  # Same terms as the memory's queries
+    _embedding_function = embedding_function
+
+
+def _build_batch(chunks: List[List[str]]) -> Dict[str, Any]:
+    """Parses, summarizes and embeds a batch of chunks (runs in a worker)."""
+    episodes, documents, metadatas = [], [], []
+    messages_seen = 0
+    for chunk in chunks:
+        messages = [Message.from_dict(json.loads(line)) for line in chunk]
+        messages_seen += len(messages)
+        # Historical time, so decay ranks backfilled episodes as it would have live
+        episodes.append(_builder._build_episode(messages, messages[-1].timestamp.timestamp()))
+        for m in messages:
+            if m.role == "user":
+                documents.append(m.content)
+                metadatas.append({"role": m.role, "timestamp": m.timestamp.isoformat()})
+    embeddings = None
+    if _embedding_function is not None and documents:
+        embeddings = np.asarray(_embedding_function(documents), dtype=np.float32)
+    return {"messages": messages_seen, "episodes": episodes, "documents": documents,
+            "metadatas": metadatas, "embeddings": embeddings}
+
+
+def _iter_tasks(paths: List[str], stm_size: int, chunks_per_task: int) -> Iterator[List[List[str]]]:
+    task: List[List[str]] = []
+    for path in paths:
+        with open(path, "r") as f:
+            for chunk in plan_chunks(f, stm_size):
+                task.append(chunk)
+                if len(task) >= chunks_per_task:
+                    yield task
+                    task = []
+    if task:
+        yield task
+
+
+def ingest_transcripts(memory: EpisodicMemory, paths: List[str], workers: Optional[int] = None,
+                       chunks_per_task: int = 64, write_batch_size: int = 5000,
+                       llm_factory: Callable[[], Any] = None) -> Dict[str, float]:
+    """
+    Bulk-loads transcripts (one conversation per JSONL file of Message.to_dict records)
+    into an EpisodicMemory or subclass, bypassing per-message add_message.
+    - The main process only splits files into consolidation chunks; worker processes
+      parse, build episodes and embed user messages for the semantic tier.
+    - Results are written in order, `write_batch_size` episodes per journal append and
+      vector store add, so episodes stay chronological within each transcript (pass files oldest first).
+    - workers defaults to the CPU count; with one worker (or one CPU) everything runs
+      in-process, since worker startup and pickling would only add overhead.
+      `llm_factory` builds the LLM client in each worker for an _summarize that calls the model.
+    Returns counts and throughput (messages/second).
+    """
+    start = time.perf_counter()
+    semantic = isinstance(memory, SemanticMemory)
+    init_args = (type(memory), llm_factory, memory.embedding_function if semantic else None,
+                 memory.keyword_extractor)
+    tasks = _iter_tasks(paths, memory.stm_limit, chunks_per_task)
+    totals = {"messages": 0, "episodes": 0, "vectors": 0}
+
+    def write(results: List[Dict[str, Any]]):
+        episodes = [e for r in results for e in r["episodes"]]
+        if episodes:
+            memory._commit_episodes(episodes)
+        if semantic:
+            memory._flush_semantic()
+            totals["vectors"] += _write_vectors(memory, results)
+        totals["episodes"] += len(episodes)
+
+    def consume(results: Iterable[Dict[str, Any]]):
+        pending: List[Dict[str, Any]] = []
+        pending_episodes = 0
+        for result in results:
+            totals["messages"] += result["messages"]
+            pending.append(result)
+            pending_episodes += len(result["episodes"])
+            if pending_episodes >= write_batch_size:
+                write(pending)
+                pending, pending_episodes = [], 0
+        if pending:
+            write(pending)
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1:
+        _init_worker(*init_args)
+        consume(map(_build_batch, tasks))
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+            consume(pool.imap(_build_batch, tasks))
+
+    elapsed = time.perf_counter() - start
+    totals["seconds"] = round(elapsed, 3)
+    totals["messages_per_s"] = round(totals["messages"] / elapsed, 1) if elapsed else 0.0
+    print(f"Ingested {totals['messages']} messages -> {totals['episodes']} episodes, "
+          f"{totals['vectors']} vectors in {elapsed:.2f}s ({totals['messages_per_s']} msg/s)")
+    return totals
+
+
+def _write_vectors(memory: SemanticMemory, results: List[Dict[str, Any]]) -> int:
+    documents = [d for r in results for d in r["documents"]]
+    if not documents:
+        return 0
+    embeddings = np.concatenate([r["embeddings"] for r in results if r["embeddings"] is not None])
+    metadatas = [memory._tenant_metadata(m) for r in results for m in r["metadatas"]]
+    max_batch = memory.vector_client.get_max_batch_size()
+    for lo in range(0, len(documents), max_batch):
+        hi = lo + max_batch
+        memory.collection.add(
+            ids=[str(uuid.uuid4()) for _ in documents[lo:hi]],
+            documents=documents[lo:hi],
+            embeddings=embeddings[lo:hi],
+            metadatas=metadatas[lo:hi]
+        )
+    return len(documents)
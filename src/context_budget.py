@@ -0,0 +1,193 @@
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from agent import Message
+from tracing import get_tracer
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken, caching counts per message content so each
+    message is only encoded once however many turns it stays in context.
+    Falls back to a ~4 characters/token estimate if the encoding cannot be loaded
+    (tiktoken downloads it on first use).
+    """
+    MESSAGE_OVERHEAD = 4  # Role/separator tokens per chat message
+
+    def __init__(self, encoding_name: str = "cl100k_base", max_cache: int = 50000):
+        self.encoding_name = encoding_name
+        self.max_cache = max_cache
+        self._encoding = None
+        self._encoding_failed = False
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def encoding(self):
+        if self._encoding is None and not self._encoding_failed:
+            try:
+                import tiktoken  # Deferred: only needed once a budget is enforced
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                print(f"Token encoding unavailable, estimating counts: {e}")
+                self._encoding_failed = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+        encoding = self.encoding
+        n = len(encoding.encode(text)) if encoding else (len(text) + 3) // 4
+        self._cache[text] = n
+        if len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+        return n
+
+    def count_message(self, message: Message) -> int:
+        return self.count(message.content) + self.MESSAGE_OVERHEAD
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        encoding = self.encoding
+        if encoding:
+            tokens = encoding.encode(text)
+            return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens]) + "..."
+        return text if len(text) <= max_tokens * 4 else text[:max_tokens * 4] + "..."
+
+
+class ContextAssembler:
+    """
+    Caps the context returned by get_context at a token budget.
+    Messages are admitted tier by tier in priority order (reflection, semantic,
+    episodic, stm; a message's tier is its metadata["type"], STM messages have none).
+    STM is admitted newest first and stops at the first turn that does not fit;
+    the newest message (the current user turn) is always kept. A message that does not fit is truncated or dropped according
+    to its tier's policy; the output keeps the original message order.
+    """
+    PRIORITY = ["reflection", "semantic", "episodic", "stm"]
+    DEFAULT_POLICIES = {"reflection": "truncate", "semantic": "drop", "episodic": "truncate", "stm": "drop"}
+
+    def __init__(self, max_tokens: Optional[int] = None, counter: TokenCounter = None,
+                 policies: Dict[str, str] = None, min_truncated_tokens: int = 16):
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter()
+        self.policies = {**self.DEFAULT_POLICIES, **(policies or {})}
+        self.min_truncated_tokens = min_truncated_tokens
+        self.last_stats: Dict[str, int] = {}
+
+    @staticmethod
+    def tier(message: Message) -> str:
+        return message.metadata.get("type", "stm")
+
+    def assemble(self, context: List[Message]) -> List[Message]:
+        if self.max_tokens is None or not context:
+            return context
+
+        by_tier: Dict[str, List[int]] = {t: [] for t in self.PRIORITY}
+        for i, m in enumerate(context[:-1]):
+            by_tier.setdefault(self.tier(m), []).append(i)
+        by_tier["stm"].reverse()  # Most recent conversation first
+
+        # 1. The current turn is pinned
+        last = len(context) - 1
+        kept: Dict[int, Message] = {last: context[last]}
+        used = self.counter.count_message(context[last])
+        dropped = truncated = 0
+
+        # 2. Fill by priority
+        tiers = self.PRIORITY + [t for t in by_tier if t not in self.PRIORITY]
+        for tier in tiers:
+            for i in by_tier[tier]:
+                m = context[i]
+                cost = self.counter.count_message(m)
+                if used + cost <= self.max_tokens:
+                    kept[i] = m
+                    used += cost
+                    continue
+                room = self.max_tokens - used - TokenCounter.MESSAGE_OVERHEAD
+                if self.policies.get(tier, "drop") == "truncate" and room >= self.min_truncated_tokens:
+                    content = self.counter.truncate(m.content, room - 2)  # Leave room for the ellipsis
+                    kept[i] = Message(role=m.role, content=content, timestamp=m.timestamp,
+                                      metadata={**m.metadata, "truncated": True})
+                    used += self.counter.count_message(kept[i])
+                    truncated += 1
+                else:
+                    dropped += 1
+                    if tier == "stm":
+                        # Older turns without the newer ones would leave a gap in the dialog
+                        dropped += len(by_tier[tier]) - by_tier[tier].index(i) - 1
+                        break
+
+        self.last_stats = {"tokens": used, "dropped": dropped, "truncated": truncated}
+        return [kept[i] for i in sorted(kept)]
+
+
+class ContextDeduplicator:
+    """
+    Drops retrieved messages whose content the context already carries, across the
+    reflection, semantic, episodic and STM tiers:
+    - exact repeats: same content hash once the tier label ("[Semantic Memory]: ", ...) is
+      stripped and case, punctuation and whitespace are normalized;
+    - containment: the whole message appears word for word inside another one, e.g. a
+      semantic hit quoted by an episodic summary, or a retrieved copy of an STM turn.
+    A copy is only dropped in favour of one the assembler will keep whole (a dry run of
+    ContextAssembler.assemble on the full context; dropping messages only frees budget,
+    so those survive). The STM turns it keeps are the verbatim dialog: they are never
+    dropped, and retrieved copies of them always are. Among retrieved exact repeats the
+    kept copy from the highest-priority tier wins. Tokens saved are in last_stats and
+    total_tokens_saved.
+    """
+    LABEL = re.compile(r"^\[[^\]]*\]:\s*")
+    WORD = re.compile(r"\w+")
+
+    def __init__(self, assembler: ContextAssembler = None):
+        self.assembler = assembler or ContextAssembler()
+        self.counter = self.assembler.counter
+        self.last_stats: Dict[str, int] = {}
+        self.total_tokens_saved = 0
+
+    @classmethod
+    def normalize(cls, content: str) -> str:
+        return " ".join(cls.WORD.findall(cls.LABEL.sub("", content, count=1).lower()))
+
+    def dedupe(self, context: List[Message]) -> List[Message]:
+        keys = [self.normalize(m.content) for m in context]
+        tiers = [ContextAssembler.tier(m) for m in context]
+        priority = {tier: rank for rank, tier in enumerate(ContextAssembler.PRIORITY)}
+        ranks = [priority.get(tier, len(priority)) for tier in tiers]  # Lower is kept first
+        stm = [tier == "stm" for tier in tiers]
+
+        # 1. Messages the budget keeps whole (a truncated copy no longer carries the content)
+        assembled = {id(m) for m in self.assembler.assemble(context)}
+        whole = [id(m) in assembled for m in context]
+
+        # 2. Exact repeats: a kept STM turn wins, then a kept copy by tier priority, then
+        #    the highest-priority copy; unkept STM turns stay for the assembler to drop
+        survivor: Dict[str, int] = {}
+        for i in sorted(range(len(context)), key=lambda i: (not (stm[i] and whole[i]), not whole[i], ranks[i])):
+            survivor.setdefault(keys[i], i)
+        dropped = {i for i in range(len(context))
+                   if not stm[i] and (not keys[i] or survivor[keys[i]] != i)}
+
+        # 3. Containment in a longer message kept whole (word boundaries respected); longest
+        #    first, so a container is never itself dropped later
+        padded = {i: f" {keys[i]} " for i in range(len(context)) if i not in dropped}
+        containers = [j for j in sorted(padded, key=lambda j: -len(padded[j])) if whole[j]]
+        for i in sorted(padded, key=lambda i: -len(padded[i])):
+            if stm[i]:
+                continue
+            if any(j not in dropped and len(padded[j]) > len(padded[i]) and padded[i] in padded[j]
+                   for j in containers):
+                dropped.add(i)
+
+        saved = sum(self.counter.count_message(context[i]) for i in dropped)
+        self.total_tokens_saved += saved
+        self.last_stats = {"dropped": len(dropped), "tokens_saved": saved}
+        if dropped:
+            tracer = get_tracer()
+            tracer.count("context.dedup.dropped", len(dropped))
+            tracer.count("context.dedup.tokens_saved", saved)
+            return [m for i, m in enumerate(context) if i not in dropped]
+        return context
@@ -0,0 +1,60 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class ContextCache:
+    """
+    LRU cache of assembled context, keyed by (normalized query, store generations).
+    Memories bump a generation counter whenever a tier they read from changes, so
+    a key built from the current counters can never return context from before a
+    write; superseded entries simply age out. Entries also expire after `ttl`
+    seconds, because episodic ranking decays with wall-clock time.
+    """
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: Optional[str]) -> Optional[str]:
+        return " ".join(query.lower().split()) if query else None
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])  # Callers may modify their list
+
+    def put(self, key: Hashable, context: List[Any]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(context))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hit_rate, 4)}
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Size-bounded LRU cache of text -> embedding, keyed by normalized text.
+    Shared by semantic writes, semantic queries and reflection retrieval so the
+    same prompt (greetings, retries, benchmark probes) is only embedded once.
+    Misses within one call are embedded together in a single batch.
+    """
+    def __init__(self, embedding_function: Callable[[List[str]], Any], max_entries: int = 10000,
+                 persist_path: Optional[str] = None):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self.load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        keys = [self.normalize(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+        # Keyed by the normalized text, but the model sees the original (first) spelling
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = self._entries[key] = np.asarray(vector, dtype=np.float32)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return [found[key] for key in keys]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hit_rate, 4)}
+
+    def save(self):
+        """Persists the cache as a .npz of keys + a float32 matrix."""
+        if not self.persist_path or not self._entries:
+            return
+        with self._lock:
+            keys = np.array(list(self._entries.keys()))
+            vectors = np.stack(list(self._entries.values()))
+        tmp_path = self.persist_path + ".tmp.npz"
+        np.savez(tmp_path, keys=keys, vectors=vectors)
+        os.replace(tmp_path, self.persist_path)
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with np.load(self.persist_path) as data:
+                for key, vector in zip(data["keys"].tolist(), data["vectors"]):
+                    self._entries[key] = vector
+        except Exception as e:
+            print(f"Error loading embedding cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,94 @@
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Set, Tuple
+import numpy as np
+
+
+class TermTable:
+    """
+    Process-wide keyword interning: term <-> u32 id. Episodes store their keywords as
+    id arrays, so a term repeated across many episodes is held in memory once.
+    """
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self._lock = threading.Lock()
+
+    def encode(self, terms: Iterable[str]) -> array:
+        ids = self.ids
+        out = array('I')
+        for term in terms:
+            term_id = ids.get(term)
+            if term_id is None:
+                with self._lock:
+                    term_id = ids.get(term)
+                    if term_id is None:
+                        term_id = len(self.terms)
+                        self.terms.append(term)  # Before publishing the id, for lock-free readers
+                        ids[term] = term_id
+            out.append(term_id)
+        return out
+
+    def decode(self, term_ids: Iterable[int]) -> List[str]:
+        terms = self.terms
+        return [terms[i] for i in term_ids]
+
+    def __len__(self):
+        return len(self.terms)
+
+TERMS = TermTable()
+
+
+class KeywordIndex:
+    """
+    Inverted index over episode keywords: normalized term -> episode ids.
+    An episode's id here is its position in EpisodicMemory.episodes, which keeps
+    postings compact. Episodes held in a memory-mapped EpisodeSnapshot (`base`) are
+    served from the snapshot's persisted postings; only newer episodes are indexed here.
+    Maintained incrementally as episodes are consolidated, so retrieval only
+    has to look at the postings of the query terms instead of every episode.
+    """
+    def __init__(self, base: Any = None):
+        self.base = base
+        self.postings: Dict[str, array] = {}  # term -> u32 episode ids
+        self.size = len(base) if base is not None else 0
+
+    @staticmethod
+    def normalize(term: str) -> str:
+        return term.lower()
+
+    def add(self, keywords: Iterable[str]) -> int:
+        """Indexes the next episode position and returns it."""
+        episode_id = self.size
+        self.size += 1
+        # De-duplicate per episode so a posting list holds each id once
+        for term in {self.normalize(k) for k in keywords}:
+            self.postings.setdefault(term, array('I')).append(episode_id)
+        return episode_id
+
+    def match_counts(self, query_terms: Set[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (episode ids, number of query terms found in each one's keywords),
+        sorted by id. Counting is a single np.unique over the matched postings.
+        """
+        hits = []
+        for term in query_terms:
+            if self.base is not None:
+                postings = self.base.term_postings(term)
+                if len(postings):
+                    hits.append(np.frombuffer(postings, dtype=np.uint32))
+            postings = self.postings.get(term)
+            if postings:
+                hits.append(np.frombuffer(postings, dtype=np.uint32))
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        ids, counts = np.unique(np.concatenate(hits), return_counts=True)
+        return ids.astype(np.int64), counts
+
+    def clear(self):
+        self.base = None
+        self.postings = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,107 @@
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class RollupPolicy:
+    """
+    Tiered compaction for episodic memory (see plan_rollup). Ages are measured from
+    the newest episode, i.e. in conversation time.
+    """
+    every: int = 500              # Run after this many newly committed episodes
+    raw_hours: float = 48.0       # Raw episodes older than this roll into day summaries
+    day_days: float = 14.0        # Day summaries older than this roll into week summaries
+    max_episodes: Optional[int] = 5000  # Size target; beyond it the oldest episodes are evicted
+    max_keywords: int = 64        # Keywords kept per summary (most distinctive first)
+    archive: bool = True          # Keep rolled-up/evicted episodes in the archive file
+
+
+def level(record: Dict[str, Any]) -> str:
+    return record["metadata"].get("level", "raw")
+
+
+def _day_key(ts: float):
+    return datetime.fromtimestamp(ts).date()
+
+
+def _week_key(ts: float):
+    return datetime.fromtimestamp(ts).isocalendar()[:2]
+
+
+def merge(children: List[Dict[str, Any]], rollup_level: str, summary: str, max_keywords: int,
+          document_frequency: Counter) -> Dict[str, Any]:
+    """
+    Builds one summary episode record covering `children`. Keywords are ranked by how
+    few episodes in the store carry them (then by use within the group): a term that
+    is everywhere cannot single out this summary, while a one-off fact's terms can.
+    """
+    counts = Counter(k for child in children for k in child["keywords"])
+    ranked = sorted(counts, key=lambda k: (document_frequency[k], -counts[k]))
+    return {
+        "id": str(uuid.uuid4()),
+        "content": summary,
+        "keywords": ranked[:max_keywords],
+        "timestamp": max(c["timestamp"] for c in children),  # Keeps the store chronological
+        "metadata": {
+            "level": rollup_level,
+            "start": min(c["metadata"].get("start", c["timestamp"]) for c in children),
+            "end": max(c["timestamp"] for c in children),
+            "count": sum(c["metadata"].get("count", 1) for c in children),
+        },
+    }
+
+
+def plan_rollup(records: List[Dict[str, Any]], now: float, policy: RollupPolicy,
+                summarize: Callable[[List[Dict[str, Any]], str], str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Returns (records to keep, records leaving the live store), both chronological.
+    1. Raw episodes older than raw_hours are grouped by calendar day into day summaries.
+    2. Day summaries older than day_days are grouped by ISO week into week summaries.
+       A day/week that already has a summary is re-summarized together with the new
+       arrivals rather than getting a second one.
+    3. If more than max_episodes remain, the oldest (lowest decay score) are evicted.
+    """
+    raw_cutoff = now - policy.raw_hours * 3600
+    day_cutoff = now - policy.day_days * 86400
+    removed: List[Dict[str, Any]] = []
+    document_frequency = Counter(k for r in records for k in set(r["keywords"]))
+
+    def roll(records, child_level, rollup_level, cutoff, key):
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for r in records:
+            if level(r) == child_level and r["timestamp"] < cutoff:
+                groups.setdefault(key(r["timestamp"]), []).append(r)
+        if not groups:
+            return records
+        out = []
+        for r in records:
+            if level(r) == child_level and r["timestamp"] < cutoff:
+                continue
+            if level(r) == rollup_level and key(r["timestamp"]) in groups:
+                groups[key(r["timestamp"])].insert(0, r)  # Extend the existing summary
+                continue
+            out.append(r)
+        for children in groups.values():
+            children.sort(key=lambda c: c["timestamp"])
+            out.append(merge(children, rollup_level, summarize(children, rollup_level), policy.max_keywords,
+                             document_frequency))
+            removed.extend(children)
+        out.sort(key=lambda r: r["timestamp"])
+        return out
+
+    kept = roll(records, "raw", "day", raw_cutoff, _day_key)
+    kept = roll(kept, "day", "week", day_cutoff, _week_key)
+
+    if policy.max_episodes is not None and len(kept) > policy.max_episodes:
+        overflow = len(kept) - policy.max_episodes
+        removed.extend(kept[:overflow])
+        kept = kept[overflow:]
+
+    # Summaries created and rolled up again in the same pass were never stored
+    stored_ids = {r["id"] for r in records}
+    removed = [r for r in removed if r["id"] in stored_ids]
+    removed.sort(key=lambda r: r["timestamp"])
+    return kept, removed
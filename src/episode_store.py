@@ -0,0 +1,460 @@
+import json
+import mmap
+import os
+import struct
+import uuid
+from array import array
+from typing import List, Dict, Any, Callable, Iterable, Optional
+import numpy as np
+from episode_index import KeywordIndex
+
+
+class EpisodeJournal:
+    """
+    Append-only JSONL storage for episodic memory.
+    - Each consolidation appends one record instead of rewriting the whole file.
+    - A later record with the same id supersedes an earlier one; {"id": ..., "deleted": true}
+      is a tombstone.
+    - Compaction writes only the live episodes to a temp file and atomically swaps it in,
+      so a crash never leaves a half-written store behind.
+    - Legacy files holding a single JSON array are still readable and get migrated.
+    """
+    def __init__(self, file_path: str, fsync: bool = False, min_compact_records: int = 1000):
+        self.file_path = file_path
+        self.fsync = fsync
+        self.min_compact_records = min_compact_records
+        self.record_count = 0  # Records physically in the file
+        self.live_count = 0    # Records that are neither superseded nor deleted
+        self.is_legacy = False
+        self.generation: Optional[str] = None  # Snapshot this journal continues from
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Replays the journal and returns the live episode records in order."""
+        self.record_count = 0
+        self.live_count = 0
+        self.is_legacy = False
+        self.generation = None
+        if not os.path.exists(self.file_path):
+            return []
+
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+
+        if data.lstrip()[:1] == b'[':
+            # Legacy format: one JSON array rewritten on every save
+            self.is_legacy = True
+            records = json.loads(data)
+            self.record_count = self.live_count = len(records)
+            return records
+
+        live: Dict[str, Dict[str, Any]] = {}
+        good_offset = 0
+        lines = data.split(b'\n')
+        for i, line in enumerate(lines):
+            is_last = i == len(lines) - 1
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if is_last:
+                        # Torn write from a crash mid-append: drop the partial tail
+                        print(f"Recovering episodic journal: truncating partial record at byte {good_offset}")
+                        self._truncate(good_offset)
+                        break
+                    print(f"Skipping corrupt episodic journal record at byte {good_offset}")
+                    good_offset += len(line) + 1
+                    continue
+                if "snapshot" in record:
+                    self.generation = record["snapshot"]
+                    good_offset += len(line) + (0 if is_last else 1)
+                    continue
+                self.record_count += 1
+                if record.get("deleted"):
+                    live.pop(record["id"], None)
+                else:
+                    live[record["id"]] = record
+            good_offset += len(line) + (0 if is_last else 1)
+        else:
+            if data and not data.endswith(b'\n'):
+                # Last record is complete but lost its newline; restore it before appending more
+                with open(self.file_path, 'ab') as f:
+                    f.write(b'\n')
+
+        self.live_count = len(live)
+        return list(live.values())
+
+    def append(self, record: Dict[str, Any]):
+        """Appends one episode record (or tombstone) to the journal."""
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """Appends several records with a single write (and fsync)."""
+        data = "".join(json.dumps(record) + "\n" for record in records)
+        with open(self.file_path, 'a') as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        for record in records:
+            self.record_count += 1
+            if record.get("deleted"):
+                self.live_count -= 1
+            else:
+                self.live_count += 1
+
+    def delete(self, episode_id: str):
+        self.append({"id": episode_id, "deleted": True})
+
+    def should_compact(self) -> bool:
+        dead = self.record_count - self.live_count
+        return self.is_legacy or (dead >= self.min_compact_records and dead >= self.live_count)
+
+    def compact(self, records: List[Dict[str, Any]], generation: Optional[str] = None):
+        """Rewrites the journal with just the given live records (crash-safe)."""
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            if generation:
+                f.write(json.dumps({"snapshot": generation}) + "\n")
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        self.record_count = self.live_count = len(records)
+        self.is_legacy = False
+        self.generation = generation
+
+    def remove(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        self.record_count = self.live_count = 0
+        self.is_legacy = False
+        self.generation = None
+
+    def _truncate(self, offset: int):
+        with open(self.file_path, 'r+b') as f:
+            f.truncate(offset)
+
+
+class EpisodeSnapshot:
+    """
+    Read-only, memory-mapped columnar snapshot of episodes.
+    Timestamps, keyword term ids and the inverted keyword postings are exposed as
+    zero-copy arrays over the mapping; an episode's id/content/metadata are only
+    JSON-decoded when it is actually retrieved.
+
+    Layout (little endian, every section 8-byte aligned):
+        header | timestamps f64[n] | record offsets u64[n+1] | keyword offsets u64[n+1]
+               | keyword ids u32[m] | vocab offsets u64[v+1] | term offsets u64[w+1]
+               | posting offsets u64[w+1] | postings u32[p] | vocab blob | term blob | record blob
+    `vocab` holds keywords verbatim (so Episode.keywords round-trips); `terms` holds the
+    normalized index terms, each with the positions of the episodes containing it.
+    """
+    MAGIC = b"EPSNAP01"
+    # magic, n, m, v, w, p, vocab bytes, term bytes, generation
+    HEADER = struct.Struct("<8sQQQQQQQ32s")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        buf = self._view(memoryview(self._mmap))
+        magic, n, m, v, w, p, vocab_bytes, term_bytes, generation = self.HEADER.unpack_from(buf, 0)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"Not an episode snapshot: {path}")
+        self.generation = generation.rstrip(b"\0").decode()
+
+        offset = _align(self.HEADER.size)
+        self.timestamps, offset = self._section(buf, offset, 'd', n)
+        self.record_offsets, offset = self._section(buf, offset, 'Q', n + 1)
+        self.keyword_offsets, offset = self._section(buf, offset, 'Q', n + 1)
+        self.keyword_ids, offset = self._section(buf, offset, 'I', m)
+        self.vocab_offsets, offset = self._section(buf, offset, 'Q', v + 1)
+        self.term_offsets, offset = self._section(buf, offset, 'Q', w + 1)
+        self.posting_offsets, offset = self._section(buf, offset, 'Q', w + 1)
+        self.postings, offset = self._section(buf, offset, 'I', p)
+        self._vocab_blob, offset = self._section(buf, offset, 'B', vocab_bytes)
+        self._term_blob, offset = self._section(buf, offset, 'B', term_bytes)
+        self._record_base = offset
+        self._buf = buf
+        self._vocab: Optional[List[str]] = None
+        self._term_ids: Optional[Dict[str, int]] = None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def vocab(self) -> List[str]:
+        # Decoded on first keyword access; much smaller than the episodes themselves
+        if self._vocab is None:
+            self._vocab = _decode_strings(self._vocab_blob, self.vocab_offsets)
+        return self._vocab
+
+    def keywords(self, i: int) -> List[str]:
+        vocab = self.vocab
+        ids = self.keyword_ids[self.keyword_offsets[i]:self.keyword_offsets[i + 1]]
+        return [vocab[t] for t in ids]
+
+    def term_postings(self, term: str) -> memoryview:
+        """Positions of the episodes whose normalized keywords contain `term`."""
+        if self._term_ids is None:
+            terms = _decode_strings(self._term_blob, self.term_offsets)
+            self._term_ids = {t: i for i, t in enumerate(terms)}
+        i = self._term_ids.get(term)
+        if i is None:
+            return self.postings[0:0]
+        return self.postings[self.posting_offsets[i]:self.posting_offsets[i + 1]]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        start = self._record_base + self.record_offsets[i]
+        end = self._record_base + self.record_offsets[i + 1]
+        record = json.loads(bytes(self._buf[start:end]))
+        record["keywords"] = self.keywords(i)
+        record["timestamp"] = self.timestamps[i]
+        return record
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+    def _view(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def _section(self, buf: memoryview, offset: int, fmt: str, count: int):
+        size = array(fmt).itemsize * count
+        raw = self._view(buf[offset:offset + size])
+        return self._view(raw.cast(fmt)), _align(offset + size)
+
+    @classmethod
+    def write(cls, path: str, records: Iterable[Dict[str, Any]], generation: str):
+        """Writes records to a new snapshot via a temp file + atomic rename."""
+        timestamps = array('d')
+        record_offsets = array('Q', [0])
+        keyword_offsets = array('Q', [0])
+        keyword_ids = array('I')
+        vocab_ids: Dict[str, int] = {}
+        term_postings: Dict[str, array] = {}
+        blobs: List[bytes] = []
+        blob_size = 0
+
+        for pos, record in enumerate(records):
+            timestamps.append(record["timestamp"])
+            for k in record["keywords"]:
+                keyword_ids.append(vocab_ids.setdefault(k, len(vocab_ids)))
+            keyword_offsets.append(len(keyword_ids))
+            for term in {KeywordIndex.normalize(k) for k in record["keywords"]}:
+                term_postings.setdefault(term, array('I')).append(pos)
+            blob = json.dumps({"id": record["id"], "content": record["content"],
+                               "metadata": record["metadata"]}).encode()
+            blobs.append(blob)
+            blob_size += len(blob)
+            record_offsets.append(blob_size)
+
+        vocab_blobs, vocab_offsets = _encode_strings(vocab_ids)
+        term_blobs, term_offsets = _encode_strings(term_postings)
+        posting_offsets = array('Q', [0])
+        postings = array('I')
+        for positions in term_postings.values():
+            postings.extend(positions)
+            posting_offsets.append(len(postings))
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(timestamps), len(keyword_ids), len(vocab_ids),
+                                    len(term_postings), len(postings), vocab_offsets[-1],
+                                    term_offsets[-1], generation.encode()))
+            for section in (timestamps, record_offsets, keyword_offsets, keyword_ids,
+                            vocab_offsets, term_offsets, posting_offsets, postings):
+                _pad(f)
+                section.tofile(f)
+            for section in (vocab_blobs, term_blobs, blobs):
+                _pad(f)
+                f.writelines(section)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class EpisodeSequence:
+    """
+    List-like view of all episodes: the snapshot head is decoded lazily on access
+    (and cached, so callers keep getting the same object), newer episodes live in
+    a plain list tail.
+    """
+    def __init__(self, factory: Callable[..., Any], snapshot: Optional[EpisodeSnapshot] = None):
+        self.factory = factory
+        self.snapshot = snapshot
+        self.head_size = len(snapshot) if snapshot else 0
+        self.tail: List[Any] = []
+        self.tail_timestamps = array('d')  # Columnar copy of the tail's timestamps
+        self._decoded: Dict[int, Any] = {}
+
+    def __len__(self):
+        return self.head_size + len(self.tail)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("episode index out of range")
+        if i >= self.head_size:
+            return self.tail[i - self.head_size]
+        ep = self._decoded.get(i)
+        if ep is None:
+            ep = self._decoded[i] = self.factory(**self.snapshot.record(i))
+        return ep
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, episode):
+        self.tail.append(episode)
+        self.tail_timestamps.append(episode.timestamp)
+
+    def records(self) -> Iterable[Dict[str, Any]]:
+        """Yields every episode as a dict, without caching decoded snapshot episodes."""
+        for i in range(len(self)):
+            if i < self.head_size and i not in self._decoded:
+                yield self.snapshot.record(i)
+            else:
+                yield self[i].to_dict()
+
+    def rebase(self, snapshot: EpisodeSnapshot):
+        """Switches to a snapshot that now holds every episode, keeping decoded objects."""
+        for i, ep in enumerate(self.tail):
+            self._decoded[self.head_size + i] = ep
+        self.tail = []
+        self.tail_timestamps = array('d')
+        self.snapshot = snapshot
+        self.head_size = len(snapshot)
+
+    def timestamp(self, i: int) -> float:
+        """Timestamp without decoding the episode."""
+        if i < self.head_size:
+            return self.snapshot.timestamps[i]
+        return self.tail_timestamps[i - self.head_size]
+
+    def timestamps(self, positions: np.ndarray) -> np.ndarray:
+        """Gathers the timestamps of many episodes at once from the columnar arrays."""
+        out = np.empty(len(positions), dtype=np.float64)
+        in_head = positions < self.head_size
+        if in_head.any():
+            out[in_head] = np.frombuffer(self.snapshot.timestamps, dtype=np.float64)[positions[in_head]]
+        if not in_head.all():
+            tail = np.frombuffer(self.tail_timestamps, dtype=np.float64)
+            out[~in_head] = tail[positions[~in_head] - self.head_size]
+            del tail  # Release the buffer so the array can grow again
+        return out
+
+    def timestamp_column(self) -> np.ndarray:
+        """A fresh array of every episode's timestamp, in position order."""
+        head = np.frombuffer(self.snapshot.timestamps, dtype=np.float64) if self.head_size else np.empty(0)
+        return np.concatenate([head, np.array(self.tail_timestamps, dtype=np.float64)])
+
+
+class EpisodeStore:
+    """
+    Episodic persistence = memory-mapped snapshot + append-only journal.
+    - New episodes are appended to the journal (`file_path`).
+    - Compaction writes every episode into the snapshot (`file_path + ".snap"`) and
+      resets the journal to a header naming that snapshot's generation. A journal whose
+      header does not match the snapshot predates it (crash mid-compaction) and is dropped.
+    - Tombstones only apply to journal-resident episodes; removing snapshot episodes
+      requires a compaction.
+    """
+    def __init__(self, file_path: str, fsync: bool = False, min_compact_records: int = 1000):
+        self.journal = EpisodeJournal(file_path, fsync=fsync, min_compact_records=min_compact_records)
+        self.snapshot_path = file_path + ".snap"
+        self.archive_path = file_path + ".archive.jsonl"
+        self.snapshot: Optional[EpisodeSnapshot] = None
+        self.min_compact_records = min_compact_records
+
+    @property
+    def is_legacy(self) -> bool:
+        return self.journal.is_legacy
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Maps the snapshot (if any) and returns the journal records written after it."""
+        self._close_snapshot()
+        if os.path.exists(self.snapshot_path):
+            self.snapshot = EpisodeSnapshot(self.snapshot_path)
+        records = self.journal.load()
+        if self.snapshot and self.journal.generation != self.snapshot.generation:
+            # Compaction crashed after swapping in the snapshot: it already has these records
+            print("Discarding episodic journal already folded into the snapshot")
+            self.journal.compact([], generation=self.snapshot.generation)
+            records = []
+        return records
+
+    def append(self, record: Dict[str, Any]):
+        self.journal.append(record)
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        self.journal.append_many(records)
+
+    def delete(self, episode_id: str):
+        self.journal.delete(episode_id)
+
+    def should_compact(self) -> bool:
+        snapshot_size = len(self.snapshot) if self.snapshot else 0
+        # Doubling policy keeps compaction cost amortized O(1) per appended episode
+        return self.journal.should_compact() or \
+            self.journal.record_count >= max(self.min_compact_records, snapshot_size)
+
+    def compact(self, records: Iterable[Dict[str, Any]]):
+        generation = uuid.uuid4().hex
+        EpisodeSnapshot.write(self.snapshot_path, records, generation)
+        self.journal.compact([], generation=generation)
+        self._close_snapshot()
+        self.snapshot = EpisodeSnapshot(self.snapshot_path)
+
+    def archive(self, records: List[Dict[str, Any]]):
+        """Appends episodes leaving the live store to the cold archive (JSONL, never read back)."""
+        with open(self.archive_path, 'a') as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def remove(self):
+        self._close_snapshot()
+        for path in (self.snapshot_path, self.archive_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.journal.remove()
+
+    def close(self):
+        """Unmaps the snapshot (the journal holds no open handles)."""
+        self._close_snapshot()
+
+    def _close_snapshot(self):
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _pad(f):
+    f.write(b"\0" * (_align(f.tell()) - f.tell()))
+
+def _encode_strings(strings: Iterable[str]):
+    blobs = [s.encode() for s in strings]
+    offsets = array('Q', [0])
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+    return blobs, offsets
+
+def _decode_strings(blob: memoryview, offsets: memoryview) -> List[str]:
+    data = bytes(blob)
+    return [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
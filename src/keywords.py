@@ -0,0 +1,67 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import FrozenSet, Iterable, List, Set
+
+# English function words and chat filler; they match nearly every episode, so they
+# cannot tell episodes apart and only bloat the keyword lists and postings.
+STOPWORDS: FrozenSet[str] = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been
+before being below between both but by can can't cannot could couldn't did didn't do does
+doesn't doing don't down during each either else etc ever few for from further get got had
+hadn't has hasn't have haven't having he he'd he'll he's her here here's hers herself him
+himself his how how's however i i'd i'll i'm i've if in into is isn't it it's its itself
+just let's like me more most much must mustn't my myself no nor not now of off ok okay on
+once only or other ought our ours ourselves out over own please same shall shan't she she'd
+she'll she's should shouldn't so some such than thank thanks that that's the their theirs
+them themselves then there there's these they they'd they'll they're they've this those
+through to too under until up upon us very via was wasn't we we'd we'll we're we've were
+weren't what what's when when's where where's whether which while who who's whom why why's
+will with won't would wouldn't yes yet you you'd you'll you're you've your yours yourself
+yourselves
+""".split())
+
+
+class KeywordExtractor:
+    """
+    Turns text into index terms, for episode keywords and for retrieval queries alike
+    (both must normalize the same way or they never meet in the index):
+    1. Normalize: NFKC + casefold, so "Café", "CAFÉ" and "café" are one term.
+    2. Tokenize with one precompiled regex: word characters, keeping inner apostrophes,
+       hyphens and underscores ("don't", "follow-up", "blue_falcon_99"); a possessive "'s"
+       is dropped. Punctuation never sticks to a term.
+    3. Drop stopwords and terms shorter than `min_length` (numbers are always kept).
+    4. extract() ranks terms by frequency in the text (first occurrence breaks ties) and
+       keeps the top `max_keywords`; query_terms() keeps every term.
+    Subclass or pass any object with the same two methods to EpisodicMemory to change it.
+    """
+    TOKEN = re.compile(r"\w[\w'\-]*")
+
+    def __init__(self, max_keywords: int = 32, min_length: int = 2, stopwords: Iterable[str] = STOPWORDS):
+        if max_keywords <= 0:
+            raise ValueError("max_keywords must be positive")
+        self.max_keywords = max_keywords
+        self.min_length = min_length
+        self.stopwords = frozenset(stopwords)
+
+    def tokens(self, text: str) -> List[str]:
+        if not text.isascii():
+            text = unicodedata.normalize("NFKC", text).replace("’", "'")
+        stopwords, min_length = self.stopwords, self.min_length
+        terms = []
+        for token in self.TOKEN.findall(text.casefold()):
+            if token in stopwords:
+                continue
+            if token[-1] in "'-":
+                token = token.rstrip("'-")
+            if token.endswith("'s"):
+                token = token[:-2]
+            if (len(token) >= min_length or token.isdigit()) and token not in stopwords:
+                terms.append(token)
+        return terms
+
+    def extract(self, text: str) -> List[str]:
+        return [term for term, _ in Counter(self.tokens(text)).most_common(self.max_keywords)]
+
+    def query_terms(self, text: str) -> Set[str]:
+        return set(self.tokens(text))
@@ -1,24 +1,54 @@
 import os
-from typing import List, Optional
-from openai import OpenAI, AzureOpenAI
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, List, Optional
+from llm_cache import ResponseCache
+
+ERROR_PREFIX = "Error calling LLM"
+
+def is_cacheable(response: str) -> bool:
+    # Failed calls come back as an error string; those are never cached
+    return bool(response) and not response.startswith(ERROR_PREFIX)
 
 class LLMClient:
-    def __init__(self, provider: str = "openai", model: str = "gpt-4o", api_key: str = None, base_url: str = None):
+    """
+    The openai package is imported and the client built on the first request, so
+    constructing an LLMClient (e.g. in a short-lived worker or CLI) costs nothing.
+    With a ResponseCache, repeated requests (same model, messages and temperature) are
+    answered from the cache and identical concurrent requests share one upstream call.
+    """
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o", api_key: str = None, base_url: str = None,
+                 cache: ResponseCache = None):
+        if provider not in ("openai", "ollama"):
+            raise ValueError(f"Unknown provider: {provider}")
         self.provider = provider
         self.model = model
-        
-        if provider == "openai":
-            self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
-        elif provider == "ollama":
-            # Ollama usually runs on localhost:11434 and is compatible with OpenAI client
-            self.client = OpenAI(
-                base_url=base_url or "http://localhost:11434/v1",
-                api_key="ollama" # required but unused
-            )
-        else:
-            raise ValueError(f"Unknown provider: {provider}")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = cache
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            if self.provider == "openai":
+                self._client = OpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"))
+            else:
+                # Ollama usually runs on localhost:11434 and is compatible with OpenAI client
+                self._client = OpenAI(
+                    base_url=self.base_url or "http://localhost:11434/v1",
+                    api_key="ollama" # required but unused
+                )
+        return self._client
 
     def generate_response(self, messages: List[dict], temperature: float = 0.7) -> str:
+        if self.cache is None:
+            return self._request(messages, temperature)
+        key = self.cache.key(self.provider, self.model, messages, temperature)
+        return self.cache.single_flight(key, lambda: self._request(messages, temperature), is_cacheable)
+
+    def _request(self, messages: List[dict], temperature: float) -> str:
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -27,4 +57,96 @@ class LLMClient:
             )
             return response.choices[0].message.content
         except Exception as e:
-            return f"Error calling LLM: {str(e)}"
+            return f"{ERROR_PREFIX}: {str(e)}"
+
+
+class AsyncLLMClient:
+    """
+    asyncio counterpart of LLMClient for serving many agent sessions from one process.
+    - One AsyncOpenAI client (and so one pooled, keep-alive HTTP connection pool) is
+      shared by every session using this instance; pass `http_client` to tune its limits.
+    - `max_concurrency` caps in-flight requests to the provider with a semaphore per
+      event loop, so the client can be reused across asyncio.run calls.
+    - Like LLMClient, the openai package is only imported once the first request is made.
+    - `cache` works as in LLMClient for agenerate_response; streamed responses bypass it.
+    """
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o", api_key: str = None, base_url: str = None,
+                 max_concurrency: int = 64, http_client=None, cache: ResponseCache = None):
+        if provider not in ("openai", "ollama"):
+            raise ValueError(f"Unknown provider: {provider}")
+        self.provider = provider
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http_client = http_client
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._semaphores_lock = threading.Lock()
+        self._client = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """The running event loop's semaphore (an asyncio.Semaphore only works on one loop)."""
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                # Forget loops that have been closed (e.g. by an earlier asyncio.run)
+                self._semaphores = {l: sem for l, sem in self._semaphores.items() if not l.is_closed()}
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            if self.provider == "openai":
+                self._client = AsyncOpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"), base_url=self.base_url,
+                                           http_client=self.http_client)
+            else:
+                # Ollama usually runs on localhost:11434 and is compatible with OpenAI client
+                self._client = AsyncOpenAI(
+                    base_url=self.base_url or "http://localhost:11434/v1",
+                    api_key="ollama", # required but unused
+                    http_client=self.http_client
+                )
+        return self._client
+
+    async def agenerate_response(self, messages: List[dict], temperature: float = 0.7) -> str:
+        if self.cache is None:
+            return await self._arequest(messages, temperature)
+        key = self.cache.key(self.provider, self.model, messages, temperature)
+        return await self.cache.asingle_flight(key, lambda: self._arequest(messages, temperature), is_cacheable)
+
+    async def _arequest(self, messages: List[dict], temperature: float) -> str:
+        try:
+            async with self.semaphore:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature
+                )
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"{ERROR_PREFIX}: {str(e)}"
+
+    async def astream_response(self, messages: List[dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yields content deltas as the provider streams them."""
+        try:
+            async with self.semaphore:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"{ERROR_PREFIX}: {str(e)}"
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
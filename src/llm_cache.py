@@ -0,0 +1,231 @@
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from tracing import get_tracer
+
+
+class _Flight:
+    """One upstream request that identical concurrent callers wait on."""
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncFlight:
+    """One upstream request running in its own task, so no single caller owns it."""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class ResponseCache:
+    """
+    Cache of LLM responses keyed by a hash of (provider, model, messages, temperature).
+    - Memory tier: LRU of `max_entries`; entries expire after `ttl` seconds (None = never).
+    - Disk tier (optional, SQLite at `persist_path`): survives restarts and holds up to
+      `max_disk_entries`. Memory misses fall through to it; disk hits are promoted.
+    - single_flight / asingle_flight: concurrent identical requests share one upstream
+      call, and only results that pass `cacheable` (e.g. not an error) are stored.
+    Counters: hits (either tier), disk_hits, misses (= upstream calls) and coalesced
+    (callers served by another caller's in-flight request).
+    """
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600.0, persist_path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[Tuple[Any, str], _AsyncFlight] = {}  # (event loop, key)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            self._db.commit()
+
+    @staticmethod
+    def key(provider: str, model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+        payload = json.dumps([provider, model, messages, temperature], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _lookup(self, key: str) -> Tuple[Optional[str], bool]:
+        """(response, from_disk) without touching the counters. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                return entry[1], False
+            del self._entries[key]
+        if self._db is not None:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and not self._expired(row[1]):
+                self._remember(key, row[0], row[1])
+                return row[0], True
+        return None, False
+
+    def _remember(self, key: str, response: str, created: float):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (created, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _count_hit(self, from_disk: bool):
+        self.hits += 1
+        self.disk_hits += from_disk
+        get_tracer().count("llm.cache.hit")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            response, from_disk = self._lookup(key)
+            if response is not None:
+                self._count_hit(from_disk)
+            return response
+
+    def put(self, key: str, response: str):
+        created = time.time()
+        with self._lock:
+            self._remember(key, response, created)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                                 (key, response, created))
+                self._db.commit()
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._prune_disk()
+
+    def _prune_disk(self):
+        # Drop expired rows, then the oldest beyond max_disk_entries
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self._db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created DESC "
+                         "LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+        self._db.commit()
+
+    def single_flight(self, key: str, compute: Callable[[], str],
+                      cacheable: Callable[[str], bool] = None) -> str:
+        """Returns the cached response, or joins/starts the one upstream call for `key`."""
+        with self._lock:
+            response, from_disk = self._lookup(key)
+            if response is not None:
+                self._count_hit(from_disk)
+                return response
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        get_tracer().count("llm.cache.miss" if leader else "llm.cache.coalesced")
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = compute()
+            if cacheable is None or cacheable(flight.result):
+                self.put(key, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def asingle_flight(self, key: str, compute: Callable[[], Awaitable[str]],
+                             cacheable: Callable[[str], bool] = None) -> str:
+        """asyncio counterpart of single_flight (callers on the same event loop are coalesced)."""
+        with self._lock:
+            response, from_disk = self._lookup(key)
+            if response is not None:
+                self._count_hit(from_disk)
+                return response
+            loop = asyncio.get_running_loop()
+            flight = self._async_flights.get((loop, key))
+            leader = flight is None
+            if leader:
+                task = loop.create_task(self._acompute(key, compute, cacheable))
+                flight = self._async_flights[(loop, key)] = _AsyncFlight(task)
+                task.add_done_callback(lambda t: self._end_async_flight((loop, key), flight))
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+        get_tracer().count("llm.cache.miss" if leader else "llm.cache.coalesced")
+
+        # Every caller, the one that started the request included, only waits on it:
+        # a cancelled caller leaves it running for the others
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()  # Nobody is left to use the response
+
+    async def _acompute(self, key: str, compute: Callable[[], Awaitable[str]],
+                        cacheable: Callable[[str], bool] = None) -> str:
+        result = await compute()
+        if cacheable is None or cacheable(result):
+            self.put(key, result)
+        return result
+
+    def _end_async_flight(self, flight_key: Tuple[Any, str], flight: _AsyncFlight):
+        with self._lock:
+            if self._async_flights.get(flight_key) is flight:
+                del self._async_flights[flight_key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # Mark retrieved: every waiter may be gone
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"entries": len(self._entries), "hits": self.hits, "disk_hits": self.disk_hits,
+                 "misses": self.misses, "coalesced": self.coalesced, "hit_rate": round(self.hit_rate, 4)}
+        if self._db is not None:
+            with self._lock:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = self.coalesced = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
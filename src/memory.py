@@ -1,14 +1,16 @@
 from typing import List
 from agent import MemoryInterface, Message
+from context_budget import ContextAssembler
 
 class ContextWindowMemory(MemoryInterface):
     """
     Architecture A: Simple Context Window Memory.
-    Keeps the last N messages.
+    Keeps the last N messages (and at most `context_budget` tokens of them, if set).
     """
-    def __init__(self, window_size: int = 10):
+    def __init__(self, window_size: int = 10, context_budget: int = None):
         self.messages: List[Message] = []
         self.window_size = window_size
+        self.context_assembler = ContextAssembler(context_budget)
 
     def add_message(self, message: Message):
         self.messages.append(message)
@@ -17,7 +19,7 @@ class ContextWindowMemory(MemoryInterface):
             self.messages = self.messages[-self.window_size:]
 
     def get_context(self, current_query: str = None) -> List[Message]:
-        return self.messages
+        return self.context_assembler.assemble(self.messages)
 
     def clear(self):
         self.messages = []
@@ -1,138 +1,531 @@
-import json
 import time
-import math
 import os
 import uuid
-from dataclasses import dataclass
-from typing import List, Dict, Any
+import queue
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from datetime import datetime
 from agent import MemoryInterface, Message
-from llm import LLMClient
-@dataclass
+from llm import LLMClient, ERROR_PREFIX
+from episode_index import KeywordIndex, TERMS
+from keywords import KeywordExtractor
+from episode_store import EpisodeStore, EpisodeSequence
+from context_budget import ContextAssembler, ContextDeduplicator
+from context_cache import ContextCache
+from episode_rollup import RollupPolicy, plan_rollup
+from tracing import get_tracer
+
 class Episode:
-    id: str
-    content: str  # Summary of the interaction
-    keywords: List[str]
-    timestamp: float  # Unix timestamp
-    metadata: Dict[str, Any]
+    """
+    A consolidated interaction. Slotted; keywords are stored as an array of term ids
+    into the process-wide TERMS table, so each distinct keyword string exists once
+    however many episodes mention it. `keywords` reads back as a new list.
+    """
+    __slots__ = ("id", "content", "_keyword_ids", "timestamp", "_metadata")
+
+    def __init__(self, id: str, content: str, keywords: List[str], timestamp: float,
+                 metadata: Dict[str, Any] = None):
+        self.id = id
+        self.content = content  # Summary of the interaction
+        self.keywords = keywords
+        self.timestamp = float(timestamp)  # Unix timestamp
+        self.metadata = metadata
+
+    @property
+    def keywords(self) -> List[str]:
+        return TERMS.decode(self._keyword_ids)
+
+    @keywords.setter
+    def keywords(self, value: List[str]):
+        self._keyword_ids = TERMS.encode(value)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {}  # Created on first access, so callers can mutate it
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]):
+        self._metadata = value  # Kept as passed (even when empty), so the caller's dict stays live
+
+    def __reduce__(self):
+        # Term ids are process-local, so pickle (e.g. across bulk-ingest workers) the strings
+        return (Episode, (self.id, self.content, self.keywords, self.timestamp, self._metadata))
+
+    def __eq__(self, other):
+        if not isinstance(other, Episode):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Episode(id={self.id!r}, content={self.content!r}, keywords={self.keywords!r}, timestamp={self.timestamp!r})"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "content": self.content,
+            "keywords": self.keywords,
+            "timestamp": self.timestamp,
+            "metadata": self._metadata or {}
+        }
+
+class ConsolidationWorker:
+    """
+    Background thread that turns STM overflow into episodes off the request path.
+    Overflow chunks wait in a bounded queue (a full queue blocks the producer, which
+    is the backpressure); whatever has piled up is drained and committed as one batch.
+    """
+    def __init__(self, memory: "EpisodicMemory", max_pending: int = 64):
+        self.memory = memory
+        self.queue: "queue.Queue[Optional[Tuple[List[Message], float]]]" = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name="episodic-consolidation", daemon=True)
+        self.thread.start()
+
+    def submit(self, messages: List[Message], timestamp: float):
+        self.queue.put((messages, timestamp))
+
+    def flush(self):
+        """Blocks until every submitted chunk has been consolidated."""
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            while item is not None:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            chunks = [chunk for chunk in batch if chunk is not None]
+            try:
+                if chunks:
+                    with get_tracer().span("memory.consolidation"):
+                        self.memory._commit_episodes([self.memory._build_episode(m, ts) for m, ts in chunks])
+            except Exception as e:
+                print(f"Error consolidating memory: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if len(chunks) < len(batch):
+                return
+
+LEGACY_ROLE_PREFIXES = frozenset({"user:", "assistant:", "system:"})
+
+_retrieval_pool: Optional[ThreadPoolExecutor] = None
+_retrieval_pool_lock = threading.Lock()
+
+def retrieval_pool() -> ThreadPoolExecutor:
+    """Thread pool for retrieval fan-out, shared by every memory in the process."""
+    global _retrieval_pool
+    with _retrieval_pool_lock:
+        if _retrieval_pool is None:
+            _retrieval_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="retrieval")
+        return _retrieval_pool
 
 class EpisodicMemory(MemoryInterface):
     """
     Architecture B: STM + Episodic Memory.
     - STM: Context Window (recent messages).
     - Episodic: Long-term summaries with scoring.
+    With async_consolidation=True, summarization and persistence run on a
+    ConsolidationWorker; call flush() when a test or shutdown needs them done.
+    With context_budget set, get_context is capped at that many tokens (see ContextAssembler).
+    Retrieved messages the context already carries (repeats across tiers) are dropped before
+    the budget is applied (see ContextDeduplicator); set context_dedup=False to keep them.
+    Assembled context is cached per query (see ContextCache) until a tier it was read from
+    changes; set context_cache_size=0 to disable.
+    With a rollup_policy, old episodes are periodically rolled into day/week summaries
+    (written by llm_client) and the store is kept near the policy's size target (see rollup()).
+    Episode keywords and query terms come from the same `keyword_extractor` (see KeywordExtractor).
+    Subclasses add retrieval tiers by extending _retrieval_tiers, and call _bump(tier)
+    whenever they change what it returns. With several tiers they are looked up
+    concurrently; a tier that misses its timeout (`tier_timeouts`, else
+    `retrieval_timeout` seconds) or fails is left out of that turn's context.
     """
-    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json"):
+    keyword_extractor = KeywordExtractor()  # Class default, also used by episode_builder instances
+
+    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json",
+                 async_consolidation: bool = False, max_pending: int = 64, context_budget: int = None,
+                 context_cache_size: int = 256, context_cache_ttl: float = 60.0,
+                 rollup_policy: RollupPolicy = None, parallel_retrieval: bool = True,
+                 retrieval_timeout: float = 2.0, tier_timeouts: Dict[str, float] = None,
+                 context_dedup: bool = True, keyword_extractor: KeywordExtractor = None):
         self.llm_client = llm_client
         self.stm_window: List[Message] = []
         self.stm_limit = stm_size
-        self.episodes: List[Episode] = []
+        self.episodes = EpisodeSequence(Episode)
+        self.keyword_index = KeywordIndex()
         self.file_path = file_path
+        self.store = EpisodeStore(file_path)
+        # Guards episodes/index/store so retrieval never sees a half-committed batch
+        self._lock = threading.RLock()
+        self._rollup_lock = threading.Lock()  # One rollup at a time; planning runs outside _lock
+        self.async_consolidation = async_consolidation
+        self.max_pending = max_pending
+        self._worker: Optional[ConsolidationWorker] = None
+        self.context_assembler = ContextAssembler(context_budget)
+        if keyword_extractor is not None:
+            self.keyword_extractor = keyword_extractor
+        self.context_deduplicator = ContextDeduplicator(self.context_assembler) if context_dedup else None
+        self.context_cache = ContextCache(context_cache_size, context_cache_ttl)
+        self.generations: Dict[str, int] = {"stm": 0, "episodic": 0}  # Bumped on every write to a tier
+        self.rollup_policy = rollup_policy
+        self._since_rollup = 0
+        self.parallel_retrieval = parallel_retrieval
+        self.retrieval_timeout = retrieval_timeout
+        self.tier_timeouts = tier_timeouts or {}
+        self._retrieval_state = threading.local()  # Degraded tiers of this thread's last lookup
         self.load_memory()
 
+    @classmethod
+    def episode_builder(cls, llm_client: LLMClient = None) -> "EpisodicMemory":
+        """
+        A storage-less instance that only runs _build_episode (keyword extraction and
+        _summarize), e.g. in bulk-ingest worker processes.
+        """
+        builder = cls.__new__(cls)
+        builder.llm_client = llm_client
+        return builder
+
     def add_message(self, message: Message):
-        self.stm_window.append(message)
-        
-        # Check if we need to consolidate STM into Episodic
-        # For simplicity, let's say after every N*2 turns, we summarize the oldest N messages
-        if len(self.stm_window) > self.stm_limit * 2:
+        with self._lock:
+            self.stm_window.append(message)
+            self._bump("stm")
+            
+            # Check if we need to consolidate STM into Episodic
+            # For simplicity, let's say after every N*2 turns, we summarize the oldest N messages
+            if len(self.stm_window) <= self.stm_limit * 2:
+                return
+            if self.async_consolidation:
+                messages_to_summarize = self._take_overflow()
+        # Outside the lock: summarizing (or a full queue) must not block retrieval
+        if not self.async_consolidation:
             self._consolidate_memory()
+        elif messages_to_summarize:
+            self._get_worker().submit(messages_to_summarize, time.time())
+
+    def flush(self):
+        """Waits for queued consolidations to be committed (no-op when synchronous)."""
+        if self._worker:
+            self._worker.flush()
+
+    def close(self):
+        """Drains and stops the background worker."""
+        if self._worker:
+            self._worker.close()
+            self._worker = None
+
+    def _get_worker(self) -> ConsolidationWorker:
+        with self._lock:
+            if self._worker is None:
+                self._worker = ConsolidationWorker(self, self.max_pending)
+            return self._worker
             
     def get_context(self, current_query: str = None) -> List[Message]:
-        # 1. Get relevant episodes
+        key = (ContextCache.normalize(current_query), tuple(self.generations.values()))
+        cached = self.context_cache.get(key)
+        if cached is not None:
+            return cached
+        context = self._gather_context(current_query)
+        with get_tracer().span("context.assemble"):
+            if self.context_deduplicator:
+                context = self.context_deduplicator.dedupe(context)
+            context = self.context_assembler.assemble(context)
+        if not self.degraded_tiers:
+            self.context_cache.put(key, context)  # A partial context is not worth repeating
+        return context
+
+    @property
+    def degraded_tiers(self) -> List[str]:
+        """Tiers left out of the calling thread's last get_context (timed out or failed)."""
+        return getattr(self._retrieval_state, "degraded", [])
+
+    def _bump(self, tier: str):
+        """Marks `tier` as changed, so cached context read from it is no longer served."""
+        with self._lock:
+            self.generations[tier] += 1
+
+    def _gather_context(self, current_query: str = None) -> List[Message]:
+        stm = self.stm_window[-self.stm_limit:]
+
+        # 1. Long-term tiers, highest priority first
+        tiers = self._retrieval_tiers(current_query)
+        results = self._run_tiers(tiers)
+        relevant_context = [m for name, _ in tiers for m in results.get(name, [])]
+
+        # 2. Append STM (Recent conversation)
+        return relevant_context + stm
+
+    def _retrieval_tiers(self, current_query: str = None) -> List[Tuple[str, Callable[[], List[Message]]]]:
+        """(tier name, lookup) pairs in the order their messages appear in context."""
+        if not current_query:
+            return []
+        return [("episodic", lambda: self._episodic_context(current_query))]
+
+    def _run_tiers(self, tiers: List[Tuple[str, Callable[[], List[Message]]]]) -> Dict[str, List[Message]]:
+        """
+        Runs the tier lookups, concurrently when there are several, so a turn waits for
+        the slowest tier rather than the sum. A tier past its timeout keeps running in
+        the pool but its result is dropped.
+        """
+        degraded: List[str] = []
+        self._retrieval_state.degraded = degraded
+        results = {}
+        tracer = get_tracer()
+        if len(tiers) <= 1 or not self.parallel_retrieval:
+            # In the calling thread, so there is nothing to time out; a failure still degrades
+            for name, lookup in tiers:
+                try:
+                    results[name] = lookup()
+                except Exception as e:
+                    print(f"Retrieval tier '{name}' failed: {e}")
+                    tracer.count(f"retrieval.{name}.error")
+                    degraded.append(name)
+            return results
+
+        start = time.monotonic()
+        futures = [(name, retrieval_pool().submit(lookup)) for name, lookup in tiers]
+        for name, future in futures:
+            timeout = self.tier_timeouts.get(name, self.retrieval_timeout)
+            try:
+                results[name] = future.result(timeout=max(0.0, start + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"Retrieval tier '{name}' timed out after {timeout}s; continuing without it")
+                tracer.count(f"retrieval.{name}.timeout")
+                degraded.append(name)
+            except Exception as e:
+                print(f"Retrieval tier '{name}' failed: {e}")
+                tracer.count(f"retrieval.{name}.error")
+                degraded.append(name)
+        return results
+
+    def _episodic_context(self, current_query: str) -> List[Message]:
         relevant_context = []
-        if current_query:
+        with get_tracer().span("retrieval.episodic"), self._lock:
             top_episodes = self._retrieve_episodes(current_query)
-            for ep in top_episodes:
-                # Format episode as a system message or special context message
-                relevant_context.append(Message(
-                    role="system", 
-                    content=f"[Memory from {datetime.fromtimestamp(ep.timestamp)}]: {ep.content}",
-                    metadata={"type": "episodic"}
-                ))
-        
-        # 2. Append STM (Recent conversation)
-        return relevant_context + self.stm_window[-self.stm_limit:]
+        for ep in top_episodes:
+            # Format episode as a system message or special context message
+            rollup_level = ep.metadata.get("level")
+            if rollup_level:
+                label = f"{rollup_level.title()} summary, {datetime.fromtimestamp(ep.metadata['start']).date()} " \
+                        f"to {datetime.fromtimestamp(ep.timestamp).date()}"
+            else:
+                label = f"Memory from {datetime.fromtimestamp(ep.timestamp)}"
+            relevant_context.append(Message(
+                role="system", 
+                content=f"[{label}]: {ep.content}",
+                metadata={"type": "episodic"}
+            ))
+        return relevant_context
 
     def _consolidate_memory(self):
         """Moves older messages from STM to a summarized Episode."""
+        with self._lock:
+            messages_to_summarize = self._take_overflow()
+        if not messages_to_summarize:
+            return
+        with get_tracer().span("memory.consolidation"):
+            self._commit_episodes([self._build_episode(messages_to_summarize, time.time())])
+
+    def _take_overflow(self) -> List[Message]:
         # Allow keeping last 'stm_limit' messages, summarize the rest
         messages_to_summarize = self.stm_window[:-self.stm_limit]
         self.stm_window = self.stm_window[-self.stm_limit:] # Keep recent
-        
-        if not messages_to_summarize:
-            return
+        return messages_to_summarize
 
-        text_block = "\n".join([f"{m.role}: {m.content}" for m in messages_to_summarize])
-        
+    def _summarize(self, messages: List[Message]) -> str:
         # TODO: Use LLM to summarize. For now, we mock summary or use crude extraction.
         # summary = self.llm_client.generate_response(...)
-        summary = f"Interaction loop where user said: {[m.content for m in messages_to_summarize if m.role == 'user']}"
-        keywords = [w for w in text_block.split() if len(w) > 4] # Crude keyword extraction
-        
-        episode = Episode(
+        return f"Interaction loop where user said: {[m.content for m in messages if m.role == 'user']}"
+
+    def _build_episode(self, messages: List[Message], timestamp: float) -> Episode:
+        # Contents only: role prefixes would be a keyword of every episode
+        keywords = self.keyword_extractor.extract("\n".join([m.content for m in messages]))
+        return Episode(
             id=str(uuid.uuid4()),
-            content=summary,
+            content=self._summarize(messages),
             keywords=keywords,
-            timestamp=time.time(),
+            timestamp=timestamp,
             metadata={}
         )
+
+    def _commit_episodes(self, episodes: List[Episode]):
+        with self._lock:
+            for episode in episodes:
+                self._add_episode(episode)
+            self._bump("episodic")
+            # Append just the new episodes; rewrite the file only when compaction is due
+            tracer = get_tracer()
+            with tracer.span("memory.persistence"):
+                self.store.append_many([ep.to_dict() for ep in episodes])
+            tracer.count("memory.episodes_committed", len(episodes))
+            self._since_rollup += len(episodes)
+            rollup_due = self.rollup_policy is not None and self._since_rollup >= self.rollup_policy.every
+            if not rollup_due and self.store.should_compact():
+                with tracer.span("memory.compaction"):
+                    self.save_memory()
+        if rollup_due:
+            with tracer.span("memory.rollup"):
+                self.rollup()  # Rewrites the store, so no separate compaction
+
+    def _add_episode(self, episode: Episode):
+        """Appends an episode and indexes its keywords."""
         self.episodes.append(episode)
-        self.save_memory()
+        self.keyword_index.add(episode.keywords)
 
     def _retrieve_episodes(self, query: str, top_k: int = 3) -> List[Episode]:
         """
         Scoring Logic:
-        Score = (Keyword Match * 0.5) + (Recency Boost * 0.3) + (Decay Penalty)
+        Score = (Keyword Match * 0.7) + (Decay * 0.3)
+
+        Candidates come from the inverted keyword index. Episodes sharing no term
+        with the query score on decay alone, which only grows with recency, so just
+        the newest top_k of them (by timestamp, via argpartition) can rank.
+        Scores are computed in one vectorized pass over the candidates' columns.
         """
-        query_words = set(query.lower().split())
-        scored_episodes = []
+        if top_k <= 0:
+            return []
+        query_words = self.keyword_extractor.query_terms(query)
         current_time = time.time()
-        
-        for ep in self.episodes:
-            # 1. Keyword Score
-            ep_keywords = set([k.lower() for k in ep.keywords])
-            match_count = len(query_words.intersection(ep_keywords))
-            keyword_score = match_count / (len(query_words) + 1) # Normalize roughly
-            
-            # 2. Recency / Decay
-            # Simple exponential decay: e^(-delta_time / lambda)
-            hours_passed = (current_time - ep.timestamp) / 3600
-            decay_score = math.exp(-hours_passed / 24) # Decays over days
-            
-            # Total Score
-            final_score = (keyword_score * 0.7) + (decay_score * 0.3)
-            scored_episodes.append((final_score, ep))
-            
-        # Sort and return top K
-        scored_episodes.sort(key=lambda x: x[0], reverse=True)
-        return [ep for _, ep in scored_episodes[:top_k]]
+        matched, match_counts = self.keyword_index.match_counts(query_words)
+
+        # 1. Candidate generation: index hits + newest non-matching episodes. Picked by
+        # timestamp, not position: bulk ingest appends historical episodes after live ones.
+        n = len(self.episodes)
+        fallback = np.empty(0, dtype=np.int64)
+        if n > len(matched):
+            timestamps = self.episodes.timestamp_column()
+            timestamps[matched] = -np.inf
+            if n - len(matched) > top_k:
+                # Keep everything tied with the top_k-th newest, so ties rank as in a full scan
+                cutoff = np.partition(timestamps, n - top_k)[n - top_k]
+                fallback = np.flatnonzero(timestamps >= cutoff)
+            else:
+                fallback = np.flatnonzero(timestamps > -np.inf)
+        positions = np.concatenate([matched, fallback])
+        counts = np.concatenate([match_counts, np.zeros(len(fallback), dtype=np.int64)])
+
+        # 2. Keyword Score
+        keyword_scores = counts / (len(query_words) + 1) # Normalize roughly
+
+        # 3. Recency / Decay
+        # Simple exponential decay: e^(-delta_time / lambda)
+        hours_passed = (current_time - self.episodes.timestamps(positions)) / 3600
+        decay_scores = np.exp(-hours_passed / 24) # Decays over days
+
+        # Total Score
+        scores = (keyword_scores * 0.7) + (decay_scores * 0.3)
+
+        # 4. Top K via argpartition; ties keep insertion order, like a stable sort
+        if len(scores) > top_k:
+            kth = np.argpartition(-scores, top_k - 1)[:top_k]
+            selected = np.nonzero(scores >= scores[kth].min())[0]
+        else:
+            selected = np.arange(len(scores))
+        order = selected[np.lexsort((positions[selected], -scores[selected]))][:top_k]
+        return [self.episodes[int(pos)] for pos in positions[order]]
+
+    def rollup(self) -> int:
+        """
+        Applies the rollup policy: rolls old episodes into day/week summaries, evicts
+        the oldest beyond the size target, archives what left the live store, and
+        rewrites the store as a fresh snapshot. Returns the number of episodes removed.
+        """
+        policy = self.rollup_policy or RollupPolicy()
+        with self._rollup_lock:
+            with self._lock:
+                self._since_rollup = 0
+                episodes = self.episodes
+                planned = len(episodes)
+                records = list(episodes.records())
+            if not records:
+                return 0
+            # Plan (summaries are LLM calls) on the copy, so retrieval and commits go on meanwhile
+            now = max(r["timestamp"] for r in records)
+            kept, removed = plan_rollup(records, now, policy, self._summarize_rollup)
+            if not removed:
+                return 0
+            with self._lock:
+                if self.episodes is not episodes:
+                    return 0  # Cleared or reloaded while planning; the plan is stale
+                # Episodes committed while planning are kept as they are
+                kept += [episodes[i].to_dict() for i in range(planned, len(episodes))]
+                if policy.archive:
+                    self.store.archive(removed)
+                self.store.compact(kept)
+                # Positions changed, so rebuild the views over the new snapshot
+                self.episodes = EpisodeSequence(Episode, self.store.snapshot)
+                self.keyword_index = KeywordIndex(self.store.snapshot)
+                self._bump("episodic")
+                return len(removed)
+
+    def _summarize_rollup(self, records: List[Dict[str, Any]], rollup_level: str) -> str:
+        memories = "\n".join(f"- {r['content']}" for r in records)
+        fallback = f"{rollup_level.title()} summary: " + " | ".join(r["content"] for r in records)[:1000]
+        if self.llm_client is None:
+            return fallback
+        prompt = [
+            {"role": "system", "content": f"Condense these memories from one {rollup_level} of a conversation into a short summary. Keep names, facts, preferences and decisions."},
+            {"role": "user", "content": memories}
+        ]
+        try:
+            summary = self.llm_client.generate_response(prompt)
+        except Exception as e:
+            summary = f"{ERROR_PREFIX}: {e}"
+        if not summary or summary.startswith(ERROR_PREFIX):
+            # The children leave the live store, so never replace them with an error message
+            print(f"Error summarizing {rollup_level} rollup: {summary}")
+            return fallback
+        return summary
 
     def save_memory(self):
-        # Serialization logic
-        data = [{
-            "id": ep.id, 
-            "content": ep.content, 
-            "keywords": ep.keywords,
-            "timestamp": ep.timestamp,
-            "metadata": ep.metadata
-        } for ep in self.episodes]
-        with open(self.file_path, 'w') as f:
-            json.dump(data, f)
+        """Compacts everything into a fresh memory-mapped snapshot."""
+        self.store.compact(self.episodes.records())
+        # Positions are unchanged by compaction; the snapshot now carries their postings
+        self.episodes.rebase(self.store.snapshot)
+        self.keyword_index = KeywordIndex(self.store.snapshot)
 
     def load_memory(self):
-        if not os.path.exists(self.file_path):
+        if not os.path.exists(self.file_path) and not os.path.exists(self.store.snapshot_path):
             return
         
         try:
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
-                self.episodes = [Episode(**item) for item in data]
+            tail = self.store.load()
+            # Only the journal tail is decoded; snapshot episodes stay on disk until retrieved
+            self.episodes = EpisodeSequence(Episode, self.store.snapshot)
+            self.keyword_index = KeywordIndex(self.store.snapshot)
+            legacy = self.store.is_legacy
+            for item in tail:
+                if legacy:
+                    item = dict(item, keywords=self._migrate_keywords(item))
+                self._add_episode(Episode(**item))
+            if legacy:
+                # Migrate the old single-array JSON file to the snapshot + journal format
+                self.save_memory()
         except Exception as e:
             print(f"Error loading memory: {e}")
 
+    def _migrate_keywords(self, record: Dict[str, Any]) -> List[str]:
+        # Legacy keywords are raw whitespace tokens ("ticket?", "user:"); queries would never
+        # match them, so re-extract terms from them (or from the content if there are none),
+        # leaving out the role prefixes that were a keyword of nearly every episode
+        words = [w for w in record.get("keywords") or [] if w not in LEGACY_ROLE_PREFIXES]
+        return self.keyword_extractor.extract(" ".join(words) or record["content"])
+
     def clear(self):
+        self.close()
+        self.context_cache.clear()
         self.stm_window = []
-        self.episodes = []
-        if os.path.exists(self.file_path):
-            os.remove(self.file_path)
+        self.episodes = EpisodeSequence(Episode)
+        self.keyword_index = KeywordIndex()
+        self.store.remove()
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple, Type
+from agent import BaseAgent, MemoryInterface, Message
+from memory_episodic import EpisodicMemory
+from memory_semantic import SemanticMemory
+from memory_reflection import ReflectionMemory
+from reflection_scheduler import ReflectionScheduler
+from embedding_cache import EmbeddingCache
+from vector_store import LazyEmbeddingFunction, open_vector_client
+
+
+@dataclass
+class _Tenant:
+    memory: Optional[EpisodicMemory] = None  # None until the first caller has loaded it
+    active: int = 0  # Calls in flight; a tenant in use is never evicted
+    loaded: threading.Event = field(default_factory=threading.Event)  # Set once loading ended
+
+
+class MemoryManager:
+    """
+    Hosts one memory per tenant (conversation or user id) in a single process.
+    - Each tenant gets its own directory under `root_dir` for episodes, reflections and
+      its STM while evicted.
+    - Semantic tiers share one vector store client, one embedding function and one EmbeddingCache;
+      tenants share the collections and are separated by a "tenant" metadata filter.
+      The client is opened when the first tenant loads, the embedding model on first use.
+    - With a `reflection_policy`, tenants share one ReflectionScheduler, so their
+      critiques are batched into common requests under one token budget.
+    - At most `max_resident` tenants stay in RAM. The least recently used idle tenant is
+      flushed to disk and dropped; it is reloaded lazily on its next call.
+    - The lock only guards the tenant table: loading and unloading (file I/O, closing
+      stores) happen outside it, so a cold tenant never stalls calls for other tenants.
+    Works with EpisodicMemory and its subclasses; extra kwargs go to `memory_class`.
+    """
+    def __init__(self, llm_client, memory_class: Type[EpisodicMemory] = EpisodicMemory,
+                 root_dir: str = "./tenants", db_path: str = "./chroma_db", max_resident: int = 1000,
+                 **memory_kwargs):
+        self.llm_client = llm_client
+        self.memory_class = memory_class
+        self.root_dir = root_dir
+        self.max_resident = max_resident
+        self.memory_kwargs = memory_kwargs
+        self._tenants: "OrderedDict[str, _Tenant]" = OrderedDict()
+        self._unloading: Dict[str, threading.Event] = {}  # Evicted tenants still being written out
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+        self.db_path = db_path
+        self.vector_store = memory_kwargs.pop("vector_store", "chroma")
+        self._vector_client = memory_kwargs.pop("vector_client", None)
+        os.makedirs(root_dir, exist_ok=True)
+
+        if issubclass(memory_class, SemanticMemory):
+            embedding_function = memory_kwargs.pop("embedding_function", None) or LazyEmbeddingFunction()
+            embedding_cache = memory_kwargs.pop("embedding_cache", None) or EmbeddingCache(embedding_function)
+            self.memory_kwargs.update(embedding_function=embedding_function, embedding_cache=embedding_cache)
+        if issubclass(memory_class, ReflectionMemory) and memory_kwargs.get("reflection_policy"):
+            memory_kwargs.setdefault("reflection_scheduler", ReflectionScheduler(memory_kwargs["reflection_policy"]))
+
+    @property
+    def vector_client(self):
+        with self._lock:
+            if self._vector_client is None:
+                self._vector_client = open_vector_client(self.vector_store, self.db_path)
+            return self._vector_client
+
+    def memory(self, tenant_id: str) -> "TenantMemory":
+        """A lightweight handle that resolves the tenant's memory on every call."""
+        return TenantMemory(self, tenant_id)
+
+    def create_agent(self, name: str, tenant_id: str = None, tools: List[Any] = None) -> BaseAgent:
+        """Builds a BaseAgent whose conversation_id is the tenant id."""
+        tenant_id = tenant_id or str(uuid.uuid4())
+        agent = BaseAgent(name, self.memory(tenant_id), self.llm_client, tools)
+        agent.conversation_id = tenant_id
+        return agent
+
+    @contextmanager
+    def checkout(self, tenant_id: str):
+        """Yields the tenant's memory (loading it if cold) and pins it for the duration."""
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            loader = tenant is None
+            if loader:
+                # Latch: later callers for this tenant wait on `loaded` instead of loading again
+                tenant = self._tenants[tenant_id] = _Tenant()
+                unloading = self._unloading.get(tenant_id)
+            self._tenants.move_to_end(tenant_id)
+            tenant.active += 1
+        try:
+            if loader:
+                try:
+                    if unloading is not None:
+                        unloading.wait()  # Its files are still being written by an eviction
+                    tenant.memory = self._load(tenant_id)
+                except BaseException:
+                    with self._lock:
+                        if self._tenants.get(tenant_id) is tenant:
+                            del self._tenants[tenant_id]
+                    raise
+                finally:
+                    tenant.loaded.set()
+            else:
+                tenant.loaded.wait()
+                if tenant.memory is None:
+                    raise RuntimeError(f"Tenant {tenant_id} failed to load")
+            yield tenant.memory
+        finally:
+            with self._lock:
+                tenant.active -= 1
+                victims = self._take_overflow()
+            self._unload_all(victims)
+
+    def get(self, tenant_id: str) -> EpisodicMemory:
+        """Returns the tenant's memory without pinning it (prefer checkout() or memory())."""
+        with self.checkout(tenant_id) as memory:
+            return memory
+
+    def evict(self, tenant_id: str) -> bool:
+        """Writes an idle tenant to disk and drops it from RAM."""
+        with self._lock:
+            tenant = self._take(tenant_id)
+        if tenant is None:
+            return False
+        self._unload_all([(tenant_id, tenant)])
+        return True
+
+    def close(self):
+        """Evicts every tenant, leaving all state on disk."""
+        with self._lock:
+            victims = [(tenant_id, self._take(tenant_id)) for tenant_id in list(self._tenants)]
+        self._unload_all([(tenant_id, tenant) for tenant_id, tenant in victims if tenant is not None])
+
+    def resident(self) -> List[str]:
+        with self._lock:
+            return list(self._tenants)
+
+    def stats(self) -> Dict[str, int]:
+        return {"resident": len(self._tenants), "loads": self.loads, "evictions": self.evictions}
+
+    def tenant_dir(self, tenant_id: str) -> str:
+        # Ids may hold any characters; keep a readable prefix and disambiguate with a hash
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", tenant_id)[:48]
+        return os.path.join(self.root_dir, f"{safe}-{hashlib.sha1(tenant_id.encode()).hexdigest()[:10]}")
+
+    def _take(self, tenant_id: str) -> Optional[_Tenant]:
+        """Removes an idle tenant from the table (caller holds _lock); unload it afterwards."""
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None or tenant.active:
+            return None
+        del self._tenants[tenant_id]
+        self._unloading[tenant_id] = threading.Event()
+        self.evictions += 1
+        return tenant
+
+    def _take_overflow(self) -> List[Tuple[str, _Tenant]]:
+        victims = []
+        for tenant_id in list(self._tenants):  # Least recently used first
+            if len(self._tenants) <= self.max_resident:
+                break
+            tenant = self._take(tenant_id)
+            if tenant is not None:
+                victims.append((tenant_id, tenant))
+        return victims
+
+    def _unload_all(self, victims: List[Tuple[str, _Tenant]]):
+        for tenant_id, tenant in victims:
+            try:
+                self._unload(tenant_id, tenant.memory)
+            finally:
+                with self._lock:
+                    self._unloading.pop(tenant_id).set()
+
+    def _load(self, tenant_id: str) -> EpisodicMemory:
+        path = self.tenant_dir(tenant_id)
+        os.makedirs(path, exist_ok=True)
+        kwargs = dict(self.memory_kwargs, file_path=os.path.join(path, "episodic_memory.json"))
+        if issubclass(self.memory_class, SemanticMemory):
+            kwargs.update(tenant_id=tenant_id, vector_client=self.vector_client)
+        if issubclass(self.memory_class, ReflectionMemory):
+            kwargs["reflection_file"] = os.path.join(path, "reflections.txt")
+        memory = self.memory_class(self.llm_client, **kwargs)
+
+        # Restore the STM saved at eviction
+        stm_path = os.path.join(path, "stm.json")
+        if os.path.exists(stm_path):
+            try:
+                with open(stm_path, "r") as f:
+                    memory.stm_window = [Message.from_dict(m) for m in json.load(f)]
+                os.remove(stm_path)  # From here on the resident copy is authoritative
+            except Exception as e:
+                print(f"Error loading STM for tenant {tenant_id}: {e}")
+        with self._lock:
+            self.loads += 1
+        return memory
+
+    def _unload(self, tenant_id: str, memory: EpisodicMemory):
+        try:
+            memory.close()  # Drains background consolidation and buffered semantic writes
+            if memory.stm_window:
+                stm_path = os.path.join(self.tenant_dir(tenant_id), "stm.json")
+                tmp_path = stm_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump([m.to_dict() for m in memory.stm_window], f)
+                os.replace(tmp_path, stm_path)
+            memory.store.close()
+        except Exception as e:
+            print(f"Error evicting tenant {tenant_id}: {e}")
+
+
+class TenantMemory(MemoryInterface):
+    """MemoryInterface for one tenant of a MemoryManager; safe to hold across evictions."""
+    def __init__(self, manager: MemoryManager, tenant_id: str):
+        self.manager = manager
+        self.tenant_id = tenant_id
+
+    def add_message(self, message: Message):
+        with self.manager.checkout(self.tenant_id) as memory:
+            memory.add_message(message)
+
+    def get_context(self, current_query: str = None) -> List[Message]:
+        with self.manager.checkout(self.tenant_id) as memory:
+            return memory.get_context(current_query)
+
+    def clear(self):
+        with self.manager.checkout(self.tenant_id) as memory:
+            memory.clear()
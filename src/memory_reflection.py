@@ -1,56 +1,131 @@
 from typing import List, Dict, Any
+import hashlib
 import uuid
 import time
+import threading
 from datetime import datetime
 from agent import MemoryInterface, Message
-from llm import LLMClient
+from llm import LLMClient, ERROR_PREFIX
 from memory_semantic import SemanticMemory
+from embedding_cache import EmbeddingCache
+from reflection_scheduler import ReflectionPolicy, ReflectionScheduler, format_history
+from tracing import get_tracer
 
 class ReflectionMemory(SemanticMemory):
     """
     Architecture D: STM + Episodic + Semantic + Reflection.
     Adds a 'Reflector' that analyzes past interactions to create 'Lessons Learned'.
     These lessons are retrieved and injected as high-priority System Prompts.
+    Lessons are logged to `reflections.txt` and indexed in their own vector collection;
+    only the `reflection_top_k` most relevant to the query (cosine similarity of at least
+    `reflection_min_similarity`) are injected, so the prompt stays flat as lessons pile up.
+    A new lesson within `reflection_dedup_similarity` of an existing one is not stored again.
+    With a `tenant_id`, lessons share the reflection collection but stay per tenant.
+    With a `reflection_policy`, reflect() is also triggered by the conversation itself
+    (every N turns, negative feedback) and runs on a ReflectionScheduler, which may be
+    shared with other memories (`reflection_scheduler`) to batch their critiques.
     """
-    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json", db_path: str = "./chroma_db"):
-        super().__init__(llm_client, stm_size, file_path, db_path)
+    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json", db_path: str = "./chroma_db",
+                 reflection_top_k: int = 3, reflection_min_similarity: float = 0.2,
+                 reflection_dedup_similarity: float = 0.9, reflection_file: str = "reflections.txt",
+                 reflection_policy: ReflectionPolicy = None, reflection_scheduler: ReflectionScheduler = None, **kwargs):
+        super().__init__(llm_client, stm_size, file_path, db_path, **kwargs)
         self.reflections: List[str] = [] 
-        # In a real app, reflections should be stored solely in a dedicated VectorDB collection or file.
-        # For simplicity, we'll store them in memory + append to a file.
-        self.reflection_file = "reflections.txt"
+        self.reflection_file = reflection_file
+        self.reflection_top_k = reflection_top_k
+        self.reflection_min_similarity = reflection_min_similarity
+        self.reflection_dedup_similarity = reflection_dedup_similarity
+        self.generations["reflection"] = 0
+        self._reflection_collection = None
+        self._reflection_lock = threading.Lock()  # Duplicate check and store of one lesson
+        self.reflection_policy = reflection_policy or (reflection_scheduler.policy if reflection_scheduler else None)
+        self._reflection_scheduler = reflection_scheduler
+        self._owns_scheduler = reflection_scheduler is None
+        self._turns_since_reflection = 0
+        self._feedback_pending = False
         self._load_reflections()
 
+    @property
+    def reflection_collection(self):
+        # Opened on first use, like the semantic collection
+        if self._reflection_collection is None:
+            with self._open_lock:
+                if self._reflection_collection is None:
+                    self._reflection_collection = self._open_collection(
+                        "agent_reflections", configuration={"hnsw": {"space": "cosine"}}
+                    )
+                    self._backfill_reflections()
+        return self._reflection_collection
+
+    def _open_stores(self):
+        super()._open_stores()
+        self.reflection_collection
+
+    @property
+    def reflection_scheduler(self) -> ReflectionScheduler:
+        if self._reflection_scheduler is None:
+            with self._lock:
+                if self._reflection_scheduler is None:
+                    self._reflection_scheduler = ReflectionScheduler(self.reflection_policy)
+        return self._reflection_scheduler
+
     def add_message(self, message: Message):
         super().add_message(message)
-        # Trigger reflection logic could go here (e.g. after every N turns or on 'error')
-        # For this research, we will manually call reflect() from the agent/test loop.
+        policy = self.reflection_policy
+        if policy is None:
+            return
+        # After the agent's reply to negative feedback, otherwise every N replies
+        if message.role == "user":
+            if policy.on_negative_feedback and policy.is_negative(message.content):
+                self._feedback_pending = True
+        elif message.role == "assistant":
+            self._turns_since_reflection += 1
+            if self._feedback_pending or (policy.every_turns and self._turns_since_reflection >= policy.every_turns):
+                self._schedule_reflection(feedback=self._feedback_pending)
 
-    def get_context(self, current_query: str = None) -> List[Message]:
-        # 1. Get Base Context (Semantic + Episodic + STM)
-        base_context = super().get_context(current_query)
-        
-        # 2. Get Relevant Reflections
-        # We want to check if any "lesson" applies to the current situation.
-        # Ideally, we verify against the current query using Vector Search on the reflections.
-        # For this prototype, we'll inject ALL recent reflections as high-level instructions
-        # because the list is short. In production, we'd use semantic search for this too.
-        
-        reflection_msgs = []
-        if self.reflections:
-            content = "CRITICAL INSTRUCTIONS (Derived from past mistakes):\n" + "\n".join([f"- {r}" for r in self.reflections])
-            reflection_msgs.append(Message(
-                role="system",
-                content=content,
-                metadata={"type": "reflection", "priority": "high"}
-            ))
-            
-        return reflection_msgs + base_context
+    def _schedule_reflection(self, feedback: bool = False):
+        with self._lock:
+            window = self.stm_window[-self.reflection_policy.window:]
+            self._turns_since_reflection = 0
+            self._feedback_pending = False
+        self.reflection_scheduler.submit(self, window, feedback)
+
+    def flush(self):
+        """Also waits for this memory's scheduled reflections."""
+        super().flush()
+        if self._reflection_scheduler:
+            self._reflection_scheduler.flush(self)
+
+    def close(self):
+        if self._reflection_scheduler:
+            self._reflection_scheduler.flush(self)
+            if self._owns_scheduler:
+                self._reflection_scheduler.close()
+                self._reflection_scheduler = None
+        super().close()
+
+    def _retrieval_tiers(self, current_query: str = None):
+        # Reflections come first, ahead of the base tiers (Semantic + Episodic)
+        return [("reflection", lambda: self._reflection_context(current_query))] + super()._retrieval_tiers(current_query)
+
+    def _reflection_context(self, current_query: str = None) -> List[Message]:
+        # Only lessons that apply to the current situation, by vector search on the query.
+        with get_tracer().span("retrieval.reflection"):
+            relevant = self._query_reflections(current_query) if current_query else self.reflections[-self.reflection_top_k:]
+        if not relevant:
+            return []
+        content = "CRITICAL INSTRUCTIONS (Derived from past mistakes):\n" + "\n".join([f"- {r}" for r in relevant])
+        return [Message(
+            role="system",
+            content=content,
+            metadata={"type": "reflection", "priority": "high"}
+        )]
 
     def reflect(self, recent_history: List[Message]):
         """
         Analyzes the recent history to find mistakes and generate a lesson.
         """
-        history_text = "\n".join([f"{m.role}: {m.content}" for m in recent_history])
+        history_text = format_history(recent_history)
         
         prompt = [
             {"role": "system", "content": "You are a critical observer of an AI agent. Analyze the following interaction. If the agent made a mistake or the user was unhappy, formulate a 'Lesson Learned' or 'Rule' to prevent this in the future. If no mistake, return 'None'."},
@@ -58,15 +133,78 @@ class ReflectionMemory(SemanticMemory):
         ]
         
         print("\n[Reflection Process Running...]")
-        critique = self.llm_client.generate_response(prompt)
-        
-        if "None" not in critique and len(critique) > 5:
-            print(f"[New Lesson Learned]: {critique}")
-            self.reflections.append(critique)
-            self._save_reflection(critique)
+        with get_tracer().span("reflection.llm"):
+            critique = self.llm_client.generate_response(prompt)
+        self._learn(critique)
+
+    def _learn(self, critique: str):
+        """Stores a critique as a lesson unless it is 'None' or already known."""
+        if "None" not in critique and len(critique) > 5 and not critique.startswith(ERROR_PREFIX):
+            with self._reflection_lock:
+                if self._is_duplicate_reflection(critique):
+                    print(f"[Reflection]: Lesson already known: {critique}")
+                    return
+                print(f"[New Lesson Learned]: {critique}")
+                self.reflections.append(critique)
+                self._save_reflection(critique)
+                self._index_reflections([critique])
+            self._bump("reflection")
         else:
             print("[Reflection]: No new lessons.")
 
+    def _query_reflections(self, query: str) -> List[str]:
+        if not self.reflections:
+            return []
+        try:
+            results = self.reflection_collection.query(
+                query_embeddings=self.embedding_cache.embed([query]),
+                n_results=min(self.reflection_top_k, len(self.reflections)),
+                where=self._tenant_filter()
+            )
+            if not results['documents']:
+                return []
+            # Cosine distance -> similarity
+            return [doc for doc, dist in zip(results['documents'][0], results['distances'][0])
+                    if 1 - dist >= self.reflection_min_similarity]
+        except Exception as e:
+            print(f"Reflection Scan Error: {e}")
+            return []
+
+    def _is_duplicate_reflection(self, text: str) -> bool:
+        if not self.reflections:
+            return False
+        try:
+            results = self.reflection_collection.query(
+                query_embeddings=self.embedding_cache.embed([text]),
+                n_results=1,
+                where=self._tenant_filter()
+            )
+            distances = results['distances'][0] if results['distances'] else []
+            return bool(distances) and 1 - distances[0] >= self.reflection_dedup_similarity
+        except Exception as e:
+            print(f"Reflection Scan Error: {e}")
+            return False
+
+    def _index_reflections(self, texts: List[str]):
+        # Content-derived ids make re-indexing the log idempotent
+        self.reflection_collection.upsert(
+            ids=[self._reflection_id(t) for t in texts],
+            documents=texts,
+            embeddings=self.embedding_cache.embed(texts),
+            metadatas=[self._tenant_metadata({}) for _ in texts] if self.tenant_id else None
+        )
+
+    def _reflection_id(self, text: str) -> str:
+        key = EmbeddingCache.normalize(text)
+        if self.tenant_id:
+            key = f"{self.tenant_id}\n{key}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _count_reflections(self) -> int:
+        if not self.tenant_id:
+            return self.reflection_collection.count()
+        return len(self.reflection_collection.get(where=self._tenant_filter(), include=[])["ids"])
+
     def _save_reflection(self, text: str):
         with open(self.reflection_file, "a") as f:
             f.write(text + "\n")
@@ -77,3 +215,8 @@ class ReflectionMemory(SemanticMemory):
                 self.reflections = [line.strip() for line in f.readlines() if line.strip()]
         except FileNotFoundError:
             pass
+
+    def _backfill_reflections(self):
+        # Index lessons from the log that the collection lacks (e.g. written before it existed)
+        if self.reflections and self._count_reflections() < len(set(self.reflections)):
+            self._index_reflections(list(dict.fromkeys(self.reflections)))
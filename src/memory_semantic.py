@@ -1,22 +1,108 @@
-import chromadb
 import uuid
 import time
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from agent import MemoryInterface, Message
 from llm import LLMClient
 from memory_episodic import EpisodicMemory, Episode
+from embedding_cache import EmbeddingCache
+from tracing import get_tracer
+from vector_store import LazyEmbeddingFunction, open_vector_client
 
 class SemanticMemory(EpisodicMemory):
     """
     Architecture C: STM + Episodic + Semantic.
     Extends EpisodicMemory but adds a Vector DB layer for semantic retrieval.
+    Semantic writes are buffered and sent as one collection.add (one batched
+    embedding pass) once `write_batch_size` messages are pending, the oldest has
+    waited `write_flush_interval` seconds (a timer flushes an idle buffer), or a read
+    needs them (read-your-writes).
+    Documents and queries are embedded through an EmbeddingCache (pass one in to
+    share it between memories) and handed to the store as precomputed embeddings.
+    `vector_store` picks the backend ("chroma", or "local" for the in-process NumPy
+    index in vector_store.py); pass `vector_client` to share one client, and `tenant_id`
+    to share the collection with other memories: documents are tagged with the tenant
+    and queries filtered by it.
+    Nothing heavy happens in __init__: the vector store client and collection are opened
+    and the embedding model is loaded by warm_up(), in the background on the first write,
+    or at the latest before the first retrieval starts its tier timeouts.
     """
-    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json", db_path: str = "./chroma_db"):
-        super().__init__(llm_client, stm_size, file_path)
-        self.chroma_client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.chroma_client.get_or_create_collection(name="agent_memory")
+    def __init__(self, llm_client: LLMClient, stm_size: int = 5, file_path: str = "episodic_memory.json", db_path: str = "./chroma_db",
+                 write_batch_size: int = 32, write_flush_interval: float = 5.0,
+                 embedding_function=None, embedding_cache: EmbeddingCache = None,
+                 vector_store: str = "chroma", vector_client=None, tenant_id: str = None, **kwargs):
+        super().__init__(llm_client, stm_size, file_path, **kwargs)
+        self.embedding_function = embedding_function or LazyEmbeddingFunction()
+        self.embedding_cache = embedding_cache or EmbeddingCache(self.embedding_function)
+        self.db_path = db_path
+        self.vector_store = vector_store
+        self.tenant_id = tenant_id
+        self._vector_client = vector_client
+        self._collection = None
+        self._store_lock = threading.RLock()  # Write buffer
+        self._open_lock = threading.RLock()   # Lazy client/collection opens
+        self._warmup_started = False
+        self._warm = threading.Event()
+        self.write_batch_size = write_batch_size
+        self.write_flush_interval = write_flush_interval
+        self._pending_semantic: List[Message] = []
+        self._pending_since = 0.0
+        self._flush_timer: Optional[threading.Timer] = None
+        self.generations["semantic"] = 0
         
+    @property
+    def vector_client(self):
+        if self._vector_client is None:
+            with self._open_lock:
+                if self._vector_client is None:
+                    self._vector_client = open_vector_client(self.vector_store, self.db_path)
+        return self._vector_client
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._open_lock:
+                if self._collection is None:
+                    self._collection = self._open_collection("agent_memory")
+        return self._collection
+
+    def warm_up(self, background: bool = False):
+        """
+        First-use initialization: loads the embedding model (one probe embedding) and opens
+        the collections. Runs once; without `background`, waits until it has finished.
+        """
+        with self._open_lock:
+            start = not self._warmup_started
+            self._warmup_started = True
+        if start and background:
+            threading.Thread(target=self._warm_up, name="semantic-warmup", daemon=True).start()
+        elif start:
+            self._warm_up()
+        if not background:
+            self._warm.wait()
+
+    def _warm_up(self):
+        try:
+            self.embedding_function(["warm up"])
+            self._open_stores()
+        except Exception as e:
+            print(f"Error warming up semantic memory: {e}")
+        finally:
+            self._warm.set()
+
+    def _open_stores(self):
+        self.collection
+
+    def _gather_context(self, current_query: str = None) -> List[Message]:
+        if current_query:
+            self.warm_up()  # Before the tiers start, so initialization never counts against their timeouts
+        return super()._gather_context(current_query)
+
+    def _open_collection(self, name: str, **kwargs):
+        # Embeddings are always precomputed through the EmbeddingCache, so the store needs no function
+        return self.vector_client.get_or_create_collection(name=name, embedding_function=None, **kwargs)
+
     def add_message(self, message: Message):
         # 1. Standard STM + Episodic processing
         super().add_message(message)
@@ -28,45 +114,104 @@ class SemanticMemory(EpisodicMemory):
         if message.role == "user":
             self._store_semantic(message)
 
-    def get_context(self, current_query: str = None) -> List[Message]:
-        relevant_context = []
-        
-        # 1. Semantic Retrieval (Vector DB)
-        if current_query:
+    def _retrieval_tiers(self, current_query: str = None):
+        # Semantic first, then the parent's tiers (Episodic); STM is appended after all of them
+        if not current_query:
+            return super()._retrieval_tiers(current_query)
+        return [("semantic", lambda: self._semantic_context(current_query))] + super()._retrieval_tiers(current_query)
+
+    def _semantic_context(self, current_query: str) -> List[Message]:
+        # Vector DB retrieval; buffered writes go in first (read-your-writes)
+        self._flush_semantic()
+        with get_tracer().span("retrieval.semantic"):
             semantic_results = self._query_semantic(current_query)
-            for res in semantic_results:
-                relevant_context.append(Message(
-                    role="system",
-                    content=f"[Semantic Memory]: {res}",
-                    metadata={"type": "semantic"}
-                ))
-                
-        # 2. Episodic Retrieval (Scoring based) - from Parent
-        episodic_context = super().get_context(current_query)
-        
-        # 3. Merge (Avoid duplicates is tricky, but for now simple append)
-        # episodic_context includes STM at the end.
-        
-        # We put Semantic First, then Episodic, then STM.
-        # But 'episodic_context' has (Episodes + STM).
-        # So we prepend Semantic to that.
-        return relevant_context + episodic_context
+        return [Message(role="system", content=f"[Semantic Memory]: {res}", metadata={"type": "semantic"})
+                for res in semantic_results]
 
     def _store_semantic(self, message: Message):
+        # Buffer the write; flushing embeds the whole batch in one call
+        self.warm_up(background=True)
+        with self._store_lock:
+            if not self._pending_semantic:
+                self._pending_since = time.time()
+            self._pending_semantic.append(message)
+            due = len(self._pending_semantic) >= self.write_batch_size or \
+                time.time() - self._pending_since >= self.write_flush_interval
+            if not due:
+                self._arm_flush_timer()
+        self._bump("semantic")
+        if due:
+            self._flush_semantic()
+
+    def _flush_semantic(self):
+        """Writes all buffered messages with a single collection.add; on failure they stay buffered."""
+        with self._store_lock:
+            if not self._pending_semantic:
+                return
+            batch, self._pending_semantic = self._pending_semantic, []
+            since = self._pending_since
+            self._cancel_flush_timer()
         # Allow searching by content
         # ID must be unique
-        msg_id = str(uuid.uuid4())
-        self.collection.add(
-            documents=[message.content],
-            metadatas=[{"role": message.role, "timestamp": message.timestamp.isoformat()}],
-            ids=[msg_id]
-        )
+        documents = [m.content for m in batch]
+        tracer = get_tracer()
+        try:
+            with tracer.span("semantic.flush"):
+                self.collection.add(
+                    documents=documents,
+                    embeddings=self.embedding_cache.embed(documents),
+                    metadatas=[self._tenant_metadata({"role": m.role, "timestamp": m.timestamp.isoformat()})
+                               for m in batch],
+                    ids=[str(uuid.uuid4()) for _ in batch]
+                )
+        except Exception:
+            # Re-queue ahead of anything buffered meanwhile, so the next flush retries it
+            with self._store_lock:
+                self._pending_semantic[:0] = batch
+                self._pending_since = since
+                self._arm_flush_timer()
+            tracer.count("semantic.flush_failed")
+            raise
+        tracer.count("semantic.documents_written", len(batch))
+
+    def _arm_flush_timer(self):
+        # Caller holds _store_lock. Flushes the buffer even if no further write or read comes
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.write_flush_interval, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _cancel_flush_timer(self):
+        # Caller holds _store_lock
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _timed_flush(self):
+        with self._store_lock:
+            self._flush_timer = None
+        try:
+            self._flush_semantic()
+        except Exception as e:
+            print(f"Error flushing buffered semantic writes: {e}")
+
+    def flush(self):
+        super().flush()
+        self._flush_semantic()
+
+    def close(self):
+        super().close()
+        try:
+            self._flush_semantic()
+        finally:
+            self.embedding_cache.save()
 
     def _query_semantic(self, query: str, n_results: int = 2) -> List[str]:
         try:
             results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
+                query_embeddings=self.embedding_cache.embed([query]),
+                n_results=n_results,
+                where=self._tenant_filter()
             )
             # results['documents'] is a list of lists [[doc1, doc2]]
             if results['documents']:
@@ -76,9 +221,26 @@ class SemanticMemory(EpisodicMemory):
             print(f"Vector Scan Error: {e}")
             return []
     
+    def _tenant_filter(self):
+        return {"tenant": self.tenant_id} if self.tenant_id else None
+
+    def _tenant_metadata(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        if self.tenant_id:
+            metadata["tenant"] = self.tenant_id
+        return metadata
+
     def clear(self):
+        # Discard buffered writes first: close() would otherwise embed and store what is being deleted
+        with self._store_lock:
+            self._pending_semantic = []
+            self._cancel_flush_timer()
         super().clear()
         try:
-            self.chroma_client.delete_collection("agent_memory")
+            if self.tenant_id:
+                # Shared collection: only drop this tenant's documents
+                self.collection.delete(where=self._tenant_filter())
+            else:
+                self.vector_client.delete_collection("agent_memory")
+                self._collection = None
         except:
             pass
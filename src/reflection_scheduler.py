@@ -0,0 +1,207 @@
+import re
+import time
+import queue
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from agent import Message
+from llm import ERROR_PREFIX
+from context_budget import TokenCounter
+from tracing import get_tracer
+
+
+@dataclass
+class ReflectionPolicy:
+    """
+    When ReflectionMemory reflects on its own (see ReflectionScheduler).
+    A trigger snapshots the trailing `window` messages of STM for a later critique.
+    """
+    every_turns: Optional[int] = 5         # Reflect after this many agent replies (None = never)
+    on_negative_feedback: bool = True      # Reflect after the reply to a user message matching feedback_pattern
+    feedback_pattern: str = (r"\b(wrong|incorrect|mistake|bad|didn'?t|did not|should have|"
+                             r"not what i|that'?s not|you forgot|unhappy)\b")
+    window: int = 10                       # Messages of history per reflection
+    tokens_per_hour: Optional[int] = None  # History tokens sent for critique per hour; windows beyond it are skipped
+    max_batch: int = 8                     # Windows per critique request
+    batch_delay: float = 0.5               # Seconds to wait for more windows before sending
+    max_pending: int = 256                 # Bounded queue; a full queue blocks the producer
+
+    def is_negative(self, text: str) -> bool:
+        return bool(re.search(self.feedback_pattern, text, re.IGNORECASE))
+
+
+BATCH_PROMPT = (
+    "You are a critical observer of an AI agent. Analyze each of the following numbered interactions. "
+    "For each one, if the agent made a mistake or the user was unhappy, formulate a 'Lesson Learned' or "
+    "'Rule' to prevent this in the future. Answer with exactly one line per interaction, in the form "
+    "'<number>: <lesson>', or '<number>: None' if there was no mistake."
+)
+_ANSWER_LINE = re.compile(r"^\s*(?:interaction\s*)?(\d+)\s*[:.)\-]\s*(.*)$", re.IGNORECASE)
+
+
+def format_history(history: List[Message]) -> str:
+    return "\n".join([f"{m.role}: {m.content}" for m in history])
+
+
+def parse_batch_answer(answer: str, n: int) -> Dict[int, str]:
+    """Maps interaction number (1-based) to its lesson; unnumbered lines continue the previous one."""
+    lessons: Dict[int, str] = {}
+    current = None
+    for line in answer.splitlines():
+        match = _ANSWER_LINE.match(line)
+        if match:
+            current = int(match.group(1)) if 1 <= int(match.group(1)) <= n else None
+            if current is not None:
+                lessons[current] = match.group(2).strip()
+        elif current is not None and line.strip():
+            lessons[current] += " " + line.strip()
+    return lessons
+
+
+class ReflectionScheduler:
+    """
+    Background thread that runs ReflectionMemory critiques off the request path.
+    - Memories submit history windows (see ReflectionPolicy for the triggers).
+    - Windows that pile up while a critique is running, or arrive within `batch_delay`,
+      are drained together. Overlapping windows of a memory are merged (each message
+      sent once), and up to `max_batch` windows share one numbered critique request,
+      even across tenants (grouped by LLM client).
+    - `tokens_per_hour` caps the history tokens sent over the last hour; feedback-triggered
+      windows are admitted first and windows beyond the budget are skipped.
+    One scheduler can serve many memories (MemoryManager shares one across tenants).
+    """
+    def __init__(self, policy: ReflectionPolicy = None, counter: TokenCounter = None):
+        self.policy = policy or ReflectionPolicy()
+        self.counter = counter or TokenCounter()
+        self.queue: "queue.Queue[Optional[Tuple[Any, List[Message], bool]]]" = queue.Queue(maxsize=self.policy.max_pending)
+        self._pending: Dict[int, int] = {}  # id(memory) -> windows submitted but not yet critiqued
+        self._done = threading.Condition()
+        self._spent: Deque[Tuple[float, int]] = deque()  # (time, prompt tokens) over the last hour
+        self.windows = 0
+        self.requests = 0
+        self.skipped = 0
+        self.tokens = 0
+        self.thread = threading.Thread(target=self._run, name="reflection-scheduler", daemon=True)
+        self.thread.start()
+
+    def submit(self, memory, window: List[Message], feedback: bool = False):
+        with self._done:
+            self._pending[id(memory)] = self._pending.get(id(memory), 0) + 1
+        self.queue.put((memory, list(window), feedback))
+
+    def flush(self, memory=None):
+        """Blocks until the windows of `memory` (default: every memory) have been critiqued."""
+        with self._done:
+            self._done.wait_for(lambda: not (self._pending.get(id(memory)) if memory is not None else self._pending))
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {"windows": self.windows, "requests": self.requests, "skipped": self.skipped,
+                "tokens": self.tokens, "tokens_last_hour": self._tokens_last_hour()}
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.policy.batch_delay
+            while item is not None:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+            items = [i for i in batch if i is not None]
+            try:
+                if items:
+                    self._process(items)
+            except Exception as e:
+                print(f"Error running reflection: {e}")
+            finally:
+                with self._done:
+                    for memory, _, _ in items:
+                        key = id(memory)
+                        self._pending[key] -= 1
+                        if not self._pending[key]:
+                            del self._pending[key]
+                    self._done.notify_all()
+            if len(items) < len(batch):
+                return
+
+    def _process(self, items: List[Tuple[Any, List[Message], bool]]):
+        # 1. Overlapping windows of a memory (e.g. a feedback trigger and the periodic one
+        #    right after it) are merged, so each message is sent once
+        windows: List[List[Any]] = []  # [memory, messages, message ids, feedback]
+        last: Dict[int, List[Any]] = {}
+        for memory, window, feedback in items:
+            entry = last.get(id(memory))
+            if entry is None or not any(id(m) in entry[2] for m in window):
+                entry = last[id(memory)] = [memory, [], set(), False]
+                windows.append(entry)
+            for message in window:
+                if id(message) not in entry[2]:
+                    entry[2].add(id(message))
+                    entry[1].append(message)
+            entry[3] = entry[3] or feedback
+        self.windows += len(items)
+
+        # 2. Budget: feedback-triggered windows first, the rest while tokens remain
+        admitted = []
+        for memory, window, _, _ in sorted(windows, key=lambda e: not e[3]):
+            if not window:
+                continue
+            cost = self.counter.count(format_history(window))
+            if self._charge(cost):
+                admitted.append((memory, window))
+            else:
+                self.skipped += 1
+                get_tracer().count("reflection.skipped")
+
+        # 3. One critique request per max_batch windows sharing an LLM client
+        groups: "OrderedDict[int, List[Tuple[Any, List[Message]]]]" = OrderedDict()
+        for memory, window in admitted:
+            groups.setdefault(id(memory.llm_client), []).append((memory, window))
+        for group in groups.values():
+            for lo in range(0, len(group), self.policy.max_batch):
+                self._critique(group[lo:lo + self.policy.max_batch])
+
+    def _critique(self, windows: List[Tuple[Any, List[Message]]]):
+        self.requests += 1
+        if len(windows) == 1:
+            memory, window = windows[0]
+            memory.reflect(window)
+            return
+        prompt = [
+            {"role": "system", "content": BATCH_PROMPT},
+            {"role": "user", "content": "\n\n".join(f"Interaction {i}:\n{format_history(window)}"
+                                                    for i, (_, window) in enumerate(windows, 1))}
+        ]
+        print(f"\n[Reflection Process Running on {len(windows)} interactions...]")
+        with get_tracer().span("reflection.llm"):
+            answer = windows[0][0].llm_client.generate_response(prompt)
+        if answer.startswith(ERROR_PREFIX):
+            print(f"[Reflection]: {answer}")
+            return
+        lessons = parse_batch_answer(answer, len(windows))
+        for i, (memory, _) in enumerate(windows, 1):
+            memory._learn(lessons.get(i, "None"))
+
+    def _tokens_last_hour(self) -> int:
+        cutoff = time.time() - 3600
+        with self._done:
+            while self._spent and self._spent[0][0] < cutoff:
+                self._spent.popleft()
+            return sum(tokens for _, tokens in self._spent)
+
+    def _charge(self, tokens: int) -> bool:
+        budget = self.policy.tokens_per_hour
+        with self._done:
+            if budget is not None and self._tokens_last_hour() + tokens > budget:
+                return False
+            self._spent.append((time.time(), tokens))
+            self.tokens += tokens
+            return True
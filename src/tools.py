@@ -1,7 +1,83 @@
+import ast
+import json
+import math
+import time
+import operator
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from tracing import get_tracer
+
+# Calculator: expressions are parsed once into a tree of closures over a whitelisted
+# subset of Python (numbers, arithmetic, comparisons and the math functions below).
+_BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_COMPARE_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+_FUNCTIONS = {
+    "abs": abs, "round": round, "min": min, "max": max,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log10": math.log10, "log2": math.log2,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "floor": math.floor, "ceil": math.ceil,
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+MAX_EXPONENT = 10000       # Larger powers could hang the worker (e.g. 9**9**9)
+MAX_RESULT_BITS = 1000000  # Same for integer powers of large bases
+
+
+def _pow(base, exponent):
+    if abs(exponent) > MAX_EXPONENT or (isinstance(base, int) and base.bit_length() * abs(exponent) > MAX_RESULT_BITS):
+        raise ValueError(f"Exponent too large: {exponent}")
+    return operator.pow(base, exponent)
+
+
+def _compile_node(node: ast.AST) -> Callable[[], Any]:
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda: value
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        value = _CONSTANTS[node.id]
+        return lambda: value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op = _pow if isinstance(node.op, ast.Pow) else _BINARY_OPS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda: op(left(), right())
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        op, operand = _UNARY_OPS[type(node.op)], _compile_node(node.operand)
+        return lambda: op(operand())
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+        ops = [_COMPARE_OPS[type(op)] for op in node.ops]
+        operands = [_compile_node(node.left)] + [_compile_node(c) for c in node.comparators]
+        def compare():
+            values = [f() for f in operands]
+            return all(op(a, b) for op, a, b in zip(ops, values, values[1:]))
+        return compare
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS
+            and not node.keywords):
+        fn, args = _FUNCTIONS[node.func.id], [_compile_node(a) for a in node.args]
+        return lambda: fn(*[a() for a in args])
+    raise ValueError(f"Unsupported expression: {ast.unparse(node)}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> Callable[[], Any]:
+    """Parses and validates `expression` once; repeated expressions reuse the compiled closure."""
+    return _compile_node(ast.parse(expression.strip(), mode="eval"))
+
+
 def calculator(expression: str) -> str:
     """Evaluates a mathematical expression."""
     try:
-        return str(eval(expression))
+        return str(compile_expression(expression)())
     except Exception as e:
         return f"Error: {e}"
 
@@ -13,3 +89,126 @@ TOOLS = {
     "calculator": calculator,
     "search": search_knowledge_base
 }
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    name: str
+    arguments: str
+
+
+def parse_tool_calls(response: str) -> List[ToolCall]:
+    """
+    Tool calls requested by an LLM reply of the form
+    {"tool_calls": [{"name": "calculator", "arguments": "2 + 2"}, ...]}
+    (optionally in a ``` fence). Any other reply is a final answer: [].
+    """
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]
+    if not text.startswith("{") or "tool_calls" not in text:
+        return []
+    try:
+        calls = json.loads(text).get("tool_calls") or []
+        return [ToolCall(str(c["name"]), str(c.get("arguments", ""))) for c in calls]
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return []
+
+
+_tool_pool: Optional[ThreadPoolExecutor] = None
+_tool_pool_lock = threading.Lock()
+
+def tool_pool() -> ThreadPoolExecutor:
+    """Thread pool for tool calls, shared by every agent in the process."""
+    global _tool_pool
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tools")
+        return _tool_pool
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls of one agent step concurrently on the shared tool_pool().
+    - Each call gets `tool_timeouts[name]` (else `timeout`) seconds from submission; a late
+      call yields an error string for the LLM (its thread finishes in the background).
+    - Successful results are memoized per (tool, arguments) for `cache_ttl` seconds, in an
+      LRU of `cache_size`; identical calls within one step run once. Errors are not cached.
+    `tools` maps names to callables taking one string; a list may mix TOOLS names and callables.
+    """
+    def __init__(self, tools: Union[Dict[str, Callable[[str], str]], List[Any]] = None, timeout: float = 10.0,
+                 tool_timeouts: Dict[str, float] = None, cache_size: int = 256, cache_ttl: Optional[float] = 300.0):
+        self.tools = self.resolve(tools)
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve(tools) -> Dict[str, Callable[[str], str]]:
+        if isinstance(tools, dict):
+            return dict(tools)
+        resolved = {}
+        for tool in tools or []:
+            if isinstance(tool, str):
+                if tool not in TOOLS:
+                    raise ValueError(f"Unknown tool: {tool}")
+                resolved[tool] = TOOLS[tool]
+            else:
+                resolved[tool.__name__] = tool
+        return resolved
+
+    def describe(self) -> str:
+        return "\n".join(f"- {name}: {(fn.__doc__ or '').strip()}" for name, fn in self.tools.items())
+
+    def run(self, calls: List[ToolCall]) -> List[str]:
+        """Results in call order."""
+        tracer = get_tracer()
+        tracer.count("agent.tool_calls", len(calls))
+        results: Dict[ToolCall, str] = {}
+        futures = {}
+        for call in dict.fromkeys(calls):
+            cached = self._cached(call)
+            if cached is not None:
+                results[call] = cached
+                tracer.count("tools.cache.hit")
+            elif call.name not in self.tools:
+                results[call] = f"Error: unknown tool '{call.name}'"
+            else:
+                futures[call] = (tool_pool().submit(self.tools[call.name], call.arguments), time.monotonic())
+
+        for call, (future, submitted) in futures.items():
+            timeout = self.tool_timeouts.get(call.name, self.timeout)
+            try:
+                result = future.result(timeout=max(0.0, submitted + timeout - time.monotonic()))
+                results[call] = result = str(result)
+                if not result.startswith("Error"):
+                    self._remember(call, result)
+            except FutureTimeoutError:
+                tracer.count("tools.timeout")
+                results[call] = f"Error: {call.name} timed out after {timeout}s"
+            except Exception as e:
+                results[call] = f"Error: {e}"
+        return [results[call] for call in calls]
+
+    def _cached(self, call: ToolCall) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get((call.name, call.arguments))
+            if entry is None:
+                return None
+            if self.cache_ttl is not None and time.monotonic() - entry[0] > self.cache_ttl:
+                del self._cache[(call.name, call.arguments)]
+                return None
+            self._cache.move_to_end((call.name, call.arguments))
+            return entry[1]
+
+    def _remember(self, call: ToolCall, result: str):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[(call.name, call.arguments)] = (time.monotonic(), result)
+            self._cache.move_to_end((call.name, call.arguments))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,135 @@
+import bisect
+import threading
+import time
+from typing import Dict
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Tracing/metrics surface used by the agent loop and memory tiers.
+    This base class is the default and does nothing: span() hands back a shared
+    no-op context manager, so instrumentation costs one call when tracing is off.
+    Install a real implementation (e.g. MetricsCollector, or an adapter to your
+    tracing backend) with set_tracer().
+    """
+    def span(self, name: str):
+        return _NOOP_SPAN
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+
+class _TimedSpan:
+    __slots__ = ("collector", "name", "start")
+
+    def __init__(self, collector: "MetricsCollector", name: str):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.collector.observe(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+    BOUNDS_MS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                 1000, 2500, 5000, 10000]
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.buckets[bisect.bisect_left(self.BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            cumulative += n
+            if cumulative >= target:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        labels = [str(b) for b in self.BOUNDS_MS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 4),
+            "max_ms": round(self.max_ms, 4),
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class MetricsCollector(Tracer):
+    """In-process collector: span durations go into per-name histograms, plus counters."""
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        return _TimedSpan(self, name)
+
+    def observe(self, name: str, value_ms: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value_ms)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def export(self) -> Dict:
+        with self._lock:
+            return {
+                "spans": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+
+_tracer: Tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def set_tracer(tracer: Tracer = None) -> Tracer:
+    """Installs a process-wide tracer (None restores the no-op default). Returns it."""
+    global _tracer
+    _tracer = tracer or Tracer()
+    return _tracer
@@ -0,0 +1,544 @@
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+class VectorCollection:
+    """
+    The part of the Chroma collection API the memory tiers use. Any backend that
+    implements it (Chroma itself, LocalCollection) can sit behind SemanticMemory.
+    Query results follow Chroma's shape: one inner list per query embedding.
+    """
+    def add(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None) -> Dict[str, List[List[Any]]]:
+        raise NotImplementedError
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None, include: List[str] = None) -> Dict[str, List[Any]]:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str] = None, where: Dict[str, Any] = None):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+def open_vector_client(backend: str = "chroma", path: str = "./chroma_db", **options):
+    """
+    Returns a client with get_or_create_collection / delete_collection / get_max_batch_size.
+    - "chroma": chromadb.PersistentClient (SQLite + HNSW).
+    - "local": LocalVectorClient, NumPy indexes over memory-mapped float32 files.
+    """
+    if backend == "chroma":
+        import chromadb
+        return chromadb.PersistentClient(path=path)
+    if backend == "local":
+        return LocalVectorClient(path, **options)
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def default_embedding_function():
+    """Chroma's default embedding function (all-MiniLM-L6-v2 on ONNX Runtime)."""
+    from chromadb.utils import embedding_functions
+    return embedding_functions.DefaultEmbeddingFunction()
+
+
+class LazyEmbeddingFunction:
+    """
+    Builds the embedding function from `factory` on first use, so the import (chromadb
+    for the default) is only paid by processes that actually embed something.
+    Pickles as its factory; each process resolves its own copy.
+    """
+    def __init__(self, factory=default_embedding_function):
+        self.factory = factory
+        self._function = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    self._function = self.factory()
+        return self._function
+
+    def __call__(self, input):
+        return self.resolve()(input)
+
+    def __reduce__(self):
+        return (LazyEmbeddingFunction, (self.factory,))
+
+
+class LocalVectorClient:
+    """
+    In-process vector store: one directory per collection under `path`.
+    index: "flat" (exact scan), "ivf" (inverted file, approximate) or "auto", which scans
+    exactly until a collection holds `ivf_threshold` vectors and then trains an IVF index.
+    Embeddings must be precomputed (SemanticMemory embeds through its EmbeddingCache).
+    """
+    def __init__(self, path: str = "./vector_db", index: str = "auto", ivf_threshold: int = 50000,
+                 nprobe: int = 16):
+        if index not in ("flat", "ivf", "auto"):
+            raise ValueError(f"Unknown index type: {index}")
+        self.path = path
+        self.index = index
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._collections: Dict[str, "LocalCollection"] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def get_or_create_collection(self, name: str, embedding_function=None, configuration: Dict[str, Any] = None,
+                                 **kwargs) -> "LocalCollection":
+        # Same signature as Chroma's; the space comes from configuration={"hnsw": {"space": ...}}
+        space = ((configuration or {}).get("hnsw") or {}).get("space", "l2")
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = self._collections[name] = LocalCollection(
+                    os.path.join(self.path, name), space=space, index=self.index,
+                    ivf_threshold=self.ivf_threshold, nprobe=self.nprobe)
+            return collection
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is not None:
+            collection.close()
+        shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def get_max_batch_size(self) -> int:
+        return 100000
+
+
+class LocalCollection(VectorCollection):
+    """
+    Vectors live in `vectors.f32` (row-major float32, appended) and are read through a
+    memory map, so a large collection costs page cache rather than heap. `rows.jsonl`
+    holds one {"id", "document", "metadata"} record per vector row, in row order;
+    {"id": ..., "deleted": true} is a tombstone and a later row with the same id
+    supersedes an earlier one (upsert). Dead rows are dropped by compaction once they
+    outnumber the live ones.
+    Distances match Chroma: squared L2 ("l2"), 1 - cosine ("cosine"), 1 - dot ("ip").
+    Cosine vectors are normalized on write.
+    IVF: k-means centroids (about sqrt(n) lists) partition the rows; a query scores the
+    rows of its `nprobe` nearest lists plus the rows added since the lists were built.
+    `ivf.f32` holds a copy of the vectors ordered by list, so each probed list is one
+    contiguous read. The index is retrained once the collection has doubled, and its
+    centroids and assignments are kept in `ivf.npz`.
+    """
+    def __init__(self, path: str, space: str = "l2", index: str = "auto", ivf_threshold: int = 50000,
+                 nprobe: int = 16):
+        if space not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unknown distance space: {space}")
+        self.path = path
+        self.space = space
+        self.index = index
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.rows_path = os.path.join(path, "rows.jsonl")
+        self.ivf_path = os.path.join(path, "ivf.npz")
+        self.ivf_vectors_path = os.path.join(path, "ivf.f32")
+        self._lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self._reset()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _reset(self):
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._row: Dict[str, int] = {}  # id -> live row
+        self._alive = np.zeros(0, dtype=bool)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._postings: Dict[Tuple[str, Any], List[int]] = {}  # (metadata key, value) -> rows
+        self._n = 0
+        self._mmap: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._list_offsets: Optional[np.ndarray] = None  # CSR over rows [0, _indexed)
+        self._list_rows: Optional[np.ndarray] = None
+        self._list_vectors: Optional[np.ndarray] = None  # Memory map of ivf.f32
+        self._indexed = 0
+        self._trained_n = 0
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not os.path.exists(self.rows_path):
+            return
+        records = []
+        good_offset = 0
+        with open(self.rows_path, "rb") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break  # Torn tail from a crash mid-append
+                good_offset += len(line)
+        if good_offset < os.path.getsize(self.rows_path):
+            with open(self.rows_path, "r+b") as f:
+                f.truncate(good_offset)
+        self.dim = self._read_dim()
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if self.dim else 0
+
+        self._grow(min(len(records), vector_rows))
+        row = 0
+        for r in records:
+            if r.get("deleted"):
+                self._kill(r["id"])
+                continue
+            if row >= vector_rows:
+                break  # Vector write never completed
+            self._append_row(r["id"], r.get("document"), r.get("metadata"))
+            row += 1
+        self._n = row
+        if vector_rows > row:
+            # Vectors whose row records never made it to disk: drop them so rows stay aligned
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(row * self.dim * 4)
+        self._remap()
+        if self._n:
+            for lo in range(0, self._n, 65536):
+                chunk = self._mmap[lo:lo + 65536]
+                self._sq_norms[lo:lo + len(chunk)] = np.einsum("ij,ij->i", chunk, chunk)
+        self._load_ivf()
+
+    def _read_dim(self) -> Optional[int]:
+        header = os.path.join(self.path, "header.json")
+        if not os.path.exists(header):
+            return None
+        with open(header) as f:
+            return json.load(f)["dim"]
+
+    def _write_header(self):
+        with open(os.path.join(self.path, "header.json"), "w") as f:
+            json.dump({"dim": self.dim, "space": self.space}, f)
+
+    def _remap(self):
+        if self._n:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._n, self.dim))
+
+    def _load_ivf(self):
+        if not os.path.exists(self.ivf_path):
+            return
+        try:
+            with np.load(self.ivf_path) as data:
+                centroids, assign, trained_n = data["centroids"], data["assign"], int(data["trained_n"])
+        except Exception as e:
+            print(f"Error loading IVF index: {e}")
+            return
+        if centroids.shape[1] != self.dim or len(assign) > self._n:
+            return
+        self._centroids = centroids
+        self._trained_n = trained_n
+        self._assign[:len(assign)] = assign
+        if len(assign) < self._n:
+            self._assign[len(assign):self._n] = self._nearest_centroids(self._mmap[len(assign):self._n])
+        expected_size = len(assign) * self.dim * 4
+        intact = os.path.exists(self.ivf_vectors_path) and os.path.getsize(self.ivf_vectors_path) == expected_size
+        self._build_lists(len(assign), write=not intact)
+
+    def _save_ivf(self):
+        tmp_path = self.ivf_path + ".tmp.npz"
+        np.savez(tmp_path, centroids=self._centroids, assign=self._assign[:self._indexed],
+                 trained_n=self._trained_n)
+        os.replace(tmp_path, self.ivf_path)
+
+    # --- Writes ---
+
+    def add(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict[str, Any]] = None):
+        # Like Chroma, adding an id that already exists is a no-op
+        with self._lock:
+            keep = [i for i, id_ in enumerate(ids) if id_ not in self._row]
+            if len(keep) < len(ids):
+                ids = [ids[i] for i in keep]
+                embeddings = [embeddings[i] for i in keep]
+                documents = [documents[i] for i in keep] if documents else None
+                metadatas = [metadatas[i] for i in keep] if metadatas else None
+            self._write(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict[str, Any]] = None):
+        with self._lock:
+            self._write(ids, embeddings, documents, metadatas)
+
+    def _write(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if self.space == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._write_header()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+        # 1. Vectors first: a row record without its vector is discarded on load
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.rows_path, "a") as f:
+            for i, id_ in enumerate(ids):
+                f.write(json.dumps({"id": id_, "document": documents[i] if documents else None,
+                                    "metadata": metadatas[i] if metadatas else None}) + "\n")
+
+        # 2. In-memory state
+        start = self._n
+        self._grow(start + len(ids))
+        for i, id_ in enumerate(ids):
+            self._append_row(id_, documents[i] if documents else None, metadatas[i] if metadatas else None)
+        self._sq_norms[start:start + len(ids)] = np.einsum("ij,ij->i", vectors, vectors)
+        self._n = start + len(ids)
+        self._remap()
+
+        # 3. Index maintenance
+        if self._centroids is not None:
+            self._assign[start:self._n] = self._nearest_centroids(vectors)
+        live = len(self._row)
+        if self.index != "flat" and live >= self.ivf_threshold and live >= 2 * self._trained_n:
+            self._train_ivf()
+        elif self._centroids is not None and self._n - self._indexed > max(1000, self._n // 20):
+            self._build_lists(self._n)
+            self._save_ivf()
+
+    def _grow(self, rows: int):
+        if rows <= len(self._alive):
+            return
+        capacity = max(rows, 2 * len(self._alive), 1024)
+        for name in ("_alive", "_sq_norms", "_assign"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _append_row(self, id_: str, document: Optional[str], metadata: Optional[Dict[str, Any]]):
+        self._kill(id_)
+        row = len(self._ids)
+        self._ids.append(id_)
+        self._documents.append(document)
+        self._metadatas.append(metadata)
+        self._row[id_] = row
+        self._alive[row] = True
+        for key, value in (metadata or {}).items():
+            if isinstance(value, (str, int, float, bool)):
+                self._postings.setdefault((key, value), []).append(row)
+
+    def _kill(self, id_: str):
+        row = self._row.pop(id_, None)
+        if row is not None:
+            self._alive[row] = False
+            self._documents[row] = None  # Postings are checked against _alive
+
+    def delete(self, ids: List[str] = None, where: Dict[str, Any] = None):
+        with self._lock:
+            targets = set(ids or [])
+            if where:
+                rows = self._filter_rows(where)
+                targets.update(self._ids[r] for r in rows if ids is None or self._ids[r] in targets)
+            targets = [id_ for id_ in targets if id_ in self._row]
+            if not targets:
+                return
+            with open(self.rows_path, "a") as f:
+                for id_ in targets:
+                    f.write(json.dumps({"id": id_, "deleted": True}) + "\n")
+            for id_ in targets:
+                self._kill(id_)
+            dead = self._n - len(self._row)
+            if dead > 1000 and dead > len(self._row):
+                self.compact()
+
+    def compact(self):
+        """Rewrites the files with only the live rows (temp files + atomic replace)."""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._n])
+            tmp_vectors, tmp_rows = self.vectors_path + ".tmp", self.rows_path + ".tmp"
+            with open(tmp_vectors, "wb") as f:
+                for lo in range(0, len(rows), 65536):
+                    f.write(np.ascontiguousarray(self._mmap[rows[lo:lo + 65536]]).tobytes())
+            with open(tmp_rows, "w") as f:
+                for r in rows:
+                    f.write(json.dumps({"id": self._ids[r], "document": self._documents[r],
+                                        "metadata": self._metadatas[r]}) + "\n")
+            self._mmap = None
+            os.replace(tmp_vectors, self.vectors_path)
+            os.replace(tmp_rows, self.rows_path)
+            for path in (self.ivf_path, self.ivf_vectors_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            dim = self.dim
+            self._reset()
+            self.dim = dim
+            self._load()
+            if self.index != "flat" and len(self._row) >= self.ivf_threshold:
+                self._train_ivf()
+
+    # --- IVF ---
+
+    def _train_ivf(self, iterations: int = 20, seed: int = 0):
+        # k-means on up to 64 sampled rows per list; empty lists are re-seeded from the sample
+        rows = np.flatnonzero(self._alive[:self._n])
+        nlist = max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(seed)
+        sample = self._mmap[np.sort(rng.choice(rows, size=min(len(rows), nlist * 64), replace=False))]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(sample, centroids)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            centroids[filled] = np.add.reduceat(sample[order], starts, axis=0) / counts[filled, None]
+            if not filled.all():
+                centroids[~filled] = sample[rng.choice(len(sample), size=int((~filled).sum()), replace=False)]
+        self._centroids = centroids
+        self._trained_n = len(rows)
+        for lo in range(0, self._n, 65536):
+            chunk = self._mmap[lo:lo + 65536]
+            self._assign[lo:lo + len(chunk)] = self._nearest_centroids(chunk)
+        self._build_lists(self._n)
+        self._save_ivf()
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||v - c||^2 = argmin (||c||^2 - 2 v.c)
+        c_norms = np.einsum("ij,ij->i", centroids, centroids)
+        return np.argmin(c_norms[None, :] - 2 * (vectors @ centroids.T), axis=1).astype(np.int32)
+
+    def _nearest_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        return self._nearest(np.asarray(vectors, dtype=np.float32), self._centroids)
+
+    def _build_lists(self, indexed: int, write: bool = True):
+        order = np.argsort(self._assign[:indexed], kind="stable").astype(np.int64)
+        counts = np.bincount(self._assign[:indexed], minlength=len(self._centroids))
+        if write:
+            tmp_path = self.ivf_vectors_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for lo in range(0, indexed, 65536):
+                    f.write(np.ascontiguousarray(self._mmap[order[lo:lo + 65536]]).tobytes())
+            os.replace(tmp_path, self.ivf_vectors_path)
+        self._list_vectors = np.memmap(self.ivf_vectors_path, dtype=np.float32, mode="r",
+                                       shape=(indexed, self.dim)) if indexed else None
+        self._list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._list_rows = order
+        self._indexed = indexed
+
+    # --- Reads ---
+
+    def count(self) -> int:
+        return len(self._row)
+
+    def _filter_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        """Live rows matching a Chroma-style equality filter ({"k": v}, {"k": {"$eq": v}}, {"$and": [...]})."""
+        clauses = where.get("$and", [where]) if len(where) == 1 else [{k: v} for k, v in where.items()]
+        rows = None
+        for clause in clauses:
+            ((key, value),) = clause.items()
+            if isinstance(value, dict):
+                if set(value) != {"$eq"}:
+                    raise ValueError(f"Unsupported where operator: {value}")
+                value = value["$eq"]
+            matched = np.asarray(self._postings.get((key, value), []), dtype=np.int64)
+            rows = matched if rows is None else np.intersect1d(rows, matched)
+        return rows[self._alive[rows]] if len(rows) else rows
+
+    def _search(self, query: np.ndarray, allowed: Optional[np.ndarray], n_results: int,
+                has_dead: bool) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """(rows, distances) to rank for one query; rows is None when every row was scored."""
+        if self._list_rows is None or \
+                (allowed is not None and len(allowed) <= self._n * self.nprobe // len(self._centroids)):
+            return self._exact(query, allowed, has_dead)  # No index, or a filter this selective is cheaper to scan
+        probes = np.argsort(self._nearest_scores(query))[:self.nprobe]
+        spans = [(self._list_offsets[p], self._list_offsets[p + 1]) for p in probes]
+        rows = np.concatenate([self._list_rows[lo:hi] for lo, hi in spans] + [np.arange(self._indexed, self._n)])
+        dots = np.concatenate([self._list_vectors[lo:hi] @ query for lo, hi in spans] +
+                              [self._mmap[self._indexed:self._n] @ query])
+        keep = self._alive[rows]
+        if allowed is not None:
+            keep &= np.isin(rows, allowed)
+        if keep.sum() < n_results:
+            return self._exact(query, allowed, has_dead)  # Too few in the probed lists
+        rows = rows[keep]
+        return rows, self._to_distances(dots[keep], self._sq_norms[rows], query)
+
+    def _exact(self, query: np.ndarray, rows: Optional[np.ndarray],
+               has_dead: bool) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        if rows is not None:
+            return rows, self._to_distances(self._mmap[rows] @ query, self._sq_norms[rows], query)
+        distances = self._to_distances(self._mmap[:self._n] @ query, self._sq_norms[:self._n], query)
+        if has_dead:
+            distances = np.where(self._alive[:self._n], distances, np.inf)
+        return None, distances
+
+    def _nearest_scores(self, query: np.ndarray) -> np.ndarray:
+        return np.einsum("ij,ij->i", self._centroids, self._centroids) - 2 * (self._centroids @ query)
+
+    def _to_distances(self, dots: np.ndarray, sq_norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.space == "l2":
+            return sq_norms - 2 * dots + float(query @ query)
+        return 1 - dots
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = None) -> Dict[str, List[List[Any]]]:
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries[None, :] if queries.ndim == 1 else queries
+        with self._lock:
+            if self._n == 0:
+                return {key: [[] for _ in queries] for key in results}
+            allowed = self._filter_rows(where) if where else None
+            has_dead = len(self._row) < self._n
+            for query in queries:
+                self._query_one(query, n_results, allowed, has_dead, results)
+        return results
+
+    def _query_one(self, query: np.ndarray, n_results: int, allowed: Optional[np.ndarray], has_dead: bool,
+                   results: Dict[str, List[List[Any]]]):
+        if self.space == "cosine":
+            norm = np.linalg.norm(query)
+            query = query / norm if norm else query
+        rows, distances = self._search(query, allowed, n_results, has_dead)
+        k = min(n_results, len(distances))
+        top = np.argpartition(distances, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+        top = top[np.argsort(distances[top])]
+        top = top[np.isfinite(distances[top])]
+        hits = rows[top] if rows is not None else top
+        results["ids"].append([self._ids[r] for r in hits])
+        results["documents"].append([self._documents[r] for r in hits])
+        results["metadatas"].append([self._metadatas[r] for r in hits])
+        results["distances"].append([float(d) for d in distances[top]])
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None, include: List[str] = None,
+            limit: int = None) -> Dict[str, List[Any]]:
+        with self._lock:
+            if ids is not None:
+                rows = [self._row[id_] for id_ in ids if id_ in self._row]
+            elif where:
+                rows = self._filter_rows(where).tolist()
+            else:
+                rows = np.flatnonzero(self._alive[:self._n]).tolist()
+            if where and ids is not None:
+                rows = sorted(set(rows) & set(self._filter_rows(where).tolist()))
+            rows = rows[:limit] if limit is not None else rows
+            include = ["documents", "metadatas"] if include is None else include
+            result = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[r] for r in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.array(self._mmap[rows]) if rows else np.zeros((0, self.dim or 0))
+            return result
+
+    def close(self):
+        with self._lock:
+            self._mmap = None